@@ -11,6 +11,8 @@ Operation: [CREATE]
 from __future__ import annotations
 
 import json
+import math
+import os
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
@@ -26,6 +28,24 @@ class StructureMetrics:
     accuracy: float
 
 
+def _walk_entries(directory: str, file_sizes: List[int]) -> int:
+    """
+    Count every entry below ``directory`` and collect the sizes of its files.
+
+    Matches ``Path.rglob('*')``: hidden and ignored files are included and
+    symlinked directories are listed but not descended into.
+    """
+    entries = 0
+    with os.scandir(directory) as it:
+        for entry in it:
+            entries += 1
+            if entry.is_file():
+                file_sizes.append(entry.stat().st_size)
+            elif entry.is_dir(follow_symlinks=False):
+                entries += _walk_entries(entry.path, file_sizes)
+    return entries
+
+
 def calculate_structure_metrics(agent_path: Path) -> StructureMetrics:
     """
     Calculate mathematical metrics for an agent structure.
@@ -41,19 +61,29 @@ def calculate_structure_metrics(agent_path: Path) -> StructureMetrics:
     if not agent_path.exists():
         return StructureMetrics(0, 0, 0, 0, 0)
 
+    # Single os.scandir walk of the agent tree; every metric below is derived from it
+    file_sizes: List[int] = []
+    sizes = []
+    present = set()
+    with os.scandir(agent_path) as it:
+        for entry in it:
+            if entry.is_file():
+                file_sizes.append(entry.stat().st_size)
+            elif entry.is_dir():
+                present.add(entry.name)
+                # Entries below each top-level directory, as len(list(d.rglob('*'))); a
+                # symlinked one is counted there but its files are not part of the tree
+                sizes.append(_walk_entries(entry.path, [] if entry.is_symlink() else file_sizes))
+
     # Completeness
-    present = {d.name for d in agent_path.iterdir() if d.is_dir()}
     completeness = len(present & required) / len(required)
 
     # Content density
-    files = list(agent_path.rglob('*'))
-    total_files = len([f for f in files if f.is_file()])
-    content_files = len([f for f in files if f.is_file() and f.stat().st_size > 100])
+    total_files = len(file_sizes)
+    content_files = sum(1 for size in file_sizes if size > 100)
     density = content_files / total_files if total_files > 0 else 0
 
     # Simple entropy (uniformity of directory sizes)
-    import math
-    sizes = [len(list(d.rglob('*'))) for d in agent_path.iterdir() if d.is_dir()]
     total = sum(sizes)
     if total > 0:
         probs = [s/total for s in sizes]
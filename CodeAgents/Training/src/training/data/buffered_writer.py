@@ -0,0 +1,119 @@
+"""
+Module: buffered_writer.py
+Purpose: Write-behind buffer that batches single-record adds to a repository.
+
+High-frequency callers (error logging, daily activity logs, score updates)
+add records one at a time. Each ``collection.add`` costs an embedding pass
+and a SQLite transaction, so the writer collects records in memory and
+flushes them through the repository's batched write path when the buffer
+reaches ``max_records`` or its oldest record is ``max_delay`` seconds old.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-18T15:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, List, Optional
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .repositories import BaseRepository, Record
+
+
+class BufferedWriter:
+    """
+    [CREATE] Context manager that buffers adds and flushes them in batches.
+
+    Args:
+        repository: Repository whose ``build_record``/``_write_records`` are used.
+        max_records: Flush once this many records are buffered.
+        max_delay: Flush once the oldest buffered record is this many seconds old.
+            The age is checked on every ``add``; call :meth:`flush_if_due` from an
+            idle loop to bound latency when no further adds arrive.
+        clock: Monotonic time source (injectable for tests).
+
+    Thread Safety:
+        ``add`` and ``flush`` are serialised by an internal lock, so several
+        threads may share one writer.
+
+    Example:
+        >>> with registry.errors.buffered(max_records=100) as writer:
+        ...     writer.add(message="timeout", context="fetch", agent_id="ClaudeCode")
+    """
+
+    def __init__(
+        self,
+        repository: "BaseRepository",
+        max_records: int = 256,
+        max_delay: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_records <= 0:
+            raise ValueError("max_records must be greater than zero.")
+        self.repository = repository
+        self.max_records = max_records
+        self.max_delay = max_delay
+        self._clock = clock
+        self._pending: List["Record"] = []
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self.flushed = 0
+
+    def __enter__(self) -> "BufferedWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.flush()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def add(self, **fields: Any) -> None:
+        """[CREATE] Buffer one record (same keyword arguments as the repository's add method)."""
+        record = self.repository.build_record(**fields)
+        with self._lock:
+            if not self._pending:
+                self._oldest = self._clock()
+            self._pending.append(record)
+            if self._due():
+                self._flush_locked()
+
+    def flush_if_due(self) -> int:
+        """[CREATE] Flush only if the count or age threshold has been reached."""
+        with self._lock:
+            return self._flush_locked() if self._due() else 0
+
+    def flush(self) -> int:
+        """
+        [CREATE] Write every buffered record in one batched call.
+
+        Returns:
+            int: Number of records written.
+        """
+        with self._lock:
+            return self._flush_locked()
+
+    def _due(self) -> bool:
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.max_records:
+            return True
+        return self._oldest is not None and self._clock() - self._oldest >= self.max_delay
+
+    def _flush_locked(self) -> int:
+        if not self._pending:
+            return 0
+        pending, oldest = self._pending, self._oldest
+        self._pending, self._oldest = [], None
+        try:
+            written = self.repository._write_records(pending, self.max_records)
+        except Exception:
+            # Keep the records so a later flush can retry them
+            self._pending, self._oldest = pending + self._pending, oldest
+            raise
+        self.flushed += written
+        return written
@@ -30,12 +30,13 @@ DEFAULT_DB_PATH = Path("chroma_db")
 
 @dataclass(frozen=True)
 class CollectionSet:
-    """Typed container for the four ATS data collections."""
+    """Typed container for the ATS data collections."""
 
     training: Collection
     scores: Collection
     errors: Collection
     daily_logs: Collection
+    training_archive: Collection
 
 
 class ChromaDatabase:
@@ -50,18 +51,36 @@ class ChromaDatabase:
         Not thread-safe. Instantiate per-process.
     """
 
-    def __init__(self, path: Optional[str | Path] = None):
+    def __init__(self, path: Optional[str | Path] = None, embedding_function: Optional[Any] = None):
         resolved_path = Path(path) if path else DEFAULT_DB_PATH
         resolved_path.mkdir(parents=True, exist_ok=True)
         self.path = resolved_path
         self.client = chromadb.PersistentClient(path=str(self.path))
+        # None keeps Chroma's default embedding model
+        self.embedding_function = embedding_function
         self.collections = CollectionSet(
-            training=self.client.get_or_create_collection("training_data"),
-            scores=self.client.get_or_create_collection("score_data"),
-            errors=self.client.get_or_create_collection("error_data"),
-            daily_logs=self.client.get_or_create_collection("daily_log_data"),
+            training=self._collection("training_data"),
+            scores=self._collection("score_data"),
+            errors=self._collection("error_data"),
+            daily_logs=self._collection("daily_log_data"),
+            training_archive=self._collection("training_archive"),
         )
 
+    def collection(self, name: str) -> Collection:
+        """Get or create a collection with the database's embedding function."""
+        return self._collection(name)
+
+    def collection_names(self, prefix: str = "") -> list[str]:
+        """Names of the stored collections starting with ``prefix``, sorted."""
+        # list_collections yields names on chromadb 0.6 and Collection objects elsewhere
+        names = [getattr(item, "name", item) for item in self.client.list_collections()]
+        return sorted(name for name in names if name.startswith(prefix))
+
+    def _collection(self, name: str) -> Collection:
+        if self.embedding_function is None:
+            return self.client.get_or_create_collection(name)
+        return self.client.get_or_create_collection(name, embedding_function=self.embedding_function)
+
     def stats(self) -> dict[str, int]:
         """Return document counts for each collection."""
         return {
@@ -69,6 +88,7 @@ class ChromaDatabase:
             "scores": self.collections.scores.count(),
             "errors": self.collections.errors.count(),
             "daily_logs": self.collections.daily_logs.count(),
+            "training_archive": self.collections.training_archive.count(),
         }
 
     def close(self) -> None:
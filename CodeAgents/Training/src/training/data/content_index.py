@@ -0,0 +1,272 @@
+"""
+Module: content_index.py
+Purpose: Ingest-time duplicate detection for training materials.
+
+Keeps a SQLite sidecar of (agent, file, content hash) keys so exact
+duplicates are rejected with one indexed lookup before any embedding work,
+plus 64-bit SimHash signatures split into four 16-bit bands for optional
+near-duplicate detection. Two signatures within Hamming distance 3 must
+agree on at least one band, so a near-duplicate lookup only compares the
+few candidates sharing a band instead of scanning the collection.
+
+The same sidecar keeps each collection's token totals. They are adjusted
+with a single atomic ``UPDATE``, so registries in several threads or
+processes never lose each other's increments.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-18T18:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+SIMHASH_BITS = 64
+BAND_BITS = 16
+BANDS = SIMHASH_BITS // BAND_BITS
+# Largest distance the banding guarantees to find (pigeonhole over the bands)
+MAX_NEAR_DISTANCE = BANDS - 1
+
+_TOKEN = re.compile(r"\w+")
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """
+    [CREATE] 64-bit SimHash of a document's word shingles.
+
+    Documents that share most of their shingles get signatures with a small
+    Hamming distance.
+    """
+    words = _TOKEN.findall(text.lower())
+    if not words:
+        return 0
+    if len(words) < shingle:
+        features = [" ".join(words)]
+    else:
+        features = [" ".join(words[i:i + shingle]) for i in range(len(words) - shingle + 1)]
+
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(left: int, right: int) -> int:
+    """[CREATE] Number of differing bits between two signatures."""
+    return bin(left ^ right).count("1")
+
+
+def _bands(signature: int) -> List[int]:
+    mask = (1 << BAND_BITS) - 1
+    return [(signature >> (band * BAND_BITS)) & mask for band in range(BANDS)]
+
+
+@dataclass(frozen=True)
+class ContentEntry:
+    """Duplicate-detection keys of one stored document (``signature`` None when near-dup detection is off)."""
+
+    record_id: str
+    agent_id: Optional[str]
+    file_name: Optional[str]
+    content_hash: str
+    signature: Optional[int] = None
+
+
+class ContentIndex:
+    """
+    [CREATE] SQLite sidecar with exact-hash and SimHash-band lookups.
+
+    Args:
+        path: SQLite file, usually next to the Chroma database.
+
+    Thread Safety:
+        All statements run under an internal lock on one shared connection.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " collection TEXT NOT NULL, record_id TEXT NOT NULL, agent_id TEXT,"
+                " file_name TEXT, content_hash TEXT NOT NULL, signature TEXT NOT NULL,"
+                " PRIMARY KEY (collection, record_id))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS by_hash"
+                " ON documents (collection, content_hash, agent_id, file_name)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bands ("
+                " collection TEXT NOT NULL, band INTEGER NOT NULL, value INTEGER NOT NULL,"
+                " record_id TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS by_band ON bands (collection, band, value)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS band_owner ON bands (collection, record_id)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_totals ("
+                " collection TEXT PRIMARY KEY, total_tokens INTEGER NOT NULL,"
+                " counted_documents INTEGER NOT NULL)"
+            )
+
+    def add(self, collection: str, entries: Iterable[ContentEntry]) -> None:
+        """[CREATE] Index stored documents; re-adding a record ID replaces its entry."""
+        entries = list(entries)
+        if not entries:
+            return
+        with self._lock, self._conn:
+            # Bands have no key of their own, so a re-indexed record's old bands are dropped first
+            self._conn.executemany(
+                "DELETE FROM bands WHERE collection = ? AND record_id = ?",
+                [(collection, e.record_id) for e in entries],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents"
+                " (collection, record_id, agent_id, file_name, content_hash, signature)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        collection, e.record_id, e.agent_id, e.file_name, e.content_hash,
+                        "" if e.signature is None else f"{e.signature:016x}",
+                    )
+                    for e in entries
+                ],
+            )
+            self._conn.executemany(
+                "INSERT INTO bands (collection, band, value, record_id) VALUES (?, ?, ?, ?)",
+                [
+                    (collection, band, value, e.record_id)
+                    for e in entries
+                    if e.signature is not None
+                    for band, value in enumerate(_bands(e.signature))
+                ],
+            )
+
+    def remove(self, collection: str, record_ids: Iterable[str]) -> None:
+        """[CREATE] Forget deleted documents."""
+        rows = [(collection, record_id) for record_id in record_ids]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM documents WHERE collection = ? AND record_id = ?", rows)
+            self._conn.executemany("DELETE FROM bands WHERE collection = ? AND record_id = ?", rows)
+
+    def clear(self, collection: str) -> None:
+        """[CREATE] Drop every entry of a collection (before a rebuild)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM documents WHERE collection = ?", (collection,))
+            self._conn.execute("DELETE FROM bands WHERE collection = ?", (collection,))
+
+    def count(self, collection: str) -> int:
+        """[CREATE] Number of indexed documents for a collection."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM documents WHERE collection = ?", (collection,)
+            ).fetchone()
+        return int(row[0])
+
+    def token_totals(self, collection: str) -> Tuple[int, int]:
+        """[CREATE] (total tokens, counted documents) of a collection; zeros if never recorded."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT total_tokens, counted_documents FROM token_totals WHERE collection = ?",
+                (collection,),
+            ).fetchone()
+        return (int(row[0]), int(row[1])) if row else (0, 0)
+
+    def seed_token_totals(self, collection: str, total_tokens: int, counted_documents: int) -> None:
+        """[CREATE] Record initial totals unless the collection already has some."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO token_totals (collection, total_tokens, counted_documents)"
+                " VALUES (?, ?, ?)",
+                (collection, max(0, total_tokens), max(0, counted_documents)),
+            )
+
+    def adjust_token_totals(self, collection: str, tokens: int, documents: int) -> None:
+        """[CREATE] Atomically add (or, when negative, subtract) tokens and documents."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO token_totals (collection, total_tokens, counted_documents)"
+                " VALUES (?, MAX(0, ?), MAX(0, ?)) ON CONFLICT (collection) DO UPDATE SET"
+                " total_tokens = MAX(0, total_tokens + ?), counted_documents = MAX(0, counted_documents + ?)",
+                (collection, tokens, documents, tokens, documents),
+            )
+
+    def set_token_totals(self, collection: str, total_tokens: int, counted_documents: int) -> None:
+        """[CREATE] Replace a collection's totals (after a recount)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO token_totals (collection, total_tokens, counted_documents)"
+                " VALUES (?, ?, ?)",
+                (collection, max(0, total_tokens), max(0, counted_documents)),
+            )
+
+    def find_exact(
+        self,
+        collection: str,
+        content_hash: str,
+        agent_id: Optional[str],
+        file_name: Optional[str],
+    ) -> Optional[str]:
+        """[CREATE] ID of a stored document with the same (agent, file, hash) key, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record_id FROM documents WHERE collection = ? AND content_hash = ?"
+                " AND agent_id IS ? AND file_name IS ? LIMIT 1",
+                (collection, content_hash, agent_id, file_name),
+            ).fetchone()
+        return row[0] if row else None
+
+    def find_near(
+        self,
+        collection: str,
+        signature: int,
+        agent_id: Optional[str],
+        max_distance: int = MAX_NEAR_DISTANCE,
+    ) -> Optional[str]:
+        """
+        [CREATE] ID of a stored document of the same agent whose SimHash is within ``max_distance``.
+
+        Raises:
+            ValueError: If ``max_distance`` exceeds what the banding can guarantee.
+        """
+        if max_distance > MAX_NEAR_DISTANCE:
+            raise ValueError(f"max_distance must be at most {MAX_NEAR_DISTANCE}.")
+        clauses = " OR ".join("(b.band = ? AND b.value = ?)" for _ in range(BANDS))
+        params: list = [collection]
+        for band, value in enumerate(_bands(signature)):
+            params.extend([band, value])
+        params.append(agent_id)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT d.record_id, d.signature FROM bands b"
+                " JOIN documents d ON d.collection = b.collection AND d.record_id = b.record_id"
+                f" WHERE b.collection = ? AND ({clauses}) AND d.agent_id IS ?",
+                params,
+            ).fetchall()
+        for record_id, stored in rows:
+            if hamming_distance(signature, int(stored, 16)) <= max_distance:
+                return record_id
+        return None
+
+    def close(self) -> None:
+        """[CREATE] Close the SQLite connection."""
+        with self._lock:
+            self._conn.close()
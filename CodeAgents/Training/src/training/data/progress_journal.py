@@ -0,0 +1,305 @@
+"""
+Module: progress_journal.py
+Purpose: Append-only per-agent progress journal with checkpoints and compaction.
+
+Each save appends one JSON line holding only the fields that changed since
+the previous save (the first entry of a journal holds the full record).
+Every ``checkpoint_every`` entries the current state is written to a
+checkpoint file with an atomic rename and the log is truncated. Recovery
+loads the checkpoint and replays the log entries with a higher sequence
+number, so a crash between checkpointing and truncation never applies an
+entry twice, and a torn final line (crash mid-append) is ignored. Replay
+needs no lock: a sequence gap, or a checkpoint replaced while the log was
+being read, means a compaction ran concurrently, and the replay is retried.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-18T22:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Saves between checkpoints; bounds replay work and log size
+DEFAULT_CHECKPOINT_EVERY = 100
+
+# Lock-free replays retried after racing a compaction
+_REPLAY_ATTEMPTS = 5
+
+_MISSING = object()
+
+
+class _CompactedDuringReplay(Exception):
+    """The log was compacted between reading the checkpoint and reading the log."""
+
+
+def diff_state(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, list]:
+    """
+    [CREATE] Changes turning ``old`` into ``new``.
+
+    Nested dicts are compared key by key; any other value (including lists)
+    is replaced whole. Paths are key lists so keys may contain any character.
+
+    Returns:
+        Dict[str, list]: ``set`` as [path, value] pairs and ``unset`` as paths.
+    """
+    delta: Dict[str, list] = {"set": [], "unset": []}
+    _diff(old, new, [], delta)
+    return delta
+
+
+def _diff(old: Dict[str, Any], new: Dict[str, Any], path: List[str], delta: Dict[str, list]) -> None:
+    for key, value in new.items():
+        previous = old.get(key, _MISSING)
+        if isinstance(previous, dict) and isinstance(value, dict):
+            _diff(previous, value, path + [key], delta)
+        elif previous is _MISSING or previous != value:
+            delta["set"].append([path + [key], value])
+    for key in old:
+        if key not in new:
+            delta["unset"].append(path + [key])
+
+
+def apply_delta(state: Dict[str, Any], delta: Dict[str, list]) -> Dict[str, Any]:
+    """[CREATE] Apply a :func:`diff_state` delta to ``state`` in place and return it."""
+    for path, value in delta.get("set", []):
+        parent = state
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[path[-1]] = value
+    for path in delta.get("unset", []):
+        parent = state
+        for key in path[:-1]:
+            parent = parent.get(key, {})
+        parent.pop(path[-1], None)
+    return state
+
+
+@dataclass
+class _JournalState:
+    """
+    Last known state of one agent's journal.
+
+    Valid while the log still ends at ``log_size`` (the end of its last
+    complete entry) and the checkpoint is unchanged.
+    """
+
+    data: Dict[str, Any]
+    seq: int
+    entries_since_checkpoint: int
+    log_size: int
+    # (inode, mtime) of the checkpoint; each checkpoint is a new file via rename
+    checkpoint_mark: Tuple[int, int] = (0, 0)
+
+
+class ProgressJournal:
+    """
+    [CREATE] Journaled storage of JSON-serialisable progress records.
+
+    Args:
+        directory: Directory for ``<agent>.log`` and ``<agent>.checkpoint.json`` files.
+        checkpoint_every: Log entries after which the state is checkpointed and the log compacted.
+
+    Thread Safety:
+        Not synchronised; callers hold the agent's lock around ``append`` and
+        ``checkpoint``. ``recover`` may run concurrently with a writer.
+
+    Example:
+        >>> journal = ProgressJournal(Path("progress/journal"))
+        >>> journal.append("ClaudeCode", {"xp": {"total": 10}})
+        >>> journal.recover("ClaudeCode")
+        {'xp': {'total': 10}}
+    """
+
+    def __init__(self, directory: Path, checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY) -> None:
+        if checkpoint_every <= 0:
+            raise ValueError("checkpoint_every must be greater than zero.")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_every = checkpoint_every
+        self._states: Dict[str, _JournalState] = {}
+        self.appends = 0
+        self.checkpoints = 0
+
+    def log_path(self, agent_id: str) -> Path:
+        return self.directory / f"{agent_id}.log"
+
+    def checkpoint_path(self, agent_id: str) -> Path:
+        return self.directory / f"{agent_id}.checkpoint.json"
+
+    def agents(self) -> List[str]:
+        """[CREATE] Agents with a log or checkpoint."""
+        agents = {path.name[: -len(".checkpoint.json")] for path in self.directory.glob("*.checkpoint.json")}
+        agents.update(path.stem for path in self.directory.glob("*.log"))
+        return sorted(agents)
+
+    def exists(self, agent_id: str) -> bool:
+        return self.log_path(agent_id).exists() or self.checkpoint_path(agent_id).exists()
+
+    def append(self, agent_id: str, data: Dict[str, Any]) -> bool:
+        """
+        [CREATE] Record the new state of an agent.
+
+        Appends (and fsyncs) one line with the changes since the last entry,
+        checkpointing and compacting the log every ``checkpoint_every`` entries.
+
+        Returns:
+            bool: False if nothing changed and no entry was written.
+        """
+        # Compare and store the JSON form so datetimes etc. diff like with like
+        data = json.loads(json.dumps(data, default=str, ensure_ascii=False))
+        state = self._current_state(agent_id)
+        if state is None:
+            entry: Dict[str, Any] = {"seq": 1, "full": data}
+            seq, since_checkpoint = 1, 1
+        else:
+            delta = diff_state(state.data, data)
+            if not delta["set"] and not delta["unset"]:
+                return False
+            seq, since_checkpoint = state.seq + 1, state.entries_since_checkpoint + 1
+            entry = {"seq": seq, "delta": delta}
+
+        log_path = self.log_path(agent_id)
+        valid_size = state.log_size if state is not None else 0
+        if log_path.exists() and log_path.stat().st_size > valid_size:
+            # Drop a torn tail left by a crashed append so this entry starts on its own line
+            with open(log_path, "r+b") as handle:
+                handle.truncate(valid_size)
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with open(log_path, "a", encoding="utf-8") as handle:
+            handle.write(line)
+            handle.flush()
+            os.fsync(handle.fileno())
+        self.appends += 1
+
+        self._states[agent_id] = _JournalState(
+            data,
+            seq,
+            since_checkpoint,
+            log_path.stat().st_size,
+            state.checkpoint_mark if state is not None else (0, 0),
+        )
+        if since_checkpoint >= self.checkpoint_every:
+            self.checkpoint(agent_id)
+        return True
+
+    def checkpoint(self, agent_id: str) -> None:
+        """[CREATE] Write the current state atomically, then truncate the log."""
+        state = self._current_state(agent_id)
+        if state is None:
+            return
+        checkpoint_path = self.checkpoint_path(agent_id)
+        temp_path = checkpoint_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump({"seq": state.seq, "data": state.data}, handle, ensure_ascii=False)
+            handle.flush()
+            os.fsync(handle.fileno())
+        temp_path.replace(checkpoint_path)
+        # Entries up to state.seq are covered; a crash before this truncation is harmless
+        self.log_path(agent_id).write_text("", encoding="utf-8")
+        self._states[agent_id] = _JournalState(
+            state.data, state.seq, 0, 0, _mark(checkpoint_path.stat())
+        )
+        self.checkpoints += 1
+
+    def recover(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """[CREATE] Latest state: the checkpoint plus every later log entry (None if unknown)."""
+        state = self._current_state(agent_id)
+        return copy.deepcopy(state.data) if state is not None else None
+
+    def delete(self, agent_id: str) -> None:
+        """[CREATE] Remove an agent's log and checkpoint."""
+        for path in (self.log_path(agent_id), self.checkpoint_path(agent_id)):
+            if path.exists():
+                path.unlink()
+        self._states.pop(agent_id, None)
+
+    def log_bytes(self) -> int:
+        """[CREATE] Total size of the (uncompacted) logs."""
+        return sum(path.stat().st_size for path in self.directory.glob("*.log"))
+
+    def _current_state(self, agent_id: str) -> Optional[_JournalState]:
+        cached = self._states.get(agent_id)
+        # Another writer appended or compacted since we last looked
+        if cached is None or (cached.log_size, cached.checkpoint_mark) != self._file_marks(agent_id):
+            cached = self._replay(agent_id)
+            if cached is not None:
+                self._states[agent_id] = cached
+        return cached
+
+    def _file_marks(self, agent_id: str) -> Tuple[int, Tuple[int, int]]:
+        log_path = self.log_path(agent_id)
+        checkpoint_path = self.checkpoint_path(agent_id)
+        return (
+            log_path.stat().st_size if log_path.exists() else 0,
+            _mark(checkpoint_path.stat()) if checkpoint_path.exists() else (0, 0),
+        )
+
+    def _replay(self, agent_id: str) -> Optional[_JournalState]:
+        for _ in range(_REPLAY_ATTEMPTS):
+            try:
+                return self._replay_once(agent_id)
+            except _CompactedDuringReplay:
+                continue
+        raise RuntimeError(f"Progress journal for {agent_id} kept changing during replay.")
+
+    def _replay_once(self, agent_id: str) -> Optional[_JournalState]:
+        data: Optional[Dict[str, Any]] = None
+        seq = 0
+        checkpoint_mark = (0, 0)
+        checkpoint_path = self.checkpoint_path(agent_id)
+        if checkpoint_path.exists():
+            with open(checkpoint_path, "r", encoding="utf-8") as handle:
+                checkpoint_mark = _mark(os.fstat(handle.fileno()))
+                checkpoint = json.load(handle)
+            data, seq = checkpoint["data"], int(checkpoint["seq"])
+
+        applied = 0
+        log_path = self.log_path(agent_id)
+        log_size = 0
+        if log_path.exists():
+            for entry, end_offset in _read_entries(log_path):
+                log_size = end_offset
+                if entry["seq"] <= seq:
+                    continue
+                if "full" in entry:
+                    data = entry["full"]
+                elif data is None or entry["seq"] != seq + 1:
+                    raise _CompactedDuringReplay()
+                else:
+                    apply_delta(data, entry["delta"])
+                seq = entry["seq"]
+                applied += 1
+
+        # A checkpoint replaced after we read it may come with a log already truncated
+        if checkpoint_mark != (_mark(checkpoint_path.stat()) if checkpoint_path.exists() else (0, 0)):
+            raise _CompactedDuringReplay()
+        if data is None:
+            return None
+        return _JournalState(data, seq, applied, log_size, checkpoint_mark)
+
+
+def _mark(stat: os.stat_result) -> Tuple[int, int]:
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _read_entries(path: Path) -> List[Tuple[Dict[str, Any], int]]:
+    """Complete, parseable log entries with the byte offset after each one."""
+    entries: List[Tuple[Dict[str, Any], int]] = []
+    offset = 0
+    with open(path, "rb") as handle:
+        for raw in handle:
+            offset += len(raw)
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                entries.append((json.loads(raw), offset))
+            except ValueError:
+                break
+    return entries
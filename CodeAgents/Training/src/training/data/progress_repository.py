@@ -2,17 +2,27 @@
 Progress persistence repository for agent training data.
 
 Provides JSON-based storage for AgentProgress with atomic writes,
-history tracking, and backup capabilities.
+history tracking, and backup capabilities. An optional write-behind mode
+coalesces frequent saves in memory and flushes them periodically, and an
+optional journaled storage mode replaces full-file rewrites with small
+appends to a per-agent log. Several processes may share one data directory:
+writers serialise on persistent per-agent lock files and readers never lock.
 """
 
+import atexit
+import contextlib
 import json
 import shutil
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from filelock import FileLock
 
 from ..models.progress import AgentProgress
+from .leaderboard_index import LeaderboardEntry, LeaderboardIndex
+from .progress_journal import DEFAULT_CHECKPOINT_EVERY, ProgressJournal
+from .snapshot_store import DEFAULT_KEEP, SnapshotStore
 
 
 class ProgressRepository:
@@ -21,15 +31,65 @@ class ProgressRepository:
 
     Uses JSON files with atomic writes to ensure data integrity.
     Maintains progress history for rollback and analysis.
+
+    In write-behind mode ``save`` only records the latest progress per agent
+    in memory; dirty agents are written (with the same atomic rename) every
+    ``flush_interval`` seconds, on :meth:`flush`, on :meth:`close` and at
+    interpreter exit. Saves that replace a still-pending one are counted in
+    ``coalesced_writes``. Snapshot saves are always written immediately.
+
+    With ``storage="journal"`` a save appends the changed fields to
+    ``journal/<agent>.log`` instead of rewriting ``current/<agent>.json`` and
+    copying the previous file to ``backups/``; the log is checkpointed and
+    compacted every ``checkpoint_every`` saves and replayed on load. Agents
+    saved before switching to the journal are still read from ``current/``.
+
+    Multi-process access:
+        Writers take ``locks/<agent>.lock``, a lock file that is never
+        deleted, so every process locks the same inode. Readers take no
+        lock: files are replaced by atomic rename and journal replay
+        tolerates concurrent appends and compactions, so ``load`` never
+        waits for a writer. Use :meth:`update` for read-modify-write cycles
+        that must not lose concurrent updates; plain ``save`` is last-writer-wins.
+
+    Every write also updates ``leaderboard.sqlite3``, a compact index of
+    level, XP, streak and last activity per agent, which serves
+    :meth:`leaderboard` and :meth:`get_stats` without parsing progress files.
+    In write-behind mode the index follows flushed state.
+
+    Historical snapshots are listed in a per-agent manifest with sortable
+    names (see :class:`SnapshotStore`); with ``snapshot_deltas=True`` all but
+    the newest snapshot are kept as deltas.
     """
 
-    def __init__(self, data_dir: Optional[Path] = None):
+    STORAGE_MODES = ("files", "journal")
+
+    def __init__(
+        self,
+        data_dir: Optional[Path] = None,
+        write_behind: bool = False,
+        flush_interval: float = 5.0,
+        storage: str = "files",
+        checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+        snapshot_deltas: bool = False,
+        snapshots_to_keep: int = DEFAULT_KEEP,
+    ):
         """
         Initialize progress repository.
 
         Args:
             data_dir: Directory for storing progress files (default: ./progress_data)
+            write_behind: Buffer saves in memory and flush them in the background
+            flush_interval: Seconds between background flushes in write-behind mode
+            storage: "files" (one JSON file per agent) or "journal" (append-only log)
+            checkpoint_every: Journal saves between checkpoints in journal mode
+            snapshot_deltas: Store older history snapshots as deltas
+            snapshots_to_keep: History snapshots retained per agent
         """
+        if flush_interval <= 0:
+            raise ValueError("flush_interval must be greater than zero.")
+        if storage not in self.STORAGE_MODES:
+            raise ValueError(f"storage must be one of {self.STORAGE_MODES}.")
         self.data_dir = Path(data_dir or "progress_data")
         self.data_dir.mkdir(parents=True, exist_ok=True)
 
@@ -41,6 +101,33 @@ class ProgressRepository:
         self.current_dir.mkdir(exist_ok=True)
         self.history_dir.mkdir(exist_ok=True)
         self.backups_dir.mkdir(exist_ok=True)
+        self.snapshots = SnapshotStore(self.history_dir, keep=snapshots_to_keep, deltas=snapshot_deltas)
+        self.locks_dir = self.data_dir / "locks"
+        self.locks_dir.mkdir(exist_ok=True)
+        self._locks: Dict[str, FileLock] = {}
+        self._locks_guard = threading.Lock()
+
+        self._leaderboard_index: Optional[LeaderboardIndex] = None
+        self._leaderboard_checked = False
+
+        self.storage = storage
+        self.journal: Optional[ProgressJournal] = None
+        if storage == "journal":
+            self.journal = ProgressJournal(self.data_dir / "journal", checkpoint_every)
+
+        # Write-behind state
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.coalesced_writes = 0
+        self.flushed_writes = 0
+        self._pending: Dict[str, AgentProgress] = {}
+        self._pending_lock = threading.Lock()
+        # Serialises flushes so an older state can never overwrite a newer one
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if write_behind:
+            atexit.register(self.close)
 
     def save(
         self,
@@ -48,22 +135,169 @@ class ProgressRepository:
         create_snapshot: bool = False
     ) -> bool:
         """
-        Save agent progress to disk with atomic write.
+        Save agent progress.
+
+        Writes through to disk, or in write-behind mode queues the latest
+        state of the agent for the next flush.
 
         Args:
             progress: AgentProgress object to save
             create_snapshot: Whether to create a historical snapshot
 
         Returns:
-            True if save successful, False otherwise
+            True if save successful (or queued), False otherwise
+        """
+        if not self.write_behind or create_snapshot or self._stop.is_set():
+            with self._write_behind_guard():
+                with self._pending_lock:
+                    self._pending.pop(progress.agent_id, None)
+                return self._write(progress, create_snapshot)
+
+        with self._pending_lock:
+            if progress.agent_id in self._pending:
+                self.coalesced_writes += 1
+            # Copy so later in-place edits by the caller do not leak into the queued state
+            self._pending[progress.agent_id] = progress.model_copy(deep=True)
+        self._start_flusher()
+        return True
+
+    def update(
+        self,
+        agent_id: str,
+        mutate: Callable[[Optional[AgentProgress]], Optional[AgentProgress]],
+        create_snapshot: bool = False,
+    ) -> Optional[AgentProgress]:
+        """
+        Atomically read, modify and write an agent's progress.
+
+        The agent's lock is held from the read to the write, so concurrent
+        updates from other threads or processes are never lost. In
+        write-behind mode the agent's pending save is written first.
+
+        Args:
+            agent_id: Agent identifier
+            mutate: Receives the stored progress (None if absent) and returns
+                the progress to store, or None to leave it unchanged
+            create_snapshot: Whether to create a historical snapshot
+
+        Returns:
+            The stored progress, or None if ``mutate`` returned None
+
+        Raises:
+            filelock.Timeout: If the agent's lock cannot be acquired in time
+        """
+        with self._write_behind_guard(), self._agent_lock(agent_id):
+            with self._pending_lock:
+                pending = self._pending.pop(agent_id, None)
+            if pending is not None:
+                self._write_locked(pending)
+            progress = mutate(self._read(agent_id))
+            if progress is not None:
+                self._write_locked(progress, create_snapshot)
+            return progress
+
+    def flush(self) -> int:
+        """
+        Write every pending agent to disk.
+
+        Returns:
+            Number of agents written
+        """
+        with self._flush_lock:
+            # Entries stay queued until written, so loads during the flush still see them
+            with self._pending_lock:
+                pending = dict(self._pending)
+
+            written = 0
+            for agent_id, progress in pending.items():
+                if not self._write(progress):
+                    continue  # keep the state for the next attempt
+                written += 1
+                with self._pending_lock:
+                    # A newer save queued meanwhile is left for the next flush
+                    if self._pending.get(agent_id) is progress:
+                        del self._pending[agent_id]
+            self.flushed_writes += written
+            return written
+
+    def close(self) -> None:
+        """Stop the background flusher and write pending saves."""
+        self._stop.set()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join(timeout=self.flush_interval + 1)
+        self.flush()
+
+    def _start_flusher(self) -> None:
+        if self._flusher is not None or self._stop.is_set():
+            return
+        with self._pending_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_loop, name="progress-flusher", daemon=True
+                )
+                self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _write_behind_guard(self):
+        # Flushes and write-throughs take the flush lock before agent locks
+        return self._flush_lock if self.write_behind else contextlib.nullcontext()
+
+    def _agent_lock(self, agent_id: str) -> FileLock:
+        """
+        Inter-process lock for one agent's writes.
+
+        The lock file persists: deleting it after release would let another
+        process lock a fresh inode at the same path while a third still holds
+        the old one. One (thread-local, re-entrant) lock object is kept per agent.
         """
-        file_path = self.current_dir / f"{progress.agent_id}.json"
-        temp_path = file_path.with_suffix(".tmp")
-        lock_path = file_path.with_suffix(".lock")
+        with self._locks_guard:
+            lock = self._locks.get(agent_id)
+            if lock is None:
+                lock = self._locks[agent_id] = FileLock(
+                    str(self.locks_dir / f"{agent_id}.lock"), timeout=10
+                )
+            return lock
+
+    def _pending_copy(self, agent_id: str) -> Optional[AgentProgress]:
+        with self._pending_lock:
+            progress = self._pending.get(agent_id)
+        return progress.model_copy(deep=True) if progress is not None else None
+
+    def _write(self, progress: AgentProgress, create_snapshot: bool = False) -> bool:
+        """
+        Save agent progress to disk under the agent's lock.
+
+        Args:
+            progress: AgentProgress object to save
+            create_snapshot: Whether to create a historical snapshot
 
+        Returns:
+            True if save successful, False otherwise
+        """
         try:
-            # Use file lock to prevent concurrent writes
-            with FileLock(str(lock_path), timeout=10):
+            with self._agent_lock(progress.agent_id):
+                self._write_locked(progress, create_snapshot)
+            return True
+        except Exception as e:
+            print(f"Error saving progress for {progress.agent_id}: {e}")
+            return False
+
+    def _write_locked(self, progress: AgentProgress, create_snapshot: bool = False) -> None:
+        """
+        Write agent progress; the caller holds the agent's lock.
+
+        Files are written to a temporary file and atomically renamed over the
+        current one; in journal mode this is one append to the agent's log.
+        """
+        if self.journal is not None:
+            self.journal.append(progress.agent_id, progress.model_dump())
+        else:
+            file_path = self.current_dir / f"{progress.agent_id}.json"
+            temp_path = file_path.with_suffix(".tmp")
+            try:
                 # Write to temporary file
                 with open(temp_path, "w", encoding="utf-8") as f:
                     json.dump(
@@ -74,35 +308,24 @@ class ProgressRepository:
                         ensure_ascii=False
                     )
 
-                # Atomic rename (on POSIX) or copy (on Windows)
                 if file_path.exists():
                     # Backup existing file
                     backup_path = self.backups_dir / f"{progress.agent_id}_last.json"
                     shutil.copy2(file_path, backup_path)
 
-                # Replace old file with new one
+                # Atomic rename: readers see the old or the new file, never a partial one
                 temp_path.replace(file_path)
+            except Exception:
+                # Clean up temp file if it exists
+                if temp_path.exists():
+                    temp_path.unlink()
+                raise
 
-                # Create historical snapshot if requested
-                if create_snapshot:
-                    self._create_snapshot(progress)
-
-                return True
-
-        except Exception as e:
-            print(f"Error saving progress for {progress.agent_id}: {e}")
-            # Clean up temp file if it exists
-            if temp_path.exists():
-                temp_path.unlink()
-            return False
+        self.leaderboard_index.upsert([LeaderboardEntry.from_progress(progress)])
 
-        finally:
-            # Clean up lock file
-            if lock_path.exists():
-                try:
-                    lock_path.unlink()
-                except Exception:
-                    pass
+        # Create historical snapshot if requested
+        if create_snapshot:
+            self._create_snapshot(progress)
 
     def load(self, agent_id: str) -> Optional[AgentProgress]:
         """
@@ -114,6 +337,22 @@ class ProgressRepository:
         Returns:
             AgentProgress object or None if not found
         """
+        pending = self._pending_copy(agent_id)
+        if pending is not None:
+            return pending
+        return self._read(agent_id)
+
+    def _read(self, agent_id: str) -> Optional[AgentProgress]:
+        """Read stored progress without taking a lock."""
+        if self.journal is not None and self.journal.exists(agent_id):
+            try:
+                data = self.journal.recover(agent_id)
+                if data is not None:
+                    return AgentProgress(**data)
+            except Exception as e:
+                print(f"Error replaying progress journal for {agent_id}: {e}")
+                return None
+
         file_path = self.current_dir / f"{agent_id}.json"
 
         if not file_path.exists():
@@ -150,6 +389,11 @@ class ProgressRepository:
         Returns:
             True if progress file exists
         """
+        with self._pending_lock:
+            if agent_id in self._pending:
+                return True
+        if self.journal is not None and self.journal.exists(agent_id):
+            return True
         file_path = self.current_dir / f"{agent_id}.json"
         return file_path.exists()
 
@@ -163,10 +407,45 @@ class ProgressRepository:
         Returns:
             True if deletion successful
         """
+        # Holding the flush lock keeps an in-progress flush from rewriting the agent
+        with self._write_behind_guard():
+            with self._pending_lock:
+                discarded = self._pending.pop(agent_id, None) is not None
+
+            try:
+                lock = self._agent_lock(agent_id)
+                lock.acquire()
+            except Exception as e:
+                print(f"Error locking progress for {agent_id}: {e}")
+                return False
+
+            try:
+                deleted = self._delete_locked(agent_id, discarded)
+                if deleted:
+                    self.leaderboard_index.remove(agent_id)
+                return deleted
+            finally:
+                lock.release()
+
+    def _delete_locked(self, agent_id: str, discarded: bool) -> bool:
+        """Back up and remove stored progress; the caller holds the agent's lock."""
+        if self.journal is not None and self.journal.exists(agent_id):
+            try:
+                # Keep the replayed state as the deletion backup
+                timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+                backup_path = self.backups_dir / f"{agent_id}_deleted_{timestamp}.json"
+                with open(backup_path, "w", encoding="utf-8") as f:
+                    json.dump(self.journal.recover(agent_id), f, indent=2, ensure_ascii=False)
+                self.journal.delete(agent_id)
+                discarded = True
+            except Exception as e:
+                print(f"Error deleting progress journal for {agent_id}: {e}")
+                return False
+
         file_path = self.current_dir / f"{agent_id}.json"
 
         if not file_path.exists():
-            return False
+            return discarded
 
         try:
             # Backup before deletion
@@ -189,10 +468,16 @@ class ProgressRepository:
         Returns:
             List of agent IDs
         """
-        agent_ids = []
+        agent_ids = set()
 
         for file_path in self.current_dir.glob("*.json"):
-            agent_ids.append(file_path.stem)
+            agent_ids.add(file_path.stem)
+
+        if self.journal is not None:
+            agent_ids.update(self.journal.agents())
+
+        with self._pending_lock:
+            agent_ids.update(self._pending)
 
         return sorted(agent_ids)
 
@@ -212,6 +497,49 @@ class ProgressRepository:
 
         return progress_dict
 
+    @property
+    def leaderboard_index(self) -> LeaderboardIndex:
+        """Leaderboard index, opened on first use."""
+        with self._locks_guard:
+            if self._leaderboard_index is None:
+                self._leaderboard_index = LeaderboardIndex(self.data_dir / "leaderboard.sqlite3")
+            return self._leaderboard_index
+
+    def leaderboard(self, top: Optional[int] = 10, order_by: str = "xp") -> List[LeaderboardEntry]:
+        """
+        Highest-ranked agents, read from the leaderboard index.
+
+        Args:
+            top: Number of agents to return (None for all)
+            order_by: "xp", "level", "streak" or "last_active"
+
+        Returns:
+            List of LeaderboardEntry, best first
+        """
+        self._ensure_leaderboard()
+        return self.leaderboard_index.top(top, order_by)
+
+    def rebuild_leaderboard(self) -> int:
+        """
+        Rebuild the leaderboard index from stored progress.
+
+        Returns:
+            Number of agents indexed
+        """
+        entries = [LeaderboardEntry.from_progress(progress) for progress in self.load_all().values()]
+        self.leaderboard_index.replace(entries)
+        self._leaderboard_checked = True
+        return len(entries)
+
+    def _ensure_leaderboard(self) -> None:
+        # Agents saved before the index existed are only picked up by a full rebuild;
+        # the persisted marker makes that happen once, however many agents were indexed since
+        if self._leaderboard_checked:
+            return
+        if not self.leaderboard_index.is_built():
+            self.rebuild_leaderboard()
+        self._leaderboard_checked = True
+
     def get_history(
         self,
         agent_id: str,
@@ -227,35 +555,20 @@ class ProgressRepository:
         Returns:
             List of snapshot dictionaries with metadata
         """
-        history = []
-        agent_history_dir = self.history_dir / agent_id
-
-        if not agent_history_dir.exists():
-            return history
-
-        # Collect all snapshot files
-        snapshot_files = sorted(
-            agent_history_dir.glob("*.json"),
-            key=lambda p: p.stat().st_mtime,
-            reverse=True
-        )
-
-        if limit:
-            snapshot_files = snapshot_files[:limit]
-
-        for snapshot_file in snapshot_files:
-            try:
-                with open(snapshot_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    history.append({
-                        "timestamp": snapshot_file.stem,
-                        "file_path": str(snapshot_file),
-                        "data": data,
-                    })
-            except Exception as e:
-                print(f"Error loading snapshot {snapshot_file}: {e}")
-
-        return history
+        try:
+            snapshots = self.snapshots.latest(agent_id, limit or None)
+        except Exception as e:
+            print(f"Error loading snapshots for {agent_id}: {e}")
+            return []
+
+        return [
+            {
+                "timestamp": snapshot.name,
+                "file_path": str(snapshot.path),
+                "data": snapshot.data,
+            }
+            for snapshot in snapshots
+        ]
 
     def restore_from_snapshot(
         self,
@@ -272,21 +585,18 @@ class ProgressRepository:
         Returns:
             Restored AgentProgress or None if failed
         """
-        snapshot_path = self.history_dir / agent_id / f"{timestamp}.json"
-
-        if not snapshot_path.exists():
-            print(f"Snapshot not found: {snapshot_path}")
-            return None
-
         try:
-            with open(snapshot_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                progress = AgentProgress(**data)
+            data = self.snapshots.get(agent_id, timestamp)
+            if data is None:
+                print(f"Snapshot not found: {agent_id}/{timestamp}")
+                return None
 
-                # Save as current
-                self.save(progress, create_snapshot=False)
+            progress = AgentProgress(**data)
 
-                return progress
+            # Save as current
+            self.save(progress, create_snapshot=False)
+
+            return progress
 
         except Exception as e:
             print(f"Error restoring snapshot for {agent_id}: {e}")
@@ -296,53 +606,16 @@ class ProgressRepository:
         """
         Create a historical snapshot of agent progress.
 
+        Retention (``snapshots_to_keep``) is applied from the manifest.
+
         Args:
             progress: AgentProgress to snapshot
         """
-        agent_history_dir = self.history_dir / progress.agent_id
-        agent_history_dir.mkdir(exist_ok=True)
-
-        # Use timestamp as filename
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        snapshot_path = agent_history_dir / f"{timestamp}.json"
-
         try:
-            with open(snapshot_path, "w", encoding="utf-8") as f:
-                json.dump(
-                    progress.model_dump(),
-                    f,
-                    indent=2,
-                    default=str,
-                    ensure_ascii=False
-                )
-
-            # Clean up old snapshots (keep last 50)
-            self._cleanup_old_snapshots(agent_history_dir, keep=50)
-
+            self.snapshots.save(progress.agent_id, progress.model_dump())
         except Exception as e:
             print(f"Error creating snapshot for {progress.agent_id}: {e}")
 
-    def _cleanup_old_snapshots(self, directory: Path, keep: int = 50):
-        """
-        Remove old snapshots, keeping only the most recent N.
-
-        Args:
-            directory: Directory containing snapshots
-            keep: Number of recent snapshots to retain
-        """
-        snapshot_files = sorted(
-            directory.glob("*.json"),
-            key=lambda p: p.stat().st_mtime,
-            reverse=True
-        )
-
-        # Delete old snapshots beyond the keep limit
-        for old_snapshot in snapshot_files[keep:]:
-            try:
-                old_snapshot.unlink()
-            except Exception as e:
-                print(f"Error deleting old snapshot {old_snapshot}: {e}")
-
     def get_stats(self) -> Dict:
         """
         Get repository statistics.
@@ -350,16 +623,24 @@ class ProgressRepository:
         Returns:
             Dictionary with repository stats
         """
+        self._ensure_leaderboard()
         stats = {
-            "total_agents": len(self.list_all()),
+            **self.leaderboard_index.summary(),
             "total_history_snapshots": 0,
             "total_backups": 0,
             "disk_usage_mb": 0,
+            "pending_writes": len(self._pending),
+            "coalesced_writes": self.coalesced_writes,
+            "flushed_writes": self.flushed_writes,
         }
 
-        # Count history snapshots
+        # Count history snapshots from the per-agent manifests
         if self.history_dir.exists():
-            stats["total_history_snapshots"] = len(list(self.history_dir.rglob("*.json")))
+            stats["total_history_snapshots"] = sum(
+                len(self.snapshots.entries(path.name))
+                for path in self.history_dir.iterdir()
+                if path.is_dir()
+            )
 
         # Count backups
         if self.backups_dir.exists():
@@ -369,6 +650,11 @@ class ProgressRepository:
         total_size = 0
         for file_path in self.data_dir.rglob("*.json"):
             total_size += file_path.stat().st_size
+        if self.journal is not None:
+            # Checkpoints are already counted with the other JSON files
+            total_size += self.journal.log_bytes()
+            stats["journal_appends"] = self.journal.appends
+            stats["journal_checkpoints"] = self.journal.checkpoints
         stats["disk_usage_mb"] = round(total_size / (1024 * 1024), 2)
 
         return stats
@@ -378,12 +664,24 @@ class ProgressRepository:
 _repository_instance: Optional[ProgressRepository] = None
 
 
-def get_progress_repository(data_dir: Optional[Path] = None) -> ProgressRepository:
+def get_progress_repository(
+    data_dir: Optional[Path] = None,
+    write_behind: bool = False,
+    flush_interval: float = 5.0,
+    storage: str = "files",
+    checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+    snapshot_deltas: bool = False,
+) -> ProgressRepository:
     """
     Get the singleton ProgressRepository instance.
 
     Args:
         data_dir: Directory for storing progress files
+        write_behind: Buffer saves in memory (only used when creating the instance)
+        flush_interval: Seconds between background flushes in write-behind mode
+        storage: "files" or "journal" (only used when creating the instance)
+        checkpoint_every: Journal saves between checkpoints in journal mode
+        snapshot_deltas: Store older history snapshots as deltas
 
     Returns:
         ProgressRepository instance
@@ -391,6 +689,8 @@ def get_progress_repository(data_dir: Optional[Path] = None) -> ProgressReposito
     global _repository_instance
 
     if _repository_instance is None:
-        _repository_instance = ProgressRepository(data_dir)
+        _repository_instance = ProgressRepository(
+            data_dir, write_behind, flush_interval, storage, checkpoint_every, snapshot_deltas
+        )
 
     return _repository_instance
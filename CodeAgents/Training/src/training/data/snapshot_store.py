@@ -0,0 +1,230 @@
+"""
+Module: snapshot_store.py
+Purpose: Manifest-indexed progress snapshot history with optional delta storage.
+
+Each agent's history directory holds its snapshots plus ``manifest.jsonl``,
+an append-only list of snapshot names in creation order. Latest-N history,
+retention cleanup and restore-by-name read the manifest instead of listing
+and stat-ing the directory, and the order no longer depends on file mtimes
+(which change when snapshots are copied or restored).
+
+With ``deltas=True`` the newest snapshot is always a full file and, when a
+new snapshot is taken, the previous newest is rewritten as a delta against
+it (reverse deltas). Dropping the oldest snapshots therefore never breaks a
+chain, and reading history newest-first applies one delta per snapshot.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-19T00:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .progress_journal import apply_delta, diff_state
+
+MANIFEST_NAME = "manifest.jsonl"
+DEFAULT_KEEP = 50
+
+
+@dataclass
+class SnapshotEntry:
+    """One manifest row; ``kind`` is ``full`` or ``delta``."""
+
+    name: str
+    kind: str = "full"
+
+    def file_name(self) -> str:
+        return f"{self.name}.json" if self.kind == "full" else f"{self.name}.delta.json"
+
+
+@dataclass
+class Snapshot:
+    """A reconstructed snapshot."""
+
+    name: str
+    path: Path
+    data: Dict[str, Any]
+
+
+def snapshot_name(now: Optional[datetime] = None) -> str:
+    """
+    [CREATE] Sortable UTC snapshot name with microsecond resolution.
+
+    Example:
+        >>> snapshot_name(datetime(2026, 10, 19, 8, 30, tzinfo=timezone.utc))
+        '20261019_083000_000000'
+    """
+    return (now or datetime.now(timezone.utc)).strftime("%Y%m%d_%H%M%S_%f")
+
+
+class SnapshotStore:
+    """
+    [CREATE] Per-agent snapshot history under one root directory.
+
+    Args:
+        root: Directory holding one sub-directory per agent.
+        keep: Snapshots retained per agent.
+        deltas: Store snapshots other than the newest as reverse deltas.
+
+    Thread Safety:
+        Not synchronised; callers hold the agent's write lock around ``save``.
+
+    Example:
+        >>> store = SnapshotStore(Path("progress/history"), deltas=True)
+        >>> name = store.save("ClaudeCode", progress.model_dump())
+        >>> store.get("ClaudeCode", name)["agent_id"]
+        'ClaudeCode'
+    """
+
+    def __init__(self, root: Path, keep: int = DEFAULT_KEEP, deltas: bool = False) -> None:
+        if keep <= 0:
+            raise ValueError("keep must be greater than zero.")
+        self.root = Path(root)
+        self.keep = keep
+        self.deltas = deltas
+
+    def agent_dir(self, agent_id: str) -> Path:
+        return self.root / agent_id
+
+    def entries(self, agent_id: str) -> List[SnapshotEntry]:
+        """[CREATE] Snapshots of an agent, oldest first."""
+        directory = self.agent_dir(agent_id)
+        manifest = directory / MANIFEST_NAME
+        if not manifest.exists():
+            return self._adopt_legacy(directory)
+
+        by_name: Dict[str, SnapshotEntry] = {}
+        with open(manifest, "r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # torn final line
+                entry = by_name.get(row["name"])
+                if entry is None:
+                    by_name[row["name"]] = SnapshotEntry(row["name"], row.get("kind", "full"))
+                else:
+                    # Later rows update an earlier snapshot (full -> delta)
+                    entry.kind = row.get("kind", entry.kind)
+        return list(by_name.values())
+
+    def save(self, agent_id: str, data: Dict[str, Any], now: Optional[datetime] = None) -> str:
+        """
+        [CREATE] Store a full snapshot, convert its predecessor to a delta if enabled, and apply retention.
+
+        Returns:
+            str: The new snapshot's name.
+        """
+        directory = self.agent_dir(agent_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        entries = self.entries(agent_id)
+        names = {entry.name for entry in entries}
+        name = base = snapshot_name(now)
+        suffix = 1
+        while name in names:
+            name = f"{base}_{suffix}"
+            suffix += 1
+
+        data = json.loads(json.dumps(data, default=str, ensure_ascii=False))
+        _write_json(directory / f"{name}.json", data, indent=2)
+        rows = [{"name": name, "kind": "full"}]
+        entries.append(SnapshotEntry(name))
+
+        previous = entries[-2] if len(entries) > 1 else None
+        converted: Optional[Path] = None
+        if self.deltas and previous is not None and previous.kind == "full":
+            converted = directory / previous.file_name()
+            with open(converted, "r", encoding="utf-8") as handle:
+                previous_data = json.load(handle)
+            previous.kind = "delta"
+            _write_json(directory / previous.file_name(), diff_state(data, previous_data))
+            rows.append({"name": previous.name, "kind": "delta"})
+
+        self._append_manifest(directory, rows)
+        if converted is not None:
+            # Only drop the full copy once the manifest points at the delta
+            converted.unlink()
+
+        if len(entries) > self.keep:
+            self._prune(directory, entries)
+        return name
+
+    def latest(self, agent_id: str, limit: Optional[int] = None) -> List[Snapshot]:
+        """[CREATE] Newest snapshots first, reconstructing deltas along the way."""
+        directory = self.agent_dir(agent_id)
+        snapshots: List[Snapshot] = []
+        current: Optional[Dict[str, Any]] = None
+        for entry in reversed(self.entries(agent_id)):
+            if limit is not None and len(snapshots) >= limit:
+                break
+            path = directory / entry.file_name()
+            with open(path, "r", encoding="utf-8") as handle:
+                stored = json.load(handle)
+            if entry.kind == "full":
+                current = stored
+            elif current is None:
+                raise ValueError(f"Snapshot {entry.name} of {agent_id} has no newer full snapshot.")
+            else:
+                current = apply_delta(copy.deepcopy(current), stored)
+            snapshots.append(Snapshot(entry.name, path, current))
+        return snapshots
+
+    def get(self, agent_id: str, name: str) -> Optional[Dict[str, Any]]:
+        """[CREATE] One snapshot by name (None if unknown)."""
+        entries = self.entries(agent_id)
+        position = next((i for i, entry in enumerate(entries) if entry.name == name), None)
+        if position is None:
+            return None
+        # Walk back from the nearest full snapshot at or after the requested one
+        newer = entries[position:]
+        full_at = next(i for i, entry in enumerate(newer) if entry.kind == "full")
+        directory = self.agent_dir(agent_id)
+        with open(directory / newer[full_at].file_name(), "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        for entry in reversed(newer[:full_at]):
+            with open(directory / entry.file_name(), "r", encoding="utf-8") as handle:
+                data = apply_delta(data, json.load(handle))
+        return data
+
+    def _prune(self, directory: Path, entries: List[SnapshotEntry]) -> None:
+        dropped, kept = entries[:-self.keep], entries[-self.keep:]
+        # Rewrite the manifest first so it never lists a missing file
+        temp_path = directory / f"{MANIFEST_NAME}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            for entry in kept:
+                handle.write(json.dumps({"name": entry.name, "kind": entry.kind}) + "\n")
+        temp_path.replace(directory / MANIFEST_NAME)
+        for entry in dropped:
+            path = directory / entry.file_name()
+            if path.exists():
+                path.unlink()
+
+    def _append_manifest(self, directory: Path, rows: List[Dict[str, str]]) -> None:
+        with open(directory / MANIFEST_NAME, "a", encoding="utf-8") as handle:
+            handle.write("".join(json.dumps(row) + "\n" for row in rows))
+
+    def _adopt_legacy(self, directory: Path) -> List[SnapshotEntry]:
+        """One-time manifest for history written before manifests (names sort by time)."""
+        if not directory.exists():
+            return []
+        names = sorted(
+            path.name[: -len(".json")]
+            for path in directory.glob("*.json")
+            if not path.name.endswith(".delta.json")
+        )
+        entries = [SnapshotEntry(name) for name in names]
+        if entries:
+            self._append_manifest(directory, [{"name": e.name, "kind": e.kind} for e in entries])
+        return entries
+
+
+def _write_json(path: Path, data: Any, indent: Optional[int] = None) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, indent=indent, ensure_ascii=False)
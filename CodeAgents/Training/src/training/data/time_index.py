@@ -0,0 +1,180 @@
+"""
+Module: time_index.py
+Purpose: Local time-ordered secondary index for Chroma collections.
+
+Chroma's ``get(where=..., limit=N)`` returns an arbitrary N matching records,
+not the newest ones. This sidecar SQLite table keeps (collection, id,
+agent_id, topic, epoch) rows under B-tree indexes, so "latest N" and time
+range lookups resolve the matching IDs in O(log n + N) and then fetch only
+those records from Chroma.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-18T17:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Protocol
+
+
+@dataclass(frozen=True)
+class IndexEntry:
+    """One indexed record."""
+
+    record_id: str
+    epoch: float
+    agent_id: Optional[str] = None
+    topic: Optional[str] = None
+
+
+class TimeLookup(Protocol):
+    """Query side of a time index: record IDs newest first, as :meth:`TimeIndex.latest` returns them."""
+
+    def latest(
+        self,
+        collection: str,
+        agent_id: Optional[str] = None,
+        topic: Optional[str] = None,
+        limit: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        offset: int = 0,
+    ) -> List[str]: ...
+
+
+class TimeIndex:
+    """
+    [CREATE] SQLite sidecar mapping (collection, agent, topic, time) to record IDs.
+
+    Args:
+        path: SQLite file, usually next to the Chroma database.
+
+    Thread Safety:
+        All statements run under an internal lock on one shared connection.
+
+    Example:
+        >>> index = TimeIndex(Path("chroma_db/time_index.sqlite3"))
+        >>> index.add("error_data", [IndexEntry("error_01J...", 1760000000.0, "ClaudeCode")])
+        >>> index.latest("error_data", agent_id="ClaudeCode", limit=5)
+        ['error_01J...']
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " collection TEXT NOT NULL, record_id TEXT NOT NULL, agent_id TEXT,"
+                " topic TEXT, epoch REAL NOT NULL, PRIMARY KEY (collection, record_id))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS by_time ON entries (collection, epoch, record_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS by_agent_time"
+                " ON entries (collection, agent_id, epoch, record_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS by_agent_topic_time"
+                " ON entries (collection, agent_id, topic, epoch, record_id)"
+            )
+
+    def add(self, collection: str, entries: Iterable[IndexEntry]) -> None:
+        """[CREATE] Insert or replace index rows."""
+        rows = [(collection, e.record_id, e.agent_id, e.topic, e.epoch) for e in entries]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (collection, record_id, agent_id, topic, epoch)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def remove(self, collection: str, record_ids: Iterable[str]) -> None:
+        """[CREATE] Drop index rows for deleted records."""
+        rows = [(collection, record_id) for record_id in record_ids]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM entries WHERE collection = ? AND record_id = ?", rows
+            )
+
+    def clear(self, collection: str) -> None:
+        """[CREATE] Drop every row of a collection (before a rebuild)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE collection = ?", (collection,))
+
+    def count(self, collection: str) -> int:
+        """[CREATE] Number of indexed records for a collection."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE collection = ?", (collection,)
+            ).fetchone()
+        return int(row[0])
+
+    def latest(
+        self,
+        collection: str,
+        agent_id: Optional[str] = None,
+        topic: Optional[str] = None,
+        limit: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        offset: int = 0,
+    ) -> List[str]:
+        """
+        [CREATE] Record IDs newest first, optionally filtered by agent, topic and time.
+
+        Args:
+            collection: Collection name.
+            agent_id: Only records of this agent.
+            topic: Only records with this topic.
+            limit: Maximum IDs to return (None for all matches).
+            start: Inclusive lower epoch bound.
+            end: Exclusive upper epoch bound.
+            offset: Matches to skip (for paging).
+
+        Returns:
+            List[str]: Matching record IDs, newest first.
+
+        Complexity:
+            O(log n + k) for k returned IDs, served from the composite indexes.
+        """
+        clauses = ["collection = ?"]
+        params: list = [collection]
+        if agent_id is not None:
+            clauses.append("agent_id = ?")
+            params.append(agent_id)
+        if topic is not None:
+            clauses.append("topic = ?")
+            params.append(topic)
+        if start is not None:
+            clauses.append("epoch >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("epoch < ?")
+            params.append(end)
+        sql = (
+            f"SELECT record_id FROM entries WHERE {' AND '.join(clauses)}"
+            " ORDER BY epoch DESC, record_id DESC"
+        )
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([-1 if limit is None else limit, offset])
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+
+    def close(self) -> None:
+        """[CREATE] Close the SQLite connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,247 @@
+"""
+Module: token_rollups.py
+Purpose: Incrementally maintained daily per-agent token usage rollups.
+
+``TokenTracker.get_agent_stats`` used to re-read and re-aggregate up to 30
+days of raw operation records per call. This SQLite sidecar keeps one row per
+agent and day with token totals by category, cost, quality and efficiency
+sums and the day's best/worst operation. Operations are folded in as the
+operation log flushes them, one UPSERT per flushed segment, so the rollups
+always match what the log holds; a stats window is assembled from at most
+one row per day (plus the distinct session IDs seen in the window). Rollups
+can be rebuilt from the operation log at any time.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-19T02:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .token_log import TokenColumns
+
+# Summed per day; names match the TokenMetrics fields they add up
+SUM_FIELDS = (
+    "prompt_tokens",
+    "context_tokens",
+    "user_input_tokens",
+    "completion_tokens",
+    "cached_tokens",
+    "total_input_tokens",
+    "total_output_tokens",
+    "total_tokens",
+    "cost_usd",
+)
+
+_COLUMNS = (
+    ("operations",)
+    + SUM_FIELDS
+    + ("quality_sum", "efficiency_sum", "best_efficiency", "best_session", "worst_efficiency", "worst_session")
+)
+
+
+@dataclass
+class DailyRollup:
+    """Aggregated operations of one agent on one day."""
+
+    agent_id: str
+    day: str
+    operations: int = 0
+    prompt_tokens: int = 0
+    context_tokens: int = 0
+    user_input_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    total_input_tokens: int = 0
+    total_output_tokens: int = 0
+    total_tokens: int = 0
+    cost_usd: float = 0.0
+    quality_sum: float = 0.0
+    efficiency_sum: float = 0.0
+    best_efficiency: Optional[float] = None
+    best_session: Optional[str] = None
+    worst_efficiency: Optional[float] = None
+    worst_session: Optional[str] = None
+
+    @classmethod
+    def from_operation(cls, agent_id: str, day: str, record: Dict[str, Any]) -> "DailyRollup":
+        """Rollup of a single operation (``TokenMetrics.model_dump()`` fields)."""
+        efficiency = record["efficiency_score"]
+        return cls(
+            agent_id=agent_id,
+            day=day,
+            operations=1,
+            quality_sum=record["output_quality_score"],
+            efficiency_sum=efficiency,
+            best_efficiency=efficiency,
+            best_session=record["session_id"],
+            worst_efficiency=efficiency,
+            worst_session=record["session_id"],
+            **{name: record[name] for name in SUM_FIELDS},
+        )
+
+    def merge(self, other: "DailyRollup") -> None:
+        """Add a later rollup of the same day; ties keep the earlier best/worst session."""
+        self.operations += other.operations
+        for name in SUM_FIELDS + ("quality_sum", "efficiency_sum"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        if other.best_efficiency is not None and (
+            self.best_efficiency is None or other.best_efficiency > self.best_efficiency
+        ):
+            self.best_efficiency, self.best_session = other.best_efficiency, other.best_session
+        if other.worst_efficiency is not None and (
+            self.worst_efficiency is None or other.worst_efficiency < self.worst_efficiency
+        ):
+            self.worst_efficiency, self.worst_session = other.worst_efficiency, other.worst_session
+
+    def row(self) -> Tuple[Any, ...]:
+        return (self.agent_id, self.day) + tuple(getattr(self, name) for name in _COLUMNS)
+
+
+class TokenRollupStore:
+    """
+    [CREATE] SQLite table of :class:`DailyRollup` rows plus per-day session IDs.
+
+    Args:
+        path: SQLite file, usually inside the token metrics directory.
+
+    Thread Safety:
+        All statements run under an internal lock on one shared connection;
+        SQLite itself serialises writers from other processes.
+
+    Example:
+        >>> rollups = TokenRollupStore(Path("token_metrics/rollups.sqlite3"))
+        >>> rollups.add("ClaudeCode", "2026-10-19", [metrics.model_dump()])
+        >>> rollups.days("ClaudeCode", since="2026-10-01")[0].operations
+        1
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollups ("
+                " agent_id TEXT NOT NULL, day TEXT NOT NULL, operations INTEGER NOT NULL,"
+                + "".join(f" {name} {'REAL' if name == 'cost_usd' else 'INTEGER'} NOT NULL," for name in SUM_FIELDS)
+                + " quality_sum REAL NOT NULL, efficiency_sum REAL NOT NULL,"
+                " best_efficiency REAL, best_session TEXT, worst_efficiency REAL, worst_session TEXT,"
+                " PRIMARY KEY (agent_id, day))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollup_sessions ("
+                " agent_id TEXT NOT NULL, day TEXT NOT NULL, session_id TEXT NOT NULL,"
+                " PRIMARY KEY (agent_id, day, session_id))"
+            )
+
+    def add(self, agent_id: str, day: str, records: Iterable[Dict[str, Any]]) -> None:
+        """[CREATE] Fold operations of one agent and day into that day's rollup (one UPSERT)."""
+        rollup: Optional[DailyRollup] = None
+        sessions: Dict[Tuple[str, str, str], None] = {}
+        for record in records:
+            operation = DailyRollup.from_operation(agent_id, day, record)
+            if rollup is None:
+                rollup = operation
+            else:
+                rollup.merge(operation)
+            sessions[(agent_id, day, record["session_id"])] = None
+        if rollup is not None:
+            self.upsert([rollup], sessions)
+
+    def upsert(self, rollups: Iterable[DailyRollup], sessions: Iterable[Tuple[str, str, str]]) -> None:
+        """[CREATE] Merge rollups into the stored rows and record session IDs."""
+        with self._lock, self._conn:
+            self._upsert_locked(rollups, sessions)
+
+    def _upsert_locked(self, rollups: Iterable[DailyRollup], sessions: Iterable[Tuple[str, str, str]]) -> None:
+        sums = ", ".join(f"{name} = {name} + excluded.{name}" for name in ("operations",) + SUM_FIELDS)
+        placeholders = ", ".join("?" for _ in range(len(_COLUMNS) + 2))
+        self._conn.executemany(
+            f"INSERT INTO rollups (agent_id, day, {', '.join(_COLUMNS)}) VALUES ({placeholders})"
+            f" ON CONFLICT (agent_id, day) DO UPDATE SET {sums},"
+            " quality_sum = quality_sum + excluded.quality_sum,"
+            " efficiency_sum = efficiency_sum + excluded.efficiency_sum,"
+            # SET expressions see the row's old values, so each pair compares alike
+            " best_session = CASE WHEN best_efficiency IS NULL OR excluded.best_efficiency > best_efficiency"
+            " THEN excluded.best_session ELSE best_session END,"
+            " best_efficiency = CASE WHEN best_efficiency IS NULL OR excluded.best_efficiency > best_efficiency"
+            " THEN excluded.best_efficiency ELSE best_efficiency END,"
+            " worst_session = CASE WHEN worst_efficiency IS NULL OR excluded.worst_efficiency < worst_efficiency"
+            " THEN excluded.worst_session ELSE worst_session END,"
+            " worst_efficiency = CASE WHEN worst_efficiency IS NULL OR excluded.worst_efficiency < worst_efficiency"
+            " THEN excluded.worst_efficiency ELSE worst_efficiency END",
+            [rollup.row() for rollup in rollups],
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO rollup_sessions (agent_id, day, session_id) VALUES (?, ?, ?)",
+            list(sessions),
+        )
+
+    def days(self, agent_id: str, since: Optional[str] = None) -> List[DailyRollup]:
+        """[CREATE] An agent's rollups on or after ``since`` (ISO date), oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT agent_id, day, {', '.join(_COLUMNS)} FROM rollups"
+                " WHERE agent_id = ? AND day >= ? ORDER BY day",
+                (agent_id, since or ""),
+            ).fetchall()
+        return [DailyRollup(*row) for row in rows]
+
+    def sessions(self, agent_id: str, since: Optional[str] = None) -> List[str]:
+        """[CREATE] Distinct session IDs of an agent on or after ``since``, in first-seen order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM rollup_sessions WHERE agent_id = ? AND day >= ?"
+                " GROUP BY session_id ORDER BY MIN(day), MIN(rowid)",
+                (agent_id, since or ""),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def total_tokens(self, agent_id: str, first_day: str, last_day: str) -> int:
+        """[CREATE] Tokens used by an agent from ``first_day`` to ``last_day`` (inclusive ISO dates)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(total_tokens), 0) FROM rollups"
+                " WHERE agent_id = ? AND day >= ? AND day <= ?",
+                (agent_id, first_day, last_day),
+            ).fetchone()
+        return int(row[0])
+
+    def rebuild(self, agent_id: str, columns: TokenColumns) -> int:
+        """
+        [CREATE] Replace an agent's rollups with ones computed from raw records.
+
+        Returns:
+            int: Number of daily rollups written.
+        """
+        by_day: Dict[str, DailyRollup] = {}
+        sessions: Dict[Tuple[str, str, str], None] = {}
+        names = ("day", "session_id", "output_quality_score", "efficiency_score") + SUM_FIELDS
+        for values in zip(*(columns[name] for name in names)):
+            record = dict(zip(names, values))
+            rollup = DailyRollup.from_operation(agent_id, record["day"], record)
+            if record["day"] in by_day:
+                by_day[record["day"]].merge(rollup)
+            else:
+                by_day[record["day"]] = rollup
+            sessions[(agent_id, record["day"], record["session_id"])] = None
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM rollups WHERE agent_id = ?", (agent_id,))
+            self._conn.execute("DELETE FROM rollup_sessions WHERE agent_id = ?", (agent_id,))
+            self._upsert_locked(by_day.values(), sessions)
+        return len(by_day)
+
+    def close(self) -> None:
+        """[CREATE] Close the SQLite connection."""
+        with self._lock:
+            self._conn.close()
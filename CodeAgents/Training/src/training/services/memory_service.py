@@ -4,8 +4,9 @@ Memory Service for the Agent Training System.
 Enhanced with token tracking, relevance decay, and context optimization.
 """
 
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, Any, Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime, timezone
 
 try:  # Optional dependency used for accurate token counting.
     import tiktoken  # type: ignore
@@ -14,12 +15,126 @@ except Exception:  # pragma: no cover - environments without tiktoken
 
 from ..data.client import ChromaDatabase
 from ..data.repositories import RepositoryRegistry
+from ..utils.token_packing import (
+    PackingCandidate,
+    decode_chunk_tokens,
+    encode_chunk_tokens,
+    leading_chunks,
+    pack_documents,
+    split_chunks,
+)
+from ..utils.streaming_stats import MetricsAggregator
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ..data.token_budget_ledger import BudgetDecision
+
+# Score metrics aggregated by summarize_agent_performance
+PERFORMANCE_METRICS = (
+    "score",
+    "time_taken",
+    "score_per_minute",
+    "tokens_processed",
+    "tokens_per_second",
+    "score_per_token",
+    "gpu_utilization_avg",
+    "gpu_memory_used_mb",
+)
+
+# Metric -> legacy "average_*" summary key
+PERFORMANCE_SUMMARY_KEYS = {
+    "score": "average_score",
+    "time_taken": "average_time_seconds",
+    "score_per_minute": "average_score_per_minute",
+    "tokens_processed": "average_tokens_processed",
+    "tokens_per_second": "average_tokens_per_second",
+    "score_per_token": "average_score_per_token",
+    "gpu_utilization_avg": "average_gpu_utilization",
+    "gpu_memory_used_mb": "average_gpu_memory_used_mb",
+}
+
+PERFORMANCE_GROUP_FIELDS = ("topic", "session_type")
+
+
+def _as_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _score_epoch(metadata: Dict[str, Any]) -> float:
+    return _as_float(metadata.get("timestamp_epoch"))
+
+
+def _score_identity(metadata: Dict[str, Any]) -> Tuple[float, Any]:
+    return _score_epoch(metadata), metadata.get("timestamp")
+
+
+def _score_entry(metadata: Dict[str, Any], topic: Optional[str]) -> Dict[str, Any]:
+    """Normalise a score record's metadata into a summary entry."""
+    score = _as_float(metadata.get("score"))
+    time_taken = _as_float(metadata.get("time_taken"))
+    return {
+        "topic": metadata.get("topic", topic or "unknown"),
+        "score": score,
+        "time_taken": time_taken,
+        "score_per_minute": (score / time_taken * 60) if time_taken > 0 else 0.0,
+        "tokens_processed": _as_float(metadata.get("tokens_processed")),
+        "tokens_per_second": _as_float(metadata.get("tokens_per_second")),
+        "score_per_token": _as_float(metadata.get("score_per_token")),
+        "gpu_utilization_avg": _as_float(metadata.get("gpu_utilization_avg")),
+        "gpu_memory_used_mb": _as_float(metadata.get("gpu_memory_used_mb")),
+        "timestamp": metadata.get("timestamp"),
+        "fatigue_level": metadata.get("fatigue_level"),
+        "files_processed": metadata.get("files_processed"),
+        "session_type": metadata.get("session_type"),
+    }
+
+
+@dataclass
+class _PerformanceRollup:
+    """Running full-history aggregate for one (agent, topic, group_by) key."""
+
+    aggregator: MetricsAggregator
+    newest_epoch: float = 0.0
+    newest_key: Optional[Tuple[float, Any]] = None
+    # Scores already folded at ``newest_epoch``; the next incremental read starts there
+    boundary: set = field(default_factory=set)
+
+    def fold(self, entry: Dict[str, Any], metadata: Dict[str, Any]) -> None:
+        self.aggregator.add(entry)
+        epoch = _score_epoch(metadata)
+        if epoch > self.newest_epoch:
+            self.newest_epoch = epoch
+            self.boundary = set()
+        if epoch == self.newest_epoch:
+            self.boundary.add(_score_identity(metadata))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "aggregator": self.aggregator.to_dict(),
+            "newest_epoch": self.newest_epoch,
+            "newest_key": list(self.newest_key) if self.newest_key is not None else None,
+            "boundary": [list(identity) for identity in self.boundary],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "_PerformanceRollup":
+        newest_key = data.get("newest_key")
+        return cls(
+            aggregator=MetricsAggregator.from_dict(data["aggregator"]),
+            newest_epoch=float(data.get("newest_epoch", 0.0)),
+            newest_key=tuple(newest_key) if newest_key is not None else None,
+            boundary={tuple(identity) for identity in data.get("boundary", [])},
+        )
 
 
 class MemoryService:
-    def __init__(self, db_path: Optional[str] = None):
-        database = ChromaDatabase(db_path) if db_path else None
-        self.registry = RepositoryRegistry(database)
+    def __init__(self, db_path: Optional[str] = None, registry: Optional[RepositoryRegistry] = None):
+        if registry is None:
+            database = ChromaDatabase(db_path) if db_path else None
+            registry = RepositoryRegistry(database)
+        self.registry = registry
 
         # Token counting encoder (fallback to simple estimation if tiktoken unavailable)
         if tiktoken is not None:
@@ -49,15 +164,68 @@ class MemoryService:
         # Fallback: rough estimation (1 token ≈ 4 characters)
         return len(text) // 4
 
-    def add_training_material(self, topic: str, file_name: str, content: str, agent_id: str = "system"):
-        """Adds training material to the memory."""
-        self.registry.training_materials.add_material(
-            topic=topic,
-            document=content,
-            agent_id=agent_id,
-            file_name=file_name,
+    def measure_document(self, content: str) -> tuple[int, str]:
+        """
+        Count a document's tokens once, for storage at ingest.
+
+        Returns:
+            Tuple of (total token count, encoded per-chunk token counts)
+        """
+        return self.count_tokens(content), encode_chunk_tokens(
+            [self.count_tokens(chunk) for chunk in split_chunks(content)]
+        )
+
+    def add_training_material(
+        self, topic: str, file_name: str, content: str, agent_id: str = "system"
+    ) -> Optional[str]:
+        """
+        Adds training material to the memory (token counts are stored with it).
+
+        Returns the new record ID, or None when the material duplicates one
+        already stored (checked before tokenizing or embedding).
+        """
+        repository = self.registry.training_materials
+        material = {"topic": topic, "document": content, "agent_id": agent_id, "file_name": file_name}
+        # The repository counts the skipped duplicate (per shard when sharded)
+        if not repository.filter_duplicates([material]):
+            return None
+        token_count, chunk_tokens = self.measure_document(content)
+        return repository.add_material(
+            **material,
+            token_count=token_count,
+            chunk_tokens=chunk_tokens,
+            skip_dedupe=True,
         )
 
+    def add_training_materials(self, materials: Iterable[Dict[str, Any]], batch_size: int = 256) -> int:
+        """
+        Add many training materials in batched writes.
+
+        Args:
+            materials: Dicts with ``topic``, ``file_name``, ``content`` and
+                optional ``agent_id`` keys
+            batch_size: Documents embedded and committed per write
+
+        Returns:
+            Number of materials written
+        """
+        repository = self.registry.training_materials
+        # Duplicates (stored or within the batch) are dropped before tokenizing
+        records = repository.filter_duplicates([
+            {
+                "topic": material["topic"],
+                "document": material["content"],
+                "agent_id": material.get("agent_id", "system"),
+                "file_name": material.get("file_name"),
+            }
+            for material in materials
+        ])
+        measured = []
+        for record in records:
+            token_count, chunk_tokens = self.measure_document(record["document"])
+            measured.append({**record, "token_count": token_count, "chunk_tokens": chunk_tokens})
+        return repository.add_materials(measured, batch_size, skip_dedupe=True)
+
     def recall_training_material(self, topic: str, limit: int = 5, agent_id: Optional[str] = None):
         """
         [REFACTOR] Retrieve training materials related to a topic (optionally agent filtered).
@@ -106,7 +274,10 @@ class MemoryService:
         self,
         agent_id: str,
         topic: Optional[str] = None,
-        limit: int = 25,
+        limit: Optional[int] = 25,
+        group_by: Optional[Sequence[str]] = None,
+        include_entries: bool = True,
+        page_size: int = 500,
     ) -> Dict[str, Any]:
         """
         [CREATE] Aggregate score/time metrics for an agent (optionally by topic).
@@ -119,28 +290,37 @@ class MemoryService:
         Parameters:
             agent_id (str): Unique agent identifier used throughout the training system.
             topic (Optional[str]): When provided, only include results for that topic.
-            limit (int): Maximum number of score entries to inspect. Must be positive.
+            limit (Optional[int]): Newest score entries to inspect. Must be positive. ``None``
+                summarises the agent's whole history from a maintained rollup.
+            group_by (Optional[Sequence[str]]): Any of "topic" and "session_type"; adds a
+                "groups" list with per-group statistics.
+            include_entries (bool): Return the inspected entries (ignored when limit is None).
+            page_size (int): Score records read per paged request.
 
         Returns:
             Dict[str, Any]: {
                 "agent_id": str,
                 "topic": Optional[str],
                 "entries": List[Dict[str, Any]],
-                "summary": Dict[str, float]
+                "summary": Dict[str, Any],  # averages plus per-metric mean/variance/percentiles
+                "groups": List[Dict[str, Any]]  # only with group_by
             }
 
         Raises:
-            ValueError: If limit <= 0 or agent_id is empty.
+            ValueError: If limit <= 0, agent_id is empty or group_by names an unknown field.
 
         Example:
-            >>> MemoryService().summarize_agent_performance("ClaudeCode", limit=10)
+            >>> MemoryService().summarize_agent_performance("ClaudeCode", limit=10, group_by=["topic"])
 
         Complexity:
-            Time: O(n) where n == number of retrieved score records.
-            Space: O(n) for the materialized summary list.
+            Time: O(n * m) for n records and m metrics, in a single streaming pass. With
+                limit=None, repeat calls (from any process) cost O(1) plus O(k) for k records
+                added since the saved rollup.
+            Space: O(page_size + m) besides the returned entries.
 
         Side Effects:
-            - Executes read queries against Chroma score collection.
+            - Executes paged read queries against the Chroma score collection.
+            - With limit=None, saves the agent's rollup to the registry's rollup store.
 
         Design Patterns:
             Repository-style data access for summarizing records.
@@ -153,95 +333,80 @@ class MemoryService:
         """
         if not agent_id:
             raise ValueError("agent_id is required to summarize performance.")
-        if limit <= 0:
+        if limit is not None and limit <= 0:
             raise ValueError("limit must be greater than zero.")
-
-        metadatas = self.registry.scores.fetch_scores(agent_id, topic, limit)
-
-        def _as_float(value: Any) -> float:
-            try:
-                return float(value)
-            except (TypeError, ValueError):
-                return 0.0
+        group_fields = tuple(group_by or ())
+        unknown = set(group_fields) - set(PERFORMANCE_GROUP_FIELDS)
+        if unknown:
+            raise ValueError(f"Unsupported group_by fields: {sorted(unknown)}")
 
         entries: List[Dict[str, Any]] = []
-        for metadata in metadatas:
-            score = _as_float(metadata.get("score"))
-            time_taken = _as_float(metadata.get("time_taken"))
-            score_per_minute = (score / time_taken * 60) if time_taken > 0 else 0.0
-            tokens_processed = _as_float(metadata.get("tokens_processed"))
-            tokens_per_second = _as_float(metadata.get("tokens_per_second"))
-            score_per_token = _as_float(metadata.get("score_per_token"))
-            gpu_utilization = _as_float(metadata.get("gpu_utilization_avg"))
-            gpu_memory = _as_float(metadata.get("gpu_memory_used_mb"))
-
-            entries.append(
-                {
-                    "topic": metadata.get("topic", topic or "unknown"),
-                    "score": score,
-                    "time_taken": time_taken,
-                    "score_per_minute": score_per_minute,
-                    "tokens_processed": tokens_processed,
-                    "tokens_per_second": tokens_per_second,
-                    "score_per_token": score_per_token,
-                    "gpu_utilization_avg": gpu_utilization,
-                    "gpu_memory_used_mb": gpu_memory,
-                    "timestamp": metadata.get("timestamp"),
-                    "fatigue_level": metadata.get("fatigue_level"),
-                    "files_processed": metadata.get("files_processed"),
-                    "session_type": metadata.get("session_type"),
-                }
-            )
-
-        if not entries:
-            return {
-                "agent_id": agent_id,
-                "topic": topic,
-                "entries": [],
-                "summary": {
-                    "sample_size": 0,
-                    "average_score": 0.0,
-                    "average_time_seconds": 0.0,
-                    "average_score_per_minute": 0.0,
-                },
-            }
-
-        sample_size = len(entries)
-        average_score = sum(entry["score"] for entry in entries) / sample_size
-        average_time = sum(entry["time_taken"] for entry in entries) / sample_size
-        average_score_per_minute = (
-            sum(entry["score_per_minute"] for entry in entries) / sample_size
-        )
-        average_tokens = sum(entry["tokens_processed"] for entry in entries) / sample_size
-        average_tokens_per_second = (
-            sum(entry["tokens_per_second"] for entry in entries) / sample_size
-        )
-        average_score_per_token = (
-            sum(entry["score_per_token"] for entry in entries) / sample_size
-        )
-        average_gpu_utilization = (
-            sum(entry["gpu_utilization_avg"] for entry in entries) / sample_size
-        )
-        average_gpu_memory = (
-            sum(entry["gpu_memory_used_mb"] for entry in entries) / sample_size
-        )
-
-        return {
+        if limit is None:
+            aggregator = self._performance_rollup(agent_id, topic, group_fields, page_size)
+        else:
+            aggregator = MetricsAggregator(PERFORMANCE_METRICS, group_fields)
+            for page in self.registry.scores.iter_scores(agent_id, topic, limit, page_size=page_size):
+                for metadata in page:
+                    entry = _score_entry(metadata, topic)
+                    aggregator.add(entry)
+                    if include_entries:
+                        entries.append(entry)
+
+        metrics = aggregator.summary()
+        summary: Dict[str, Any] = {"sample_size": aggregator.count}
+        for metric, key in PERFORMANCE_SUMMARY_KEYS.items():
+            summary[key] = metrics[metric]["mean"]
+        summary["metrics"] = metrics
+
+        result: Dict[str, Any] = {
             "agent_id": agent_id,
             "topic": topic,
             "entries": entries,
-            "summary": {
-                "sample_size": sample_size,
-                "average_score": average_score,
-                "average_time_seconds": average_time,
-                "average_score_per_minute": average_score_per_minute,
-                "average_tokens_processed": average_tokens,
-                "average_tokens_per_second": average_tokens_per_second,
-                "average_score_per_token": average_score_per_token,
-                "average_gpu_utilization": average_gpu_utilization,
-                "average_gpu_memory_used_mb": average_gpu_memory,
-            },
+            "summary": summary,
         }
+        if group_fields:
+            result["groups"] = aggregator.group_summaries()
+        return result
+
+    def _performance_rollup(
+        self,
+        agent_id: str,
+        topic: Optional[str],
+        group_fields: Tuple[str, ...],
+        page_size: int,
+    ) -> MetricsAggregator:
+        """Return the agent's full-history aggregate, folding in only scores newer than the saved rollup."""
+        store = self.registry.performance_rollups
+        state = store.load(agent_id, topic, group_fields)
+        if state is None:
+            rollup = _PerformanceRollup(MetricsAggregator(PERFORMANCE_METRICS, group_fields))
+        else:
+            rollup = _PerformanceRollup.from_dict(state)
+        if self._catch_up(rollup, agent_id, topic, page_size) or state is None:
+            store.save(agent_id, topic, group_fields, rollup.to_dict())
+        return rollup.aggregator
+
+    def _catch_up(self, rollup: _PerformanceRollup, agent_id: str, topic: Optional[str], page_size: int = 500) -> bool:
+        """Fold scores stored since the rollup's newest one; returns whether anything changed."""
+        newest = self.registry.scores.fetch_scores(agent_id, topic, limit=1)
+        if not newest or _score_epoch(newest[0]) < rollup.newest_epoch:
+            return False
+        newest_key = _score_identity(newest[0])
+        if newest_key == rollup.newest_key:
+            return False
+
+        start = rollup.newest_epoch if rollup.aggregator.count else None
+        pending: List[Dict[str, Any]] = []
+        for page in self.registry.scores.iter_scores(agent_id, topic, start=start, page_size=page_size):
+            pending.extend(
+                metadata for metadata in page
+                if _score_identity(metadata) not in rollup.boundary
+            )
+        # Pages arrive newest first; fold oldest first so the boundary ends on the newest epoch
+        for metadata in reversed(pending):
+            rollup.fold(_score_entry(metadata, topic), metadata)
+        rollup.newest_key = newest_key
+        return True
 
     def get_recent_errors(self, agent_id: Optional[str], limit: int = 5) -> Dict[str, Any]:
         """
@@ -322,16 +487,32 @@ class MemoryService:
         metadata = metrics or {}
         self.registry.scores.add_score(topic, score, time_taken, agent_id, metadata)
 
+        # Keep the agent's saved full-history rollups current (usually a one-score catch-up)
+        store = self.registry.performance_rollups
+        for rollup_topic, group_fields in store.keys(agent_id, [None, topic]):
+            state = store.load(agent_id, rollup_topic, group_fields)
+            if state is None:
+                continue
+            rollup = _PerformanceRollup.from_dict(state)
+            if self._catch_up(rollup, agent_id, rollup_topic):
+                store.save(agent_id, rollup_topic, group_fields, rollup.to_dict())
+
     def log_daily_activity(self, agent_id: str, activity_type: str, details: Dict[str, Any]):
         """Logs daily activity for reflection."""
         self.registry.daily_logs.add_log(agent_id, activity_type, details)
 
     def get_daily_logs(self, agent_id: str, date_str: Optional[str] = None):
-        """Retrieves logs for a specific day (or all if None)."""
-        # Note: Chroma filtering by date string is basic.
-        # For a real app, we'd query by timestamp range.
-        # Here we just return recent logs.
-        return self.registry.daily_logs.get_recent(agent_id, limit=100)
+        """
+        Retrieves logs for a specific UTC day (YYYY-MM-DD), newest first.
+
+        Without ``date_str`` the 100 most recent logs are returned.
+        """
+        if not date_str:
+            return self.registry.daily_logs.get_recent(agent_id, limit=100)
+
+        day = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        start = day.timestamp()
+        return self.registry.daily_logs.get_recent(agent_id, limit=None, start=start, end=start + 86400)
 
     def get_collection_metrics(self) -> Dict[str, int]:
         """Return counts for each collection."""
@@ -347,78 +528,154 @@ class MemoryService:
         max_tokens: int,
         agent_id: Optional[str] = None,
         relevance_threshold: float = 0.7,
+        include_pinned: bool = True,
+        allow_chunking: bool = True,
+        initial_candidates: int = 20,
+        max_candidates: int = 320,
+        preflight: Optional[Callable[[int], "BudgetDecision"]] = None,
     ) -> Dict[str, Any]:
         """
         Recall training materials within a token budget.
 
-        Uses relevance scoring and token counting to fit the most relevant
-        materials within the specified token limit.
+        Pinned materials are reserved first (highest priority first). The
+        remaining budget is packed with a bounded knapsack that maximises total
+        relevance for the token count, then topped up with leading chunks of
+        documents that did not fit whole. The candidate pool starts at
+        ``initial_candidates`` and doubles until the relevant candidates can fill
+        the budget, relevance drops below the threshold, the collection is
+        exhausted, or ``max_candidates`` is reached.
 
         Args:
             topic: Search query for relevant materials
             max_tokens: Maximum tokens to return
             agent_id: Optional agent filter
             relevance_threshold: Minimum relevance score (0-1)
+            include_pinned: Reserve budget for pinned materials first
+            allow_chunking: Allow chunk-level truncation of documents that don't fit
+            initial_candidates: First candidate pool size
+            max_candidates: Upper bound for the adaptive candidate pool
+            preflight: Called with ``max_tokens`` before retrieval (e.g.
+                ``functools.partial(tracker.preflight, agent_id)``); a trim
+                shrinks the budget and a deny returns no materials
 
         Returns:
             Dictionary with selected materials, token count, and metadata
-        """
-        # Retrieve more candidates than needed
-        results = self.recall_training_material(topic, limit=20, agent_id=agent_id)
-
-        documents = results.get("documents", [[]])[0] if results.get("documents") else []
-        metadatas = results.get("metadatas", [[]])[0] if results.get("metadatas") else []
-        distances = results.get("distances", [[]])[0] if results.get("distances") else []
-
-        # Convert distances to relevance scores (lower distance = higher relevance)
-        # Assuming cosine distance in range [0, 2], convert to [0, 1]
-        relevance_scores = [max(0, 1 - (d / 2)) for d in distances] if distances else []
 
-        selected_materials = []
-        total_tokens = 0
+        Complexity:
+            Time: O(c * B) for c candidates, B <= 512 knapsack buckets
+            Space: O(c * B)
+        """
+        def tokens_for(doc: str, metadata: Dict[str, Any]) -> int:
+            # Counts are stored at ingest; only legacy documents are tokenized here
+            stored = metadata.get("token_count")
+            return stored if isinstance(stored, int) else self.count_tokens(doc)
+
+        # Size the retrieval to what the remaining token budgets allow
+        budget_decision = preflight(max_tokens) if preflight is not None else None
+        if budget_decision is not None:
+            max_tokens = budget_decision.allowed_tokens
+
+        selected_materials: List[Dict[str, Any]] = []
+        remaining = max(0, max_tokens)
+        seen_ids: set = set()
+
+        # 1. Pinned materials take their share of the budget first
+        pinned_count = 0
+        if include_pinned and remaining > 0:
+            pinned = self.registry.training_materials.get_pinned(agent_id=agent_id)
+            for doc_id, doc, metadata in pinned:
+                seen_ids.add(doc_id)
+                metadata = metadata or {}
+                doc_tokens = tokens_for(doc, metadata)
+                content, truncated = doc, False
+                if doc_tokens > remaining:
+                    chunk_tokens = decode_chunk_tokens(metadata.get("chunk_tokens"))
+                    partial = (
+                        leading_chunks(doc, remaining, self.count_tokens, chunk_tokens)
+                        if allow_chunking else None
+                    )
+                    if partial is None:
+                        continue
+                    content, doc_tokens = partial
+                    truncated = True
+                selected_materials.append({
+                    "id": doc_id,
+                    "content": content,
+                    "metadata": metadata,
+                    "relevance": 1.0,
+                    "tokens": doc_tokens,
+                    "truncated": truncated,
+                    "pinned": True,
+                })
+                remaining -= doc_tokens
+                pinned_count += 1
+                if remaining <= 0:
+                    break
+
+        # 2. Widen the candidate pool until it can fill the budget
+        candidates: List[PackingCandidate] = []
+        metadata_by_id: Dict[str, Dict[str, Any]] = {}
         skipped_count = 0
-
-        for doc, metadata, relevance in zip(documents, metadatas, relevance_scores):
-            # Skip low relevance materials
-            if relevance < relevance_threshold:
-                skipped_count += 1
-                continue
-
-            # Count tokens in this document
-            doc_tokens = self.count_tokens(doc)
-
-            # Check if adding this would exceed budget
-            if total_tokens + doc_tokens > max_tokens:
-                # Try to fit partial content if it's the first document
-                if not selected_materials and doc_tokens > max_tokens:
-                    # Truncate to fit
-                    chars_to_keep = int((max_tokens / doc_tokens) * len(doc))
-                    truncated_doc = doc[:chars_to_keep] + "..."
-                    selected_materials.append({
-                        "content": truncated_doc,
-                        "metadata": metadata,
-                        "relevance": relevance,
-                        "tokens": max_tokens,
-                        "truncated": True,
-                    })
-                    total_tokens = max_tokens
+        pool_size = max(1, initial_candidates)
+        while remaining > 0:
+            results = self.recall_training_material(topic, limit=pool_size, agent_id=agent_id)
+            ids = results.get("ids", [[]])[0] if results.get("ids") else []
+            documents = results.get("documents", [[]])[0] if results.get("documents") else []
+            metadatas = results.get("metadatas", [[]])[0] if results.get("metadatas") else []
+            distances = results.get("distances", [[]])[0] if results.get("distances") else []
+
+            candidates, skipped_count = [], 0
+            below_threshold = False
+            for doc_id, doc, metadata, distance in zip(ids, documents, metadatas, distances):
+                if doc_id in seen_ids:
+                    continue
+                metadata = metadata or {}
+                # Convert distances to relevance scores (lower distance = higher relevance)
+                # Assuming cosine distance in range [0, 2], convert to [0, 1]
+                similarity = max(0, 1 - (distance / 2))
+                # Stale materials are down-weighted by their stored recency weight
+                relevance = similarity * float(metadata.get("recency_weight", 1.0))
+                if relevance < relevance_threshold:
+                    skipped_count += 1
+                    below_threshold = below_threshold or similarity < relevance_threshold
+                    continue
+                metadata_by_id[doc_id] = metadata
+                candidates.append(PackingCandidate(
+                    key=doc_id,
+                    content=doc,
+                    tokens=tokens_for(doc, metadata),
+                    relevance=relevance,
+                    chunk_tokens=decode_chunk_tokens(metadata.get("chunk_tokens")),
+                ))
+
+            exhausted = len(ids) < pool_size
+            can_fill = sum(c.tokens for c in candidates) >= remaining
+            if exhausted or below_threshold or can_fill or pool_size >= max_candidates:
                 break
+            pool_size = min(pool_size * 2, max_candidates)
 
+        # 3. Pack the remaining budget for maximum total relevance
+        for item in pack_documents(candidates, remaining, self.count_tokens, allow_chunking):
             selected_materials.append({
-                "content": doc,
-                "metadata": metadata,
-                "relevance": relevance,
-                "tokens": doc_tokens,
-                "truncated": False,
+                "id": item.candidate.key,
+                "content": item.content,
+                "metadata": metadata_by_id.get(item.candidate.key, {}),
+                "relevance": item.candidate.relevance,
+                "tokens": item.tokens,
+                "truncated": item.truncated,
+                "pinned": False,
             })
-            total_tokens += doc_tokens
 
+        total_tokens = sum(material["tokens"] for material in selected_materials)
         return {
             "materials": selected_materials,
             "total_tokens": total_tokens,
             "materials_count": len(selected_materials),
+            "pinned_count": pinned_count,
+            "candidates_considered": len(candidates),
             "skipped_low_relevance": skipped_count,
             "utilization": (total_tokens / max_tokens * 100) if max_tokens > 0 else 0,
+            "budget_action": budget_decision.action if budget_decision is not None else None,
         }
 
     def add_pinned_material(
@@ -442,65 +699,101 @@ class MemoryService:
             agent_id: Agent identifier
             priority: Priority level (higher = more important, default 10)
         """
+        token_count, chunk_tokens = self.measure_document(content)
         self.registry.training_materials.add_material(
             topic=topic,
             document=content,
             agent_id=agent_id,
             file_name=file_name,
             metadata={"pinned": True, "priority": priority},
+            token_count=token_count,
+            chunk_tokens=chunk_tokens,
         )
 
     def get_context_statistics(self) -> Dict[str, Any]:
         """
         Get statistics about stored context and token usage.
 
+        Token totals come from the per-document counts stored at ingest and
+        the incrementally maintained collection totals, so no document is
+        read or tokenized here.
+
         Returns:
-            Dictionary with collection stats and token estimates
+            Dictionary with collection stats and exact token totals
+            (``uncounted_materials`` lists legacy documents without a stored
+            count; see :meth:`backfill_token_counts`)
         """
         stats = self.get_collection_metrics()
-
-        # Estimate total tokens (would need to scan all docs for exact count)
-        # This is a placeholder - real implementation would aggregate from metadata
-        estimated_total_tokens = stats.get("training_materials", 0) * 500  # avg 500 tokens/doc
+        totals = self.registry.training_materials.token_totals()
+        total_tokens = totals["total_tokens"]
+        counted = totals["counted_documents"]
 
         return {
             **stats,
-            "estimated_total_tokens": estimated_total_tokens,
-            "avg_tokens_per_material": 500,  # placeholder
+            "total_tokens": total_tokens,
+            "estimated_total_tokens": total_tokens,
+            "avg_tokens_per_material": (total_tokens / counted) if counted else 0,
+            "uncounted_materials": max(0, stats.get("training", 0) - counted),
         }
 
+    def backfill_token_counts(self, page_size: int = 500) -> int:
+        """
+        Store token counts on materials ingested before counts were recorded.
+
+        Returns:
+            Number of materials updated
+        """
+        return self.registry.training_materials.backfill_token_counts(self.measure_document, page_size)
+
     def apply_relevance_decay(
         self,
-        agent_id: str,
+        agent_id: Optional[str],
         days_threshold: int = 90,
         decay_factor: float = 0.5,
+        archive_after_days: Optional[int] = None,
+        page_size: int = 500,
+        now: Optional[datetime] = None,
     ) -> int:
         """
         Apply relevance decay to old training materials.
 
-        Older materials become less likely to be retrieved by adjusting
-        their metadata to indicate lower relevance.
+        Materials older than ``days_threshold`` get a ``recency_weight`` of
+        ``decay_factor ** (age / days_threshold)`` stored in their metadata;
+        recall multiplies similarity by this weight, so stale materials lose out
+        to fresh ones. Materials older than ``archive_after_days`` are moved to
+        the ``training_archive`` collection. Pinned materials are left alone.
+
+        The pass pages through the collection with ``get``/``update`` calls of
+        ``page_size`` documents, so it can run periodically on large stores.
 
         Args:
-            agent_id: Agent to apply decay for
+            agent_id: Agent to apply decay for (None for every agent)
             days_threshold: Materials older than this get decayed
             decay_factor: Multiplier for relevance (0-1)
+            archive_after_days: Archive materials older than this (None to never archive)
+            page_size: Documents per paged request
+            now: Reference time (defaults to the current UTC time)
 
         Returns:
-            Number of materials updated
+            Number of materials updated or archived
 
-        Note:
-            This is a conceptual method - actual implementation would require
-            ChromaDB metadata updates based on timestamps.
+        Raises:
+            ValueError: If days_threshold, decay_factor or page_size are out of range
         """
-        # This would require iterating through materials and updating metadata
-        # based on age. Placeholder implementation.
-        cutoff_date = datetime.utcnow() - timedelta(days=days_threshold)
-
-        # In a real implementation, we would:
-        # 1. Query all materials for agent_id with timestamp < cutoff_date
-        # 2. Update their metadata with decayed relevance scores
-        # 3. Return count of updated materials
-
-        # For now, return 0 as this requires more ChromaDB integration
-        return 0
+        if days_threshold <= 0:
+            raise ValueError("days_threshold must be greater than zero.")
+        if not 0 < decay_factor <= 1:
+            raise ValueError("decay_factor must be in (0, 1].")
+        if page_size <= 0:
+            raise ValueError("page_size must be greater than zero.")
+
+        reference = (now or datetime.now(timezone.utc)).timestamp()
+        report = self.registry.training_materials.decay_relevance(
+            agent_id=agent_id,
+            days_threshold=days_threshold,
+            decay_factor=decay_factor,
+            archive_after_days=archive_after_days,
+            page_size=page_size,
+            now=reference,
+        )
+        return report.updated + report.archived
@@ -2,15 +2,31 @@
 Token tracking service for monitoring and optimizing LLM token usage.
 
 Provides real-time tracking, aggregation, and analysis of token consumption
-across training sessions and operations.
+across training sessions and operations. Operation metrics are appended to
+per-agent daily JSONL segments (see ``data.token_log``) and folded into
+daily rollups (see ``data.token_rollups``) as the log is flushed, so the
+rollups that back agent statistics never run ahead of the log.
+Session summaries are persisted on a debounce and rebuilt from the operation
+log if a process stopped before writing its final summary. In memory each
+session keeps running aggregates and a bounded window of recent operations;
+ended sessions are evicted. ``preflight`` checks an estimated operation size
+against the remaining budgets before the operation runs.
 """
 
+import atexit
 import json
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
-from collections import defaultdict
+from types import SimpleNamespace
+from typing import Deque, Dict, List, Optional
 
+from ..data.token_budget_ledger import BudgetDecision, BudgetLimits, TokenBudgetLedger, decide
+from ..data.token_log import TokenLogWriter, convert_legacy_operations, load_columns
+from ..data.token_rollups import TokenRollupStore
 from ..models.token_metrics import (
     TokenMetrics,
     SessionTokenSummary,
@@ -21,6 +37,32 @@ from ..models.token_metrics import (
 )
 
 
+@dataclass
+class SessionAggregates:
+    """Running totals of a session's operations, used for optimization analysis."""
+
+    operations: int = 0
+    prompt_tokens: int = 0
+    context_tokens: int = 0
+    cached_tokens: int = 0
+    total_tokens: int = 0
+    cost_usd: float = 0.0
+    quality_sum: float = 0.0
+    context_utilization_sum: float = 0.0
+    cache_hit_rate_sum: float = 0.0
+
+    def add(self, metrics: TokenMetrics):
+        self.operations += 1
+        self.prompt_tokens += metrics.prompt_tokens
+        self.context_tokens += metrics.context_tokens
+        self.cached_tokens += metrics.cached_tokens
+        self.total_tokens += metrics.total_tokens
+        self.cost_usd += metrics.cost_usd
+        self.quality_sum += metrics.output_quality_score
+        self.context_utilization_sum += metrics.context_utilization_score
+        self.cache_hit_rate_sum += metrics.cache_hit_rate
+
+
 class TokenTracker:
     """
     Service for tracking and analyzing token usage.
@@ -29,20 +71,70 @@ class TokenTracker:
     and analysis capabilities.
     """
 
-    def __init__(self, data_dir: Optional[Path] = None):
+    def __init__(
+        self,
+        data_dir: Optional[Path] = None,
+        flush_every: int = 64,
+        flush_interval: float = 1.0,
+        summary_every: int = 20,
+        summary_interval: float = 5.0,
+        metrics_window: int = 100,
+        ended_sessions_kept: int = 64,
+        budget_limits: Optional[BudgetLimits] = None,
+        budget_refresh_interval: float = 30.0,
+    ):
         """
         Initialize token tracker.
 
         Args:
             data_dir: Directory for storing token metrics (default: ./token_metrics)
+            flush_every: Buffered operation records that trigger a log flush
+            flush_interval: Seconds a record may stay buffered before the next
+                record triggers a flush
+            summary_every: Operations after which a session summary is persisted
+            summary_interval: Seconds after which the next operation persists
+                its session summary
+            metrics_window: Recent TokenMetrics kept in memory per session
+            ended_sessions_kept: Ended sessions whose aggregates stay
+                available for analysis
+            budget_limits: Limits enforced by ``preflight`` (None allows everything)
+            budget_refresh_interval: Seconds between re-reads of day/month
+                usage from the persisted rollups
         """
         self.data_dir = Path(data_dir or "token_metrics")
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.operations_dir = self.data_dir / "operations"
+
+        # Buffered operation log; flushed before reads and at exit, each flush updates the rollups
+        self._op_log = TokenLogWriter(
+            self.operations_dir, flush_every, flush_interval, on_flush=self._fold_into_rollups
+        )
+        atexit.register(self.close)
+
+        # Daily rollups, opened on first use
+        self._rollups: Optional[TokenRollupStore] = None
+        self._rollups_guard = threading.Lock()
 
-        # In-memory caches for current session
-        self._current_session_metrics: Dict[str, List[TokenMetrics]] = defaultdict(list)
+        # In-memory state of live sessions: bounded recent operations, O(1) aggregates
+        self.metrics_window = metrics_window
+        self._current_session_metrics: Dict[str, Deque[TokenMetrics]] = {}
+        self._session_aggregates: Dict[str, SessionAggregates] = {}
         self._session_summaries: Dict[str, SessionTokenSummary] = {}
 
+        # Aggregates of the most recently ended sessions (oldest evicted first)
+        self.ended_sessions_kept = ended_sessions_kept
+        self._ended_aggregates: "OrderedDict[str, SessionAggregates]" = OrderedDict()
+
+        # Pre-flight budgets: in-memory usage counters synced from the rollups
+        self.budget_limits = budget_limits
+        self.budget_ledger = TokenBudgetLedger(self._logged_tokens, budget_refresh_interval)
+
+        # Debounced summary persistence: operations not yet on disk, last write time
+        self.summary_every = summary_every
+        self.summary_interval = summary_interval
+        self._unsaved_operations: Dict[str, int] = {}
+        self._summary_saved_at: Dict[str, float] = {}
+
     def record_operation(
         self,
         session_id: str,
@@ -103,7 +195,12 @@ class TokenTracker:
         )
 
         # Store in memory
+        if session_id not in self._current_session_metrics:
+            self._current_session_metrics[session_id] = deque(maxlen=self.metrics_window)
+            self._session_aggregates[session_id] = SessionAggregates()
+            self._ended_aggregates.pop(session_id, None)
         self._current_session_metrics[session_id].append(metrics)
+        self._session_aggregates[session_id].add(metrics)
 
         # Persist to disk
         self._save_operation_metrics(metrics)
@@ -129,6 +226,68 @@ class TokenTracker:
         # Try loading from disk
         return self._load_session_summary(session_id)
 
+    def recent_operations(self, session_id: str) -> List[TokenMetrics]:
+        """
+        Get the most recent operations of a live session (up to ``metrics_window``).
+
+        Args:
+            session_id: Training session ID
+
+        Returns:
+            TokenMetrics oldest first
+        """
+        return list(self._current_session_metrics.get(session_id, ()))
+
+    def end_session(self, session_id: str) -> Optional[SessionTokenSummary]:
+        """
+        Persist the final summary of a session and evict it from memory.
+
+        Only the session's aggregates are kept (for
+        ``analyze_optimization_opportunities``); the summary is read from disk.
+        Operations recorded for the session afterwards start a new summary.
+
+        Args:
+            session_id: Training session ID
+
+        Returns:
+            SessionTokenSummary or None if session not found
+        """
+        self.flush()
+        summary = self._session_summaries.pop(session_id, None)
+        if summary is None:
+            return self.get_session_summary(session_id)
+
+        self._save_session_summary(summary, complete=True)
+        self._unsaved_operations.pop(session_id, None)
+        self._summary_saved_at.pop(session_id, None)
+        self._current_session_metrics.pop(session_id, None)
+        aggregates = self._session_aggregates.pop(session_id, None)
+        if aggregates is not None:
+            self._ended_aggregates[session_id] = aggregates
+            while len(self._ended_aggregates) > self.ended_sessions_kept:
+                self._ended_aggregates.popitem(last=False)
+        return summary
+
+    def flush_session_summaries(self, complete: bool = False) -> int:
+        """
+        Persist every session summary with operations not yet on disk.
+
+        Args:
+            complete: Mark the written summaries as final
+
+        Returns:
+            Number of summaries written
+        """
+        pending = [session_id for session_id, count in self._unsaved_operations.items() if count]
+        for session_id in pending:
+            self._persist_session_summary(session_id, complete=complete)
+        return len(pending)
+
+    def close(self):
+        """Flush the operation log and write final session summaries (runs at exit)."""
+        self.flush()
+        self.flush_session_summaries(complete=True)
+
     def get_agent_stats(
         self,
         agent_id: str,
@@ -145,85 +304,169 @@ class TokenTracker:
             AgentTokenStats with lifetime and recent statistics
         """
         stats = AgentTokenStats(agent_id=agent_id)
+        # Buffered operations reach the rollups when the log is flushed
+        self.flush()
 
-        # Load all metrics for agent
-        metrics_list = self._load_agent_metrics(agent_id, days)
+        # At most one pre-aggregated rollup per day in the window
+        since = (datetime.utcnow().date() - timedelta(days=days)).isoformat()
+        rollups = self.rollups.days(agent_id, since)
 
-        if not metrics_list:
+        if not rollups:
             return stats
 
-        # Calculate aggregations
-        sessions = set()
-        total_tokens = 0
-        total_input = 0
-        total_output = 0
-        total_cost = 0.0
-        total_quality = 0.0
-        total_efficiency = 0.0
-        total_cache_hit = 0.0
+        sessions = self.rollups.sessions(agent_id, since)
+        total_tokens = sum(r.total_tokens for r in rollups)
+        num_operations = sum(r.operations for r in rollups)
+        num_sessions = len(sessions)
 
         best_efficiency = 0.0
         best_session = None
         worst_efficiency = float("inf")
         worst_session = None
-
-        # Daily aggregations
-        daily_tokens: Dict[str, int] = defaultdict(int)
-        daily_quality: Dict[str, List[float]] = defaultdict(list)
-
-        for metric in metrics_list:
-            sessions.add(metric.session_id)
-            total_tokens += metric.total_tokens
-            total_input += metric.total_input_tokens
-            total_output += metric.total_output_tokens
-            total_cost += metric.cost_usd
-            total_quality += metric.output_quality_score
-            total_efficiency += metric.efficiency_score
-
-            # Track best/worst
-            if metric.efficiency_score > best_efficiency:
-                best_efficiency = metric.efficiency_score
-                best_session = metric.session_id
-            if metric.efficiency_score < worst_efficiency:
-                worst_efficiency = metric.efficiency_score
-                worst_session = metric.session_id
-
-            # Daily aggregations
-            day_key = metric.timestamp.date().isoformat()
-            daily_tokens[day_key] += metric.total_tokens
-            daily_quality[day_key].append(metric.output_quality_score)
-
-        num_operations = len(metrics_list)
-        num_sessions = len(sessions)
+        for rollup in rollups:
+            if rollup.best_efficiency > best_efficiency:
+                best_efficiency = rollup.best_efficiency
+                best_session = rollup.best_session
+            if rollup.worst_efficiency < worst_efficiency:
+                worst_efficiency = rollup.worst_efficiency
+                worst_session = rollup.worst_session
 
         # Update stats
         stats.total_sessions = num_sessions
         stats.total_operations = num_operations
         stats.lifetime_tokens = total_tokens
-        stats.lifetime_input_tokens = total_input
-        stats.lifetime_output_tokens = total_output
-        stats.lifetime_cost_usd = total_cost
+        stats.lifetime_input_tokens = sum(r.total_input_tokens for r in rollups)
+        stats.lifetime_output_tokens = sum(r.total_output_tokens for r in rollups)
+        stats.lifetime_cost_usd = sum(r.cost_usd for r in rollups)
 
         stats.avg_tokens_per_session = total_tokens / num_sessions if num_sessions > 0 else 0
         stats.avg_tokens_per_operation = total_tokens / num_operations if num_operations > 0 else 0
-        stats.avg_quality_score = total_quality / num_operations if num_operations > 0 else 0
-        stats.avg_efficiency_score = total_efficiency / num_operations if num_operations > 0 else 0
+        stats.avg_quality_score = sum(r.quality_sum for r in rollups) / num_operations if num_operations > 0 else 0
+        stats.avg_efficiency_score = sum(r.efficiency_sum for r in rollups) / num_operations if num_operations > 0 else 0
 
         stats.best_efficiency_session = best_session
         stats.best_efficiency_score = best_efficiency
         stats.worst_efficiency_session = worst_session
         stats.worst_efficiency_score = worst_efficiency
 
-        stats.recent_sessions = list(sessions)
+        stats.recent_sessions = sessions
 
-        # Build trends
-        for day in sorted(daily_tokens.keys()):
-            stats.token_trend.append(daily_tokens[day])
-            avg_quality = sum(daily_quality[day]) / len(daily_quality[day])
-            stats.quality_trend.append(avg_quality)
+        # Build trends (rollups are ordered by day)
+        for rollup in rollups:
+            stats.token_trend.append(rollup.total_tokens)
+            stats.quality_trend.append(rollup.quality_sum / rollup.operations)
 
         return stats
 
+    @property
+    def rollups(self) -> TokenRollupStore:
+        """Daily rollup store; built from the operation log the first time it is created."""
+        with self._rollups_guard:
+            if self._rollups is None:
+                path = self.data_dir / "rollups.sqlite3"
+                created = not path.exists()
+                self._rollups = TokenRollupStore(path)
+                if created:
+                    # Buffered records are not in the log yet; they are folded in when flushed
+                    self._rebuild_rollups(self._rollups, flush=False)
+            return self._rollups
+
+    def rebuild_rollups(self, agent_id: Optional[str] = None) -> int:
+        """
+        Recompute daily rollups from the raw operation log.
+
+        Args:
+            agent_id: Only rebuild this agent (default: all agents)
+
+        Returns:
+            Number of daily rollups written
+        """
+        return self._rebuild_rollups(self.rollups, agent_id)
+
+    def _rebuild_rollups(
+        self, store: TokenRollupStore, agent_id: Optional[str] = None, flush: bool = True
+    ) -> int:
+        if flush:
+            self.flush()
+        if agent_id is not None:
+            agents = [agent_id]
+        elif self.operations_dir.exists():
+            agents = sorted(path.name for path in self.operations_dir.iterdir() if path.is_dir())
+        else:
+            agents = []
+        return sum(store.rebuild(agent, load_columns(self.operations_dir / agent)) for agent in agents)
+
+    def flush(self) -> int:
+        """
+        Write buffered operation records to the log.
+
+        Returns:
+            Number of records written
+        """
+        return self._op_log.flush()
+
+    def convert_legacy_operations(self) -> int:
+        """
+        Convert per-operation JSON files into the daily JSONL segments.
+
+        Returns:
+            Number of operation records converted
+        """
+        self.flush()
+        return convert_legacy_operations(self.operations_dir)
+
+    def preflight(
+        self,
+        agent_id: str,
+        estimated_tokens: int,
+        session_id: Optional[str] = None,
+        operation_type: Optional[str] = None,
+        min_tokens: int = 1,
+    ) -> BudgetDecision:
+        """
+        Check an operation's estimated size against the remaining budgets before running it.
+
+        Scopes checked (each only if configured): ``operation`` (per-operation
+        maximum for ``operation_type``), ``session``, ``day`` and ``month``
+        (the agent's monthly allowance).
+
+        Args:
+            agent_id: Agent about to run the operation
+            estimated_tokens: Estimated prompt/context size in tokens
+            session_id: Training session the operation belongs to
+            operation_type: Operation type for per-operation limits
+            min_tokens: Smallest trimmed size still worth running
+
+        Returns:
+            BudgetDecision with action ``allow``, ``trim`` (to ``allowed_tokens``) or ``deny``
+
+        Example:
+            >>> decision = tracker.preflight("ClaudeCode", 3000, session_id="s1")
+            >>> decision.action, decision.allowed_tokens
+            ('trim', 1800)
+        """
+        limits = self.budget_limits
+        remaining: Dict[str, int] = {}
+        if limits is not None:
+            today = datetime.utcnow().date().isoformat()
+            if operation_type in limits.operation_tokens:
+                remaining["operation"] = limits.operation_tokens[operation_type]
+            if session_id is not None and limits.session_tokens is not None:
+                remaining["session"] = limits.session_tokens - self._session_tokens(session_id)
+            if limits.day_tokens is not None:
+                remaining["day"] = limits.day_tokens - self.budget_ledger.day_tokens(agent_id, today)
+            if limits.month_tokens is not None:
+                remaining["month"] = limits.month_tokens - self.budget_ledger.month_tokens(agent_id, today)
+        return decide(estimated_tokens, remaining, min_tokens)
+
+    def _session_tokens(self, session_id: str) -> int:
+        """Tokens used by a session so far (in-memory aggregates first)."""
+        aggregates = self._session_aggregates.get(session_id) or self._ended_aggregates.get(session_id)
+        if aggregates is not None:
+            return aggregates.total_tokens
+        summary = self._load_session_summary(session_id)
+        return summary.total_tokens if summary else 0
+
     def check_budget(
         self,
         metrics: TokenMetrics,
@@ -299,13 +542,15 @@ class TokenTracker:
         """
         suggestions = []
 
-        metrics_list = self._current_session_metrics.get(session_id, [])
-        if not metrics_list:
+        aggregates = self._session_aggregates.get(session_id) or self._ended_aggregates.get(session_id)
+        if aggregates is None or not aggregates.operations:
             return suggestions
 
         # Analyze patterns
-        total_context = sum(m.context_tokens for m in metrics_list)
-        avg_utilization = sum(m.context_utilization_score for m in metrics_list) / len(metrics_list)
+        n = aggregates.operations
+        total_context = aggregates.context_tokens
+        avg_utilization = aggregates.context_utilization_sum / n
+        avg_quality = aggregates.quality_sum / n
 
         # Suggestion 1: Reduce context if underutilized
         if avg_utilization < 40 and total_context > 1000:
@@ -319,8 +564,8 @@ class TokenTracker:
                     severity="high",
                     description=f"Context utilization is low ({avg_utilization:.1f}%). Consider reducing context size.",
                     current_tokens=total_context,
-                    current_cost_usd=sum(m.cost_usd for m in metrics_list),
-                    current_quality_score=sum(m.output_quality_score for m in metrics_list) / len(metrics_list),
+                    current_cost_usd=aggregates.cost_usd,
+                    current_quality_score=avg_quality,
                     suggested_action="Reduce RAG context retrieval limit by 50%",
                     estimated_tokens_saved=estimated_savings,
                     estimated_cost_saved_usd=calculate_cost(estimated_savings, 0),
@@ -331,7 +576,7 @@ class TokenTracker:
             )
 
         # Suggestion 2: Enable caching for repeated patterns
-        avg_cache_rate = sum(m.cache_hit_rate for m in metrics_list) / len(metrics_list)
+        avg_cache_rate = aggregates.cache_hit_rate_sum / n
         if avg_cache_rate < 30:
             suggestions.append(
                 TokenOptimizationSuggestion(
@@ -341,12 +586,12 @@ class TokenTracker:
                     issue_type="low_cache_utilization",
                     severity="medium",
                     description=f"Cache hit rate is low ({avg_cache_rate:.1f}%). Enable prompt caching.",
-                    current_tokens=sum(m.total_tokens for m in metrics_list),
-                    current_cost_usd=sum(m.cost_usd for m in metrics_list),
-                    current_quality_score=sum(m.output_quality_score for m in metrics_list) / len(metrics_list),
+                    current_tokens=aggregates.total_tokens,
+                    current_cost_usd=aggregates.cost_usd,
+                    current_quality_score=avg_quality,
                     suggested_action="Enable prompt caching for system prompts",
-                    estimated_tokens_saved=int(sum(m.prompt_tokens for m in metrics_list) * 0.6),
-                    estimated_cost_saved_usd=sum(m.cost_usd for m in metrics_list) * 0.3,
+                    estimated_tokens_saved=int(aggregates.prompt_tokens * 0.6),
+                    estimated_cost_saved_usd=aggregates.cost_usd * 0.3,
                     estimated_quality_impact=0.0,
                     priority=2,
                     automated=True,
@@ -364,7 +609,7 @@ class TokenTracker:
         agent_id: str,
         metrics: TokenMetrics
     ):
-        """Update in-memory session summary with new metrics."""
+        """Update in-memory session summary with new metrics and persist it when due."""
         if session_id not in self._session_summaries:
             self._session_summaries[session_id] = SessionTokenSummary(
                 session_id=session_id,
@@ -372,7 +617,22 @@ class TokenTracker:
                 start_time=metrics.timestamp,
             )
 
-        summary = self._session_summaries[session_id]
+        self._accumulate_operation(self._session_summaries[session_id], metrics)
+
+        # Debounced save; the first operation is written at once so recovery can find the session
+        unsaved = self._unsaved_operations.get(session_id, 0) + 1
+        saved_at = self._summary_saved_at.get(session_id)
+        if (
+            saved_at is None
+            or unsaved >= self.summary_every
+            or time.monotonic() - saved_at >= self.summary_interval
+        ):
+            self._persist_session_summary(session_id)
+        else:
+            self._unsaved_operations[session_id] = unsaved
+
+    def _accumulate_operation(self, summary: SessionTokenSummary, metrics):
+        """Add one operation (TokenMetrics or an operation log record) to a summary."""
         summary.total_operations += 1
         summary.total_prompt_tokens += metrics.prompt_tokens
         summary.total_context_tokens += metrics.context_tokens
@@ -400,69 +660,80 @@ class TokenTracker:
 
         summary.end_time = metrics.timestamp
 
-        # Save to disk
-        self._save_session_summary(summary)
+    def _persist_session_summary(self, session_id: str, complete: bool = False):
+        """Write a session summary and reset its debounce state."""
+        self._save_session_summary(self._session_summaries[session_id], complete)
+        self._unsaved_operations[session_id] = 0
+        self._summary_saved_at[session_id] = time.monotonic()
 
     def _save_operation_metrics(self, metrics: TokenMetrics):
-        """Save operation metrics to disk."""
-        # Organize by agent and date
+        """Append operation metrics to the agent's daily log segment and budget counters."""
         date_str = metrics.timestamp.date().isoformat()
-        metrics_dir = self.data_dir / "operations" / metrics.agent_id / date_str
-        metrics_dir.mkdir(parents=True, exist_ok=True)
-
-        file_path = metrics_dir / f"{metrics.operation_id}.json"
-        with open(file_path, "w") as f:
-            json.dump(metrics.model_dump(), f, indent=2, default=str)
+        # Open the rollups before buffering: a newly created store is built from
+        # the log, so no record may be folded in both by the build and by a flush
+        self.rollups
+        self._op_log.append(metrics.agent_id, date_str, metrics.model_dump(mode="json"))
+        self.budget_ledger.consume(metrics.agent_id, date_str, metrics.total_tokens)
+
+    def _fold_into_rollups(self, agent_id: str, day: str, records: List[Dict]) -> None:
+        """Add records the operation log has just written to their day's rollup."""
+        self.rollups.add(agent_id, day, records)
+
+    def _logged_tokens(self, agent_id: str, first_day: str, last_day: str) -> int:
+        """Tokens an agent used in a range of days, including records still buffered."""
+        self.flush()
+        return self.rollups.total_tokens(agent_id, first_day, last_day)
+
+    def _save_session_summary(self, summary: SessionTokenSummary, complete: bool = True):
+        """
+        Save session summary to disk.
 
-    def _save_session_summary(self, summary: SessionTokenSummary):
-        """Save session summary to disk."""
+        ``complete`` is False while later operations may exist only in the
+        operation log; loading such a summary rebuilds it from the log.
+        """
         summaries_dir = self.data_dir / "sessions"
         summaries_dir.mkdir(parents=True, exist_ok=True)
 
         file_path = summaries_dir / f"{summary.session_id}.json"
-        with open(file_path, "w") as f:
-            json.dump(summary.model_dump(), f, indent=2, default=str)
+        temp_path = file_path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump({**summary.model_dump(), "complete": complete}, f, indent=2, default=str)
+        temp_path.replace(file_path)
 
     def _load_session_summary(self, session_id: str) -> Optional[SessionTokenSummary]:
-        """Load session summary from disk."""
+        """Load session summary from disk, recovering it from the operation log if incomplete."""
         file_path = self.data_dir / "sessions" / f"{session_id}.json"
         if not file_path.exists():
             return None
 
         with open(file_path, "r") as f:
             data = json.load(f)
-            return SessionTokenSummary(**data)
-
-    def _load_agent_metrics(
-        self,
-        agent_id: str,
-        days: int = 30
-    ) -> List[TokenMetrics]:
-        """Load all metrics for an agent within the specified time range."""
-        metrics_list = []
-        cutoff_date = datetime.utcnow().date() - timedelta(days=days)
-
-        agent_dir = self.data_dir / "operations" / agent_id
-        if not agent_dir.exists():
-            return metrics_list
-
-        # Iterate through date directories
-        for date_dir in sorted(agent_dir.iterdir()):
-            if not date_dir.is_dir():
+        # Summaries written before debouncing were saved after every operation
+        complete = data.pop("complete", True)
+        summary = SessionTokenSummary(**data)
+        if not complete:
+            summary = self._recover_session_summary(summary)
+        return summary
+
+    def _recover_session_summary(self, saved: SessionTokenSummary) -> SessionTokenSummary:
+        """Rebuild a session summary from the session's records in the operation log."""
+        self.flush()
+        recovered = SessionTokenSummary(
+            session_id=saved.session_id,
+            agent_id=saved.agent_id,
+            start_time=saved.start_time,
+        )
+        columns = load_columns(self.operations_dir / saved.agent_id, since=saved.start_time.date())
+        names = list(columns.columns)
+        for values in zip(*columns.columns.values()):
+            record = dict(zip(names, values))
+            if record["session_id"] != saved.session_id:
                 continue
-
-            # Parse date from directory name
-            try:
-                dir_date = datetime.fromisoformat(date_dir.name).date()
-                if dir_date < cutoff_date:
-                    continue
-            except ValueError:
+            record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+            # Earlier runs that reused this session ID were overwritten by this summary
+            if record["timestamp"] < saved.start_time:
                 continue
+            self._accumulate_operation(recovered, SimpleNamespace(**record))
 
-            # Load all operation files in this date
-            for metrics_file in date_dir.glob("*.json"):
-                with open(metrics_file, "r") as f:
-                    data = json.load(f)
-                    metrics_list.append(TokenMetrics(**data))
-
-        return metrics_list
+        # Keep what was saved if the log has lost records (e.g. an unflushed buffer)
+        return recovered if recovered.total_operations >= saved.total_operations else saved
@@ -0,0 +1,116 @@
+"""
+Module: ids.py
+Purpose: Monotonic, time-sortable record identifiers (ULID layout).
+
+IDs are 26 Crockford base32 characters: a 48-bit millisecond timestamp
+followed by 80 random bits. Within one millisecond the random part is
+incremented instead of redrawn, so IDs generated by a process are strictly
+increasing and never collide, and lexicographic order equals creation order.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-18T16:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_DECODE = {char: index for index, char in enumerate(_ALPHABET)}
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+_TIME_MAX = (1 << 48) - 1
+ULID_LENGTH = 26
+
+
+def _encode(value: int) -> str:
+    chars = []
+    for _ in range(ULID_LENGTH):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def _decode(text: str) -> int:
+    value = 0
+    for char in text.upper():
+        value = (value << 5) | _DECODE[char]
+    return value
+
+
+class ULIDGenerator:
+    """
+    [CREATE] Thread-safe monotonic ULID generator.
+
+    Args:
+        clock: Returns the current time in epoch milliseconds (injectable for tests).
+
+    Example:
+        >>> generator = ULIDGenerator()
+        >>> generator.new() < generator.new()
+        True
+    """
+
+    def __init__(self, clock: Optional[Callable[[], int]] = None) -> None:
+        self._clock = clock or (lambda: time.time_ns() // 1_000_000)
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new(self) -> str:
+        """[CREATE] Return the next ID; strictly greater than any previous one."""
+        with self._lock:
+            now_ms = min(self._clock(), _TIME_MAX)
+            if now_ms <= self._last_ms:
+                # Same millisecond (or clock went backwards): keep order by incrementing
+                now_ms = self._last_ms
+                random_part = self._last_random + 1
+                if random_part > _RANDOM_MAX:
+                    now_ms += 1
+                    random_part = int.from_bytes(os.urandom(10), "big") >> 1
+            else:
+                # Leave headroom so increments within the millisecond cannot overflow
+                random_part = int.from_bytes(os.urandom(10), "big") >> 1
+            self._last_ms, self._last_random = now_ms, random_part
+            return _encode((now_ms << _RANDOM_BITS) | random_part)
+
+
+_default_generator = ULIDGenerator()
+
+
+def new_ulid() -> str:
+    """[CREATE] Generate a ULID from the process-wide generator."""
+    return _default_generator.new()
+
+
+def new_record_id(prefix: str) -> str:
+    """[CREATE] Sortable record ID such as ``error_01J...``; same-prefix IDs sort by time."""
+    return f"{prefix}_{new_ulid()}"
+
+
+def ulid_timestamp_ms(value: str) -> int:
+    """
+    [CREATE] Millisecond timestamp embedded in a ULID or prefixed record ID.
+
+    Raises:
+        ValueError: If ``value`` does not end in a valid ULID.
+    """
+    ulid = value[-ULID_LENGTH:]
+    if len(ulid) != ULID_LENGTH or any(char not in _DECODE for char in ulid.upper()):
+        raise ValueError(f"not a ULID: {value!r}")
+    return _decode(ulid) >> _RANDOM_BITS
+
+
+def ulid_bound(timestamp_ms: int, upper: bool = False) -> str:
+    """
+    [CREATE] Smallest (or largest) ULID for a millisecond timestamp.
+
+    Useful for turning a time range into an ID range:
+    ``ulid_bound(start_ms) <= id <= ulid_bound(end_ms, upper=True)``.
+    """
+    random_part = _RANDOM_MAX if upper else 0
+    return _encode((max(0, min(timestamp_ms, _TIME_MAX)) << _RANDOM_BITS) | random_part)
@@ -0,0 +1,63 @@
+"""
+Shared fixtures for the Agent Training System tests.
+
+Chroma collections are backed by a deterministic bag-of-words embedding so
+tests run offline without downloading the default embedding model.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+from src.training.data.client import ChromaDatabase
+from src.training.data.repositories import RepositoryRegistry
+from src.training.services.memory_service import MemoryService
+
+
+class HashEmbedding(EmbeddingFunction):
+    """Normalised hashed bag-of-words vectors; similar text -> similar vectors."""
+
+    def __init__(self, dimensions: int = 64) -> None:
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for document in input:
+            vector = np.zeros(self.dimensions, dtype=np.float32)
+            for word in document.lower().split():
+                bucket = int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dimensions
+                vector[bucket] += 1.0
+            norm = float(np.linalg.norm(vector)) or 1.0
+            vectors.append(vector / norm)
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "test-hash-embedding"
+
+    def get_config(self) -> dict:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "HashEmbedding":
+        return HashEmbedding(**config)
+
+
+@pytest.fixture()
+def chroma_db(tmp_path: Path) -> ChromaDatabase:
+    return ChromaDatabase(tmp_path / "chroma", embedding_function=HashEmbedding())
+
+
+@pytest.fixture()
+def registry(chroma_db: ChromaDatabase) -> RepositoryRegistry:
+    return RepositoryRegistry(chroma_db)
+
+
+@pytest.fixture()
+def memory_service(registry: RepositoryRegistry) -> MemoryService:
+    return MemoryService(registry=registry)
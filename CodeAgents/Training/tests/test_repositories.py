@@ -0,0 +1,382 @@
+"""
+Tests for the training repositories' write paths, record IDs and time-ordered queries.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from src.training.data.buffered_writer import BufferedWriter
+from src.training.data.client import ChromaDatabase
+from src.training.data.content_index import ContentEntry, _bands, hamming_distance, simhash
+from src.training.data.repositories import RepositoryRegistry
+from src.training.utils.ids import ULIDGenerator, ulid_bound, ulid_timestamp_ms
+
+
+class CollectionSpy:
+    """Proxy that counts ``add`` calls on a real Chroma collection."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.add_calls = []
+
+    def add(self, **kwargs):
+        self.add_calls.append(len(kwargs["ids"]))
+        return self._collection.add(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+class CollectionCountSpy:
+    """Proxy that counts ``count`` calls on a real Chroma collection."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.count_calls = 0
+
+    def count(self):
+        self.count_calls += 1
+        return self._collection.count()
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_add_materials_writes_in_batches(registry):
+    repo = registry.training_materials
+    spy = repo.collection = CollectionSpy(repo.collection)
+
+    written = repo.add_materials(
+        [{"topic": "dsa", "document": f"note {i}", "agent_id": "A", "token_count": 2} for i in range(10)],
+        batch_size=4,
+    )
+
+    assert written == 10
+    assert spy.add_calls == [4, 4, 2]
+    assert repo.count() == 10
+    assert repo.token_totals()["total_tokens"] == 20
+
+
+def test_token_totals_are_shared_by_registries_on_one_store(chroma_db):
+    other = RepositoryRegistry(ChromaDatabase(chroma_db.path, embedding_function=chroma_db.embedding_function))
+    first, second = RepositoryRegistry(chroma_db).training_materials, other.training_materials
+
+    first.add_material("dsa", "heap notes", agent_id="A", token_count=3)
+    second.add_material("dsa", "graph notes", agent_id="B", token_count=4)
+    first.add_material("dsa", "trie notes", agent_id="A", token_count=5)
+
+    assert first.token_totals() == second.token_totals() == {"total_tokens": 12, "counted_documents": 3}
+
+
+def test_token_totals_kept_in_collection_metadata_seed_the_index(chroma_db):
+    chroma_db.collections.training.modify(metadata={"total_tokens": 40, "counted_documents": 4})
+    repo = RepositoryRegistry(chroma_db).training_materials
+
+    repo.add_material("dsa", "heap notes", agent_id="A", token_count=2)
+
+    assert repo.token_totals() == {"total_tokens": 42, "counted_documents": 5}
+
+
+def test_bulk_variants_cover_every_repository(registry):
+    registry.scores.add_scores([
+        {"topic": f"t{i}", "score": i, "time_taken": 1.0, "agent_id": f"A{i}"} for i in range(3)
+    ])
+    registry.errors.add_errors([
+        {"message": "boom", "context": "ctx", "agent_id": f"A{i}"} for i in range(3)
+    ])
+    registry.daily_logs.add_logs([
+        {"agent_id": f"A{i}", "activity_type": "study", "details": {"minutes": i}} for i in range(3)
+    ])
+
+    assert registry.scores.count() == registry.errors.count() == registry.daily_logs.count() == 3
+
+
+def test_buffered_writer_flushes_by_count_time_and_exit(registry):
+    repo = registry.errors
+    spy = repo.collection = CollectionSpy(repo.collection)
+    clock = FakeClock()
+
+    with BufferedWriter(repo, max_records=3, max_delay=5.0, clock=clock) as writer:
+        for i in range(4):
+            writer.add(message="timeout", context="fetch", agent_id=f"count{i}")
+        assert spy.add_calls == [3]
+        assert len(writer) == 1
+
+        clock.now = 6.0
+        assert writer.flush_if_due() == 1
+
+        writer.add(message="timeout", context="fetch", agent_id="exit")
+
+    assert spy.add_calls == [3, 1, 1]
+    assert repo.count() == 5
+
+
+def test_ulids_are_monotonic_within_one_millisecond():
+    generator = ULIDGenerator(clock=lambda: 1_700_000_000_000)
+
+    ids = [generator.new() for _ in range(1000)]
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 1000
+    assert all(ulid_timestamp_ms(value) == 1_700_000_000_000 for value in ids)
+    assert ulid_bound(1_700_000_000_000) <= ids[0] <= ids[-1] <= ulid_bound(1_700_000_000_000, upper=True)
+
+
+def test_bursty_logging_from_one_agent_keeps_every_record(registry):
+    for _ in range(50):
+        registry.errors.add_error("boom", "ctx", "A")
+    registry.daily_logs.add_logs([
+        {"agent_id": "A", "activity_type": "study", "details": {}} for _ in range(50)
+    ])
+
+    assert registry.errors.count() == 50
+    assert registry.daily_logs.count() == 50
+    ids = registry.errors.collection.get()["ids"]
+    assert all(value.startswith("error_") for value in ids)
+
+
+def _seed_errors(collection, count, agent_id="A"):
+    # Insert in shuffled time order, bypassing the repository (and its index)
+    epochs = [1_000.0 + (i * 7) % count for i in range(count)]
+    collection.add(
+        ids=[f"seed_{i}" for i in range(count)],
+        documents=[f"error at {epoch}" for epoch in epochs],
+        metadatas=[{"agent_id": agent_id, "timestamp_epoch": epoch} for epoch in epochs],
+    )
+
+
+def test_recent_errors_returns_the_newest_records(registry):
+    _seed_errors(registry.errors.collection, 50)
+
+    result = registry.errors.recent_errors("A", limit=3)
+
+    assert [m["timestamp_epoch"] for m in result["metadatas"]] == [1_049.0, 1_048.0, 1_047.0]
+    assert result["documents"][0] == "error at 1049.0"
+    assert registry.time_index.count(registry.errors.collection.name) == 50
+
+
+def test_time_range_queries_use_the_index(registry):
+    _seed_errors(registry.errors.collection, 50)
+
+    result = registry.errors.latest(agent_id="A", start=1_010.0, end=1_013.0)
+
+    assert [m["timestamp_epoch"] for m in result["metadatas"]] == [1_012.0, 1_011.0, 1_010.0]
+
+
+def test_time_index_is_checked_once_not_on_every_query(registry):
+    repo = registry.errors
+    _seed_errors(repo.collection, 20)
+    assert len(repo.latest(agent_id="A")["ids"]) == 20
+
+    repo.collection = spy = CollectionCountSpy(repo.collection)
+    # Written behind the repository's back, e.g. by a process without the index
+    spy.add(
+        ids=[f"late_{i}" for i in range(5)],
+        documents=["late error"] * 5,
+        metadatas=[{"agent_id": "B", "timestamp_epoch": 2_000.0 + i} for i in range(5)],
+    )
+    for _ in range(3):
+        repo.latest(agent_id="A", limit=2)
+
+    assert spy.count_calls == 0
+    assert repo.latest(agent_id="B")["ids"] == []
+    assert repo.rebuild_time_index() == 25
+    assert len(repo.latest(agent_id="B")["ids"]) == 5
+
+
+def test_latest_without_index_falls_back_to_metadata_sort(registry):
+    repo = registry.errors
+    repo.time_index = None
+    _seed_errors(repo.collection, 20)
+
+    result = repo.latest(agent_id="A", limit=2, start=1_005.0)
+
+    assert [m["timestamp_epoch"] for m in result["metadatas"]] == [1_019.0, 1_018.0]
+
+
+def test_fetch_scores_and_daily_logs_are_newest_first(registry, memory_service):
+    for i in range(5):
+        registry.scores.add_score("dsa", float(i), 1.0, "A", {})
+        registry.daily_logs.add_log("A", "study", {"step": i})
+
+    assert [m["score"] for m in registry.scores.fetch_scores("A", "dsa", limit=2)] == [4.0, 3.0]
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    logs = memory_service.get_daily_logs("A", today)
+    assert [m["step"] for m in logs["metadatas"]] == ["4", "3", "2", "1", "0"]
+
+
+def test_exact_duplicates_are_rejected_within_and_across_batches(registry):
+    repo = registry.training_materials
+    records = [{"topic": "dsa", "document": "heap notes", "agent_id": "A", "file_name": "h.md"}] * 3
+
+    assert repo.add_materials(records) == 1
+    assert repo.add_material("dsa", "heap notes", "A", "h.md") is None
+    # Same content under another agent or file name is a different material
+    assert repo.add_material("dsa", "heap notes", "B", "h.md") is not None
+    assert repo.count() == 2
+
+
+def test_content_index_is_rebuilt_for_documents_written_elsewhere(registry):
+    repo = registry.training_materials
+    repo.collection.add(
+        ids=["legacy"],
+        documents=["legacy heap notes"],
+        metadatas=[{"agent_id": "A", "file_name": "h.md"}],
+    )
+
+    assert repo.find_duplicate("legacy heap notes", "A", "h.md") == "legacy"
+
+
+def test_near_duplicates_are_rejected_when_enabled(registry):
+    base = " ".join(f"word{i}" for i in range(200))
+    edited = base.replace("word100", "changed")
+    assert hamming_distance(simhash(base), simhash(edited)) <= 3
+
+    repo = registry.training_materials
+    repo.near_duplicate_distance = 3
+    assert repo.add_material("dsa", base, "A", "a.md") is not None
+    assert repo.add_material("dsa", edited, "A", "b.md") is None
+    assert repo.add_material("dsa", "completely different text about graphs", "A", "c.md") is not None
+
+
+def test_rewriting_a_stored_id_adds_no_bands_or_tokens(registry):
+    repo = registry.training_materials
+    repo.near_duplicate_distance = 3
+    name = repo.collection.name
+    record = repo.build_record(topic="dsa", document="heap notes", agent_id="A", token_count=5)
+
+    assert repo._write_records([record], skip_dedupe=True) == 1
+    assert repo._write_records([record, record], skip_dedupe=True) == 0
+    assert repo.token_totals() == {"total_tokens": 5, "counted_documents": 1}
+
+    # Re-indexing a record ID replaces its bands instead of adding more
+    entry = ContentEntry(record[0], "A", "unknown", "hash", simhash("heap notes"))
+    repo.content_index.add(name, [entry])
+    repo.content_index.add(name, [entry])
+    bands = repo.content_index._conn.execute(
+        "SELECT COUNT(*) FROM bands WHERE collection = ? AND record_id = ?", (name, record[0])
+    ).fetchone()[0]
+    assert bands == len(_bands(entry.signature))
+    assert repo.content_index.count(name) == 1
+
+
+def test_scores_and_logs_use_the_sqlite_record_store(registry):
+    registry.scores.add_score("dsa", 1.0, 2.0, "A", {"session_type": "drill"})
+    registry.daily_logs.add_log("A", "study", {"minutes": 5})
+
+    assert registry.database.collections.scores.count() == 0
+    assert registry.database.collections.daily_logs.count() == 0
+    assert registry.stats()["scores"] == registry.stats()["daily_logs"] == 1
+    assert registry.scores.fetch_scores("A", "dsa", limit=5)[0]["session_type"] == "drill"
+    # The record table is queried as the index; nothing is mirrored into the time index sidecar
+    assert registry.scores.index is registry.record_store
+    assert registry.scores.time_index is None
+    assert registry.time_index.count(registry.scores.collection.name) == 0
+
+
+def test_migrate_structured_records_from_chroma(chroma_db):
+    legacy = RepositoryRegistry(chroma_db, records_backend="chroma")
+    for i in range(5):
+        legacy.scores.add_score("dsa", float(i), 1.0, "A", {})
+    legacy.daily_logs.add_log("A", "study", {"minutes": 5})
+
+    registry = RepositoryRegistry(chroma_db)
+    assert registry.migrate_structured_records(page_size=2) == {"scores": 5, "daily_logs": 1}
+    # Re-running skips records that were already copied
+    registry.migrate_structured_records(page_size=2, delete_source=True)
+
+    assert registry.scores.count() == 5
+    assert chroma_db.collections.scores.count() == 0
+    assert [m["score"] for m in registry.scores.fetch_scores("A", None, limit=2)] == [4.0, 3.0]
+
+
+def test_upgrading_to_the_record_store_keeps_legacy_history(chroma_db):
+    legacy = RepositoryRegistry(chroma_db, records_backend="chroma")
+    for i in range(3):
+        legacy.scores.add_score("dsa", float(i), 1.0, "A", {})
+    legacy.daily_logs.add_log("A", "study", {"minutes": 5})
+
+    registry = RepositoryRegistry(chroma_db)
+
+    assert registry.scores.count() == 3
+    assert registry.daily_logs.count() == 1
+    assert RepositoryRegistry(chroma_db, auto_migrate_records=False).scores.count() == 3
+
+
+def test_interrupted_record_migration_resumes_until_marked_complete(chroma_db):
+    legacy = RepositoryRegistry(chroma_db, records_backend="chroma")
+    for i in range(5):
+        legacy.scores.add_score("dsa", float(i), 1.0, "A", {})
+    legacy.daily_logs.add_log("A", "study", {"minutes": 5})
+
+    # A migration that stopped after copying two scores
+    partial = RepositoryRegistry(chroma_db, auto_migrate_records=False)
+    payload = chroma_db.collections.scores.get(limit=2, include=["documents", "metadatas"])
+    partial.scores.collection.add(ids=payload["ids"], documents=payload["documents"], metadatas=payload["metadatas"])
+    assert not partial.record_store.is_migrated()
+
+    registry = RepositoryRegistry(chroma_db)
+
+    assert registry.scores.count() == 5
+    assert registry.daily_logs.count() == 1
+    assert registry.record_store.is_migrated()
+    assert not registry._legacy_records_pending()
+
+
+def test_record_store_add_ignores_existing_ids(registry):
+    collection = registry.scores.collection
+    collection.add(ids=["score_1"], documents=["first"], metadatas=[{"agent_id": "A"}])
+    collection.add(ids=["score_1", "score_2"], documents=["again", "second"], metadatas=[{}, {}])
+
+    assert collection.count() == 2
+    assert collection.get(ids=["score_1"])["documents"] == ["first"]
+
+
+def test_sharded_registry_routes_each_agent_to_its_own_collection(chroma_db):
+    registry = RepositoryRegistry(chroma_db, shard_by_agent=True, shard_groups={"B": "team", "C": "team"})
+    repo = registry.training_materials
+    repo.add_materials([
+        {"topic": "dsa", "document": "heap sort notes", "agent_id": "A", "token_count": 3},
+        {"topic": "dsa", "document": "graph search notes", "agent_id": "B", "token_count": 3},
+        {"topic": "dsa", "document": "heap notes again", "agent_id": "C", "token_count": 3},
+    ])
+
+    assert len(registry.shard_router.collection_names()) == 2
+    assert repo.shard("A").count() == 1
+    assert repo.shard("B").collection.name == repo.shard("C").collection.name
+    assert chroma_db.collections.training.count() == 0
+    assert repo.token_totals()["total_tokens"] == 9
+
+    # Grouped shards still filter by agent
+    own = repo.query("heap", limit=5, agent_id="C")
+    assert own["documents"][0] == ["heap notes again"]
+    fleet = repo.query("heap notes", limit=2)
+    assert set(fleet["documents"][0]) == {"heap sort notes", "heap notes again"}
+    assert fleet["distances"][0] == sorted(fleet["distances"][0])
+
+
+def test_migrate_to_shards_moves_materials_without_reembedding(chroma_db):
+    shared = RepositoryRegistry(chroma_db)
+    for i in range(5):
+        shared.training_materials.add_material("dsa", f"note {i}", agent_id=f"A{i % 2}", token_count=2)
+
+    registry = RepositoryRegistry(chroma_db, shard_by_agent=True)
+    assert sum(registry.migrate_to_shards(page_size=2).values()) == 5
+    # Re-running skips copied materials; deleting the source keeps its totals consistent
+    assert sum(registry.migrate_to_shards(page_size=2, delete_source=True).values()) == 0
+
+    repo = registry.training_materials
+    assert chroma_db.collections.training.count() == 0
+    assert shared.training_materials.token_totals()["total_tokens"] == 0
+    assert repo.shard("A0").count() == 3 and repo.shard("A1").count() == 2
+    assert repo.token_totals()["total_tokens"] == 10
+    assert repo.add_material("dsa", "note 0", agent_id="A0") is None
@@ -1,7 +1,7 @@
 """
 Core CodeAgents Modules.
 
-Contains telemetry, access control, metrics, and RAG services.
+Contains telemetry, access control, rate limiting, metrics, and RAG services.
 """
 
 from .telemetry import (
@@ -21,6 +21,24 @@ from .access_control import (
     require_terminal_access
 )
 
+from .audit_log import (
+    AuditLog,
+    SegmentIndex
+)
+
+from .decision_cache import DecisionCache
+
+from .policy_watcher import PolicyWatcher
+
+from .rate_limiter import (
+    RateLimiter,
+    RateLimitRule,
+    RateLimitDecision,
+    RateLimitStore,
+    InMemoryRateLimitStore,
+    FileRateLimitStore
+)
+
 from .metrics import (
     AgentEvaluator,
     MetricScores,
@@ -56,6 +74,20 @@ __all__ = [
     "access_manager",
     "check_terminal_access",
     "require_terminal_access",
+    # Audit Log
+    "AuditLog",
+    "SegmentIndex",
+    # Decision Cache
+    "DecisionCache",
+    # Policy Hot Reload
+    "PolicyWatcher",
+    # Rate Limiting
+    "RateLimiter",
+    "RateLimitRule",
+    "RateLimitDecision",
+    "RateLimitStore",
+    "InMemoryRateLimitStore",
+    "FileRateLimitStore",
     # Metrics
     "AgentEvaluator",
     "MetricScores",
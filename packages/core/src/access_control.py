@@ -15,12 +15,25 @@ from __future__ import annotations
 
 import json
 import logging
+import threading
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set
 from datetime import datetime, timezone
 
+from .audit_log import AuditLog
+from .decision_cache import Decision, DecisionCache
+from .policy_watcher import PolicyWatcher
+from .rate_limiter import (
+    FileRateLimitStore,
+    InMemoryRateLimitStore,
+    RateLimitDecision,
+    RateLimiter,
+    RateLimitRule,
+    RateLimitStore,
+)
+
 logger = logging.getLogger("core.access_control")
 
 class PermissionLevel(Enum):
@@ -59,6 +72,7 @@ class AgentPermissions:
     blocked_commands: List[str] = field(default_factory=list)
     max_execution_time: int = 300  # seconds
     rate_limit_per_minute: int = 60
+    burst_limit: Optional[int] = None  # defaults to ten seconds' worth of requests
     created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     last_modified: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
@@ -88,6 +102,10 @@ class AgentPermissions:
         """Check if agent has at least the required permission level."""
         return self.permission_level.value >= required_level.value
 
+    def rate_limit_rule(self) -> RateLimitRule:
+        """Rate limit enforced for each action of this agent."""
+        return RateLimitRule.from_limits(self.rate_limit_per_minute, self.burst_limit)
+
 @dataclass
 class AccessControlConfig:
     """
@@ -105,7 +123,74 @@ class AccessControlConfig:
         "shutdown", "reboot", "halt", "poweroff", "init", "telinit"
     ])
     audit_log_enabled: bool = True
+    audit_log_capacity: int = 1000  # records kept in memory; older ones live on disk
+    audit_log_dir: Optional[str] = None  # defaults to audit_logs/ next to the config file
     max_concurrent_executions: int = 5
+    rate_limit_enabled: bool = True
+    rate_limit_state_path: Optional[str] = None  # shared file store for multi-process workers
+    decision_cache_size: int = 4096  # cached access decisions; 0 disables the cache
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AccessControlConfig":
+        """
+        [CREATE] Build and validate a configuration from its JSON form.
+
+        Args:
+            data (Dict[str, Any]): Parsed contents of the access control file
+
+        Returns:
+            AccessControlConfig: A fully built configuration
+
+        Raises:
+            ValueError: If the policy is malformed (unknown levels or resources,
+                missing or invalid fields)
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Access control policy must be a JSON object")
+        agents_data = data.get('agents', {})
+        if not isinstance(agents_data, dict):
+            raise ValueError("'agents' must be an object keyed by agent name")
+
+        try:
+            config = cls(
+                version=str(data.get('version', '1.0')),
+                default_permission_level=PermissionLevel(data.get('default_permission_level', 1)),
+                global_allowed_commands=list(data.get('global_allowed_commands', [])),
+                global_blocked_commands=list(data.get('global_blocked_commands', [])),
+                audit_log_enabled=bool(data.get('audit_log_enabled', True)),
+                audit_log_capacity=int(data.get('audit_log_capacity', 1000)),
+                audit_log_dir=data.get('audit_log_dir'),
+                max_concurrent_executions=int(data.get('max_concurrent_executions', 5)),
+                rate_limit_enabled=bool(data.get('rate_limit_enabled', True)),
+                rate_limit_state_path=data.get('rate_limit_state_path'),
+                decision_cache_size=int(data.get('decision_cache_size', 4096))
+            )
+
+            # Load agent permissions
+            for agent_name, perms_data in agents_data.items():
+                if 'permission_level' not in perms_data:
+                    raise ValueError(f"Agent '{agent_name}' is missing 'permission_level'")
+                permissions = AgentPermissions(
+                    agent_name=agent_name,
+                    permission_level=PermissionLevel(perms_data['permission_level']),
+                    allowed_resources={ResourceType(rt) for rt in perms_data.get('allowed_resources', [])},
+                    allowed_commands=list(perms_data.get('allowed_commands', [])),
+                    blocked_commands=list(perms_data.get('blocked_commands', [])),
+                    max_execution_time=int(perms_data.get('max_execution_time', 300)),
+                    rate_limit_per_minute=int(perms_data.get('rate_limit_per_minute', 60)),
+                    burst_limit=perms_data.get('burst_limit'),
+                    created_at=perms_data.get('created_at', datetime.now(timezone.utc).isoformat()),
+                    last_modified=perms_data.get('last_modified', datetime.now(timezone.utc).isoformat())
+                )
+                if permissions.rate_limit_per_minute < 0 or permissions.max_execution_time < 0:
+                    raise ValueError(f"Agent '{agent_name}' has negative limits")
+                config.agents[agent_name] = permissions
+        except (TypeError, AttributeError) as e:
+            raise ValueError(f"Malformed access control policy: {e}") from e
+
+        if config.audit_log_capacity <= 0:
+            raise ValueError("'audit_log_capacity' must be positive")
+        return config
 
 class AccessControlManager:
     """
@@ -117,31 +202,67 @@ class AccessControlManager:
     Attributes:
         config_path (Path): Path to the access control configuration file
         config (AccessControlConfig): Current access control configuration
-        audit_log (List[Dict]): Log of access control decisions
+        audit_log (AuditLog): Bounded log of access control decisions, spilled to disk
+        rate_limiter (RateLimiter): Enforces each agent's per-action rate limits
+        policy_version (int): Incremented every time policies change
+        decision_cache (DecisionCache): LRU cache of policy decisions keyed by policy version
+
+    Thread Safety:
+        The configuration is replaced wholesale on reload and each check reads a
+        single snapshot of it, so in-flight checks never see a half-loaded policy.
     """
 
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(
+        self,
+        config_path: Optional[str] = None,
+        rate_limit_store: Optional[RateLimitStore] = None
+    ):
         """
         [CREATE] Initialize the access control manager.
 
         Args:
             config_path (Optional[str]): Path to config file. Defaults to CodeAgents/access_control.json
+            rate_limit_store (Optional[RateLimitStore]): Rate-limit state backend. Defaults to
+                a file store at ``rate_limit_state_path`` when configured, else in-memory.
         """
         self.config_path = Path(config_path or "CodeAgents/access_control.json")
         self.config = AccessControlConfig()
-        self.audit_log: List[Dict] = []
+        self.policy_version = 0
+        self.decision_cache = DecisionCache()
+        self._reload_lock = threading.Lock()
+        self._policy_watcher: Optional[PolicyWatcher] = None
 
         self._load_config()
 
         # Ensure critical agents have full access
         self._ensure_critical_agent_access()
 
-    def _ensure_critical_agent_access(self) -> None:
+        self.decision_cache.capacity = self.config.decision_cache_size
+        self.audit_log = AuditLog(
+            directory=self._audit_log_dir(self.config),
+            capacity=self.config.audit_log_capacity
+        )
+
+        # An injected store is the caller's choice; rate_limit_state_path then doesn't apply
+        self._rate_limit_store_injected = rate_limit_store is not None
+        if rate_limit_store is None and self.config.rate_limit_state_path:
+            rate_limit_store = FileRateLimitStore(self.config.rate_limit_state_path)
+        self.rate_limiter = RateLimiter(store=rate_limit_store)
+
+    def _audit_log_dir(self, config: AccessControlConfig) -> Path:
+        """Directory of the audit log segments for a configuration."""
+        return Path(config.audit_log_dir) if config.audit_log_dir else self.config_path.parent / "audit_logs"
+
+    def _ensure_critical_agent_access(self, config: Optional[AccessControlConfig] = None) -> None:
         """
         [CREATE] Ensure critical agents have appropriate access levels.
 
         Sets up full access for IDE agents (You/GrokIA, Antigravity, Cursor).
+
+        Args:
+            config (Optional[AccessControlConfig]): Configuration to patch. Defaults to the active one.
         """
+        config = config or self.config
         critical_agents = {
             "GrokIA": "You (GrokIA/Cline) - Primary IDE Agent",
             "Cline": "You (GrokIA/Cline) - Primary IDE Agent",
@@ -150,7 +271,7 @@ class AccessControlManager:
         }
 
         for agent_name, description in critical_agents.items():
-            if agent_name not in self.config.agents:
+            if agent_name not in config.agents:
                 # Create full access permissions for critical agents
                 permissions = AgentPermissions(
                     agent_name=agent_name,
@@ -167,11 +288,11 @@ class AccessControlManager:
                     max_execution_time=3600,  # 1 hour
                     rate_limit_per_minute=1000  # High rate limit
                 )
-                self.config.agents[agent_name] = permissions
+                config.agents[agent_name] = permissions
                 logger.info(f"Granted full access to critical agent: {agent_name} ({description})")
             else:
                 # Ensure existing critical agents maintain full access
-                agent_perms = self.config.agents[agent_name]
+                agent_perms = config.agents[agent_name]
                 if agent_perms.permission_level != PermissionLevel.FULL:
                     agent_perms.permission_level = PermissionLevel.FULL
                     agent_perms.allowed_resources.update({
@@ -206,35 +327,108 @@ class AccessControlManager:
         Returns:
             bool: True if access is granted, False otherwise
         """
-        agent_perms = self.config.agents.get(agent_name)
-
-        if not agent_perms:
-            # Use default permissions for unknown agents
-            agent_perms = AgentPermissions(
-                agent_name=agent_name,
-                permission_level=self.config.default_permission_level,
-                allowed_resources={ResourceType.FILESYSTEM}  # Basic read access
-            )
+        # Snapshot the active policy so a concurrent reload can't change it mid-check.
+        # The version is read first: a reload swaps the config before bumping it,
+        # so a decision is never cached under a newer version than its policy.
+        version = self.policy_version
+        config = self.config
+        agent_perms = self._resolve_permissions(agent_name, config)
+
+        cache_key = (version, agent_name, resource_type, operation, command)
+        decision = self.decision_cache.get(cache_key)
+        if decision is None:
+            decision = self._evaluate_policy(agent_perms, resource_type, operation, command)
+            self.decision_cache.put(cache_key, decision)
+
+        allowed, reason = decision
+        if not allowed:
+            self._log_access_denied(agent_name, resource_type, operation, command, reason or "denied")
+            return False
+
+        # Enforce the agent's rate limit last so denied requests don't consume allowance
+        if config.rate_limit_enabled:
+            rate_decision = self.rate_limiter.acquire(agent_name, operation, agent_perms.rate_limit_rule())
+            if not rate_decision.allowed:
+                self._log_access_denied(
+                    agent_name, resource_type, operation, command,
+                    f"rate_limited (retry after {rate_decision.retry_after:.2f}s)"
+                )
+                return False
 
+        self._log_access_granted(agent_name, resource_type, operation, command)
+        return True
+
+    def _evaluate_policy(
+        self,
+        agent_perms: AgentPermissions,
+        resource_type: ResourceType,
+        operation: str,
+        command: Optional[str]
+    ) -> Decision:
+        """Run the (cacheable) policy checks and return (allowed, denial reason)."""
         # Check resource access
         if not agent_perms.can_access_resource(resource_type):
-            self._log_access_denied(agent_name, resource_type, operation, command, "resource_not_allowed")
-            return False
+            return False, "resource_not_allowed"
 
         # Check permission level
         required_level = self._get_required_level(operation)
         if not agent_perms.has_permission_level(required_level):
-            self._log_access_denied(agent_name, resource_type, operation, command, "insufficient_permissions")
-            return False
+            return False, "insufficient_permissions"
 
         # Check command-specific permissions for terminal operations
         if resource_type == ResourceType.TERMINAL and command:
             if not agent_perms.can_execute_command(command):
-                self._log_access_denied(agent_name, resource_type, operation, command, "command_not_allowed")
-                return False
+                return False, "command_not_allowed"
 
-        self._log_access_granted(agent_name, resource_type, operation, command)
-        return True
+        return True, None
+
+    def get_decision_cache_stats(self) -> Dict[str, float]:
+        """
+        [CREATE] Hit/miss counters of the access decision cache.
+
+        Returns:
+            Dict[str, float]: hits, misses, evictions, size, capacity and hit_rate
+        """
+        stats = self.decision_cache.stats()
+        stats["policy_version"] = self.policy_version
+        return stats
+
+    def _policies_changed(self) -> None:
+        """Bump the policy version and drop decisions computed under older policies."""
+        self.policy_version += 1
+        self.decision_cache.clear()
+
+    def check_rate_limit(self, agent_name: str, operation: str = "access") -> RateLimitDecision:
+        """
+        [CREATE] Report an agent's rate-limit status for an operation without consuming it.
+
+        Args:
+            agent_name (str): Name of the agent
+            operation (str): Operation being rate limited
+
+        Returns:
+            RateLimitDecision: Whether the next request would be allowed and how long to wait
+        """
+        rule = self._resolve_permissions(agent_name).rate_limit_rule()
+        return self.rate_limiter.peek(agent_name, operation, rule)
+
+    def _resolve_permissions(
+        self,
+        agent_name: str,
+        config: Optional[AccessControlConfig] = None
+    ) -> AgentPermissions:
+        """Get an agent's permissions, falling back to defaults for unknown agents."""
+        config = config or self.config
+        agent_perms = config.agents.get(agent_name)
+        if agent_perms:
+            return agent_perms
+
+        # Use default permissions for unknown agents
+        return AgentPermissions(
+            agent_name=agent_name,
+            permission_level=config.default_permission_level,
+            allowed_resources={ResourceType.FILESYSTEM}  # Basic read access
+        )
 
     def _get_required_level(self, operation: str) -> PermissionLevel:
         """Get the minimum permission level required for an operation."""
@@ -302,8 +496,11 @@ class AccessControlManager:
     def update_agent_permissions(self, permissions: AgentPermissions) -> None:
         """Update permissions for an agent."""
         permissions.last_modified = datetime.now(timezone.utc).isoformat()
-        self.config.agents[permissions.agent_name] = permissions
-        self._save_config()
+        # Serialised with reloads so an update can't land on a config being swapped out
+        with self._reload_lock:
+            self.config.agents[permissions.agent_name] = permissions
+            self._policies_changed()
+            self._save_config()
 
     def list_agents(self) -> List[str]:
         """Get list of all configured agents."""
@@ -311,40 +508,117 @@ class AccessControlManager:
 
     def get_audit_log(self, limit: int = 100) -> List[Dict]:
         """Get recent audit log entries."""
-        return self.audit_log[-limit:] if self.audit_log else []
+        return self.audit_log.recent(limit)
 
-    def _load_config(self) -> None:
-        """Load access control configuration from file."""
-        if self.config_path.exists():
+    def query_audit_log(
+        self,
+        agent_name: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        [CREATE] Search the full audit history, including records spilled to disk.
+
+        Args:
+            agent_name (Optional[str]): Only return entries for this agent
+            start (Optional[str]): Inclusive ISO-8601 lower bound on the timestamp
+            end (Optional[str]): Inclusive ISO-8601 upper bound on the timestamp
+            limit (Optional[int]): Return only the newest matching entries
+
+        Returns:
+            List[Dict]: Matching audit entries, oldest first
+        """
+        return self.audit_log.query(agent=agent_name, start=start, end=end, limit=limit)
+
+    def reload_policies(self) -> bool:
+        """
+        [CREATE] Reload policies from the config file and swap them in atomically.
+
+        The new policy is parsed, validated and patched for critical agents
+        before a single reference assignment makes it active. Invalid policies
+        are rejected and the previous policy stays in force. Changed runtime
+        settings (decision cache size, audit log directory and capacity, rate
+        limit state path) are applied as part of the swap.
+
+        Returns:
+            bool: True if a new policy was activated, False if it was rejected
+        """
+        with self._reload_lock:
             try:
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-
-                # Convert loaded data back to proper objects
-                self.config = AccessControlConfig(
-                    version=data.get('version', '1.0'),
-                    default_permission_level=PermissionLevel(data.get('default_permission_level', 1)),
-                    global_allowed_commands=data.get('global_allowed_commands', []),
-                    global_blocked_commands=data.get('global_blocked_commands', []),
-                    audit_log_enabled=data.get('audit_log_enabled', True),
-                    max_concurrent_executions=data.get('max_concurrent_executions', 5)
+                config = self._read_config_file()
+            except Exception as e:
+                logger.error(f"Rejected access control policy from {self.config_path}: {e}")
+                return False
+
+            self._ensure_critical_agent_access(config)
+            previous, self.config = self.config, config
+            self._policies_changed()
+            self._apply_runtime_settings(previous, config)
+            logger.info(f"Activated access control policy version {self.policy_version}")
+            return True
+
+    def _apply_runtime_settings(self, previous: AccessControlConfig, config: AccessControlConfig) -> None:
+        """Rebuild the components configured from settings that changed in a reload."""
+        self.decision_cache.capacity = config.decision_cache_size
+
+        if self._audit_log_dir(config) != self._audit_log_dir(previous):
+            # New decisions go to the new log before the old one is closed; a check
+            # that still holds the old log has its record written synchronously
+            old_log = self.audit_log
+            self.audit_log = AuditLog(directory=self._audit_log_dir(config), capacity=config.audit_log_capacity)
+            old_log.close()
+            logger.info(f"Moved access control audit log to {self.audit_log.directory}")
+        elif config.audit_log_capacity != self.audit_log.capacity:
+            self.audit_log.resize(config.audit_log_capacity)
+
+        if config.rate_limit_state_path != previous.rate_limit_state_path:
+            if self._rate_limit_store_injected:
+                logger.warning(
+                    "Ignoring changed rate_limit_state_path: the rate-limit store was passed explicitly"
+                )
+            else:
+                # State in the previous store is not carried over
+                self.rate_limiter.store = (
+                    FileRateLimitStore(config.rate_limit_state_path)
+                    if config.rate_limit_state_path else InMemoryRateLimitStore()
                 )
+                logger.info(f"Switched rate-limit state to {config.rate_limit_state_path or 'memory'}")
 
-                # Load agent permissions
-                for agent_name, perms_data in data.get('agents', {}).items():
-                    permissions = AgentPermissions(
-                        agent_name=agent_name,
-                        permission_level=PermissionLevel(perms_data['permission_level']),
-                        allowed_resources={ResourceType(rt) for rt in perms_data.get('allowed_resources', [])},
-                        allowed_commands=perms_data.get('allowed_commands', []),
-                        blocked_commands=perms_data.get('blocked_commands', []),
-                        max_execution_time=perms_data.get('max_execution_time', 300),
-                        rate_limit_per_minute=perms_data.get('rate_limit_per_minute', 60),
-                        created_at=perms_data.get('created_at', datetime.now(timezone.utc).isoformat()),
-                        last_modified=perms_data.get('last_modified', datetime.now(timezone.utc).isoformat())
-                    )
-                    self.config.agents[agent_name] = permissions
+    def start_policy_watcher(self, interval: float = 1.0) -> PolicyWatcher:
+        """
+        [CREATE] Hot-reload policies whenever the config file changes.
+
+        Args:
+            interval (float): Seconds between file polls
 
+        Returns:
+            PolicyWatcher: The running watcher
+        """
+        if self._policy_watcher is None:
+            self._policy_watcher = PolicyWatcher(
+                self.config_path, lambda _path: self.reload_policies(), interval=interval
+            )
+        self._policy_watcher.interval = interval
+        self._policy_watcher.start()
+        return self._policy_watcher
+
+    def stop_policy_watcher(self) -> None:
+        """[CREATE] Stop hot-reloading policies."""
+        if self._policy_watcher is not None:
+            self._policy_watcher.stop()
+
+    def _read_config_file(self) -> AccessControlConfig:
+        """Parse and validate the config file without touching the active policy."""
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return AccessControlConfig.from_dict(data)
+
+    def _load_config(self) -> None:
+        """Load access control configuration from file."""
+        if self.config_path.exists():
+            try:
+                self.config = self._read_config_file()
                 logger.info(f"Loaded access control config from {self.config_path}")
 
             except Exception as e:
@@ -368,7 +642,12 @@ class AccessControlManager:
                 'global_allowed_commands': self.config.global_allowed_commands,
                 'global_blocked_commands': self.config.global_blocked_commands,
                 'audit_log_enabled': self.config.audit_log_enabled,
-                'max_concurrent_executions': self.config.max_concurrent_executions
+                'audit_log_capacity': self.config.audit_log_capacity,
+                'audit_log_dir': self.config.audit_log_dir,
+                'max_concurrent_executions': self.config.max_concurrent_executions,
+                'rate_limit_enabled': self.config.rate_limit_enabled,
+                'rate_limit_state_path': self.config.rate_limit_state_path,
+                'decision_cache_size': self.config.decision_cache_size
             }
 
             for agent_name, perms in self.config.agents.items():
@@ -380,12 +659,20 @@ class AccessControlManager:
                     'blocked_commands': perms.blocked_commands,
                     'max_execution_time': perms.max_execution_time,
                     'rate_limit_per_minute': perms.rate_limit_per_minute,
+                    'burst_limit': perms.burst_limit,
                     'created_at': perms.created_at,
                     'last_modified': perms.last_modified
                 }
 
-            with open(self.config_path, 'w', encoding='utf-8') as f:
+            # Write-then-rename so watchers never read a partially written policy
+            tmp_path = self.config_path.with_suffix(self.config_path.suffix + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
+            tmp_path.replace(self.config_path)
+
+            # Our own write is already active; don't reload it
+            if self._policy_watcher is not None:
+                self._policy_watcher.mark_current()
 
             logger.info(f"Saved access control config to {self.config_path}")
 
@@ -0,0 +1,502 @@
+"""
+Module: audit_log.py
+Purpose: Bounded, spill-to-disk audit trail for access control decisions.
+
+Keeps the most recent audit records in a fixed-size in-memory ring buffer
+while a background writer appends every record to rotating JSON-lines
+segment files. A small manifest indexes each segment by agent and time
+range so historical lookups only open the segments that can match.
+
+Memory use is bounded by the ring buffer, the writer queue and the
+per-segment index, independent of process uptime. The writer queue applies
+backpressure instead of dropping records, and a batch that fails to spill is
+retried with backoff; if it still cannot be written it is appended to a
+fallback file next to the segments, so nothing is lost.
+
+Several processes may share one directory: each write takes an advisory
+lock on the directory, re-reads the manifest and merges it with the
+process's own view before appending and saving, so no process drops the
+segments written by another.
+
+Agent: Antigravity
+Created: 2026-10-18T10:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Union
+
+try:  # POSIX advisory locks
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+try:  # Windows byte-range locks
+    import msvcrt
+except ImportError:  # pragma: no cover - POSIX
+    msvcrt = None  # type: ignore[assignment]
+
+logger = logging.getLogger("core.audit_log")
+
+Timestamp = Union[str, datetime]
+
+SEGMENT_PREFIX = "audit-"
+SEGMENT_SUFFIX = ".jsonl"
+MANIFEST_NAME = "index.json"
+LOCK_NAME = "index.lock"
+# Not a segment name, so a failed batch never enters the index
+FALLBACK_NAME = "fallback.jsonl"
+MAX_RETRY_DELAY = 5.0
+
+
+def _as_datetime(value: Timestamp) -> datetime:
+    """Normalise an ISO-8601 string or datetime for comparisons; naive values are taken as UTC."""
+    dt = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+@contextmanager
+def _exclusive_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock on ``path`` (created if missing)."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        elif msvcrt is not None:  # pragma: no cover - Windows
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:  # pragma: no cover - Windows
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+
+@dataclass
+class SegmentIndex:
+    """
+    [CREATE] Index entry describing one audit segment file.
+
+    Attributes:
+        name: Segment file name.
+        first_ts: Timestamp of the oldest record in the segment.
+        last_ts: Timestamp of the newest record in the segment.
+        agents: Agents with at least one record in the segment.
+        records: Number of records in the segment.
+    """
+    name: str
+    first_ts: Optional[str] = None
+    last_ts: Optional[str] = None
+    agents: List[str] = field(default_factory=list)
+    records: int = 0
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        """Account for a record appended to the segment."""
+        ts = entry.get("timestamp")
+        if ts:
+            if self.first_ts is None or _as_datetime(ts) < _as_datetime(self.first_ts):
+                self.first_ts = ts
+            if self.last_ts is None or _as_datetime(ts) > _as_datetime(self.last_ts):
+                self.last_ts = ts
+        agent = entry.get("agent")
+        if agent and agent not in self.agents:
+            self.agents.append(agent)
+        self.records += 1
+
+    def may_contain(self, agent: Optional[str], start: Optional[datetime],
+                    end: Optional[datetime]) -> bool:
+        """Whether the segment can hold records matching the filters."""
+        if agent is not None and agent not in self.agents:
+            return False
+        if start is not None and self.last_ts and _as_datetime(self.last_ts) < start:
+            return False
+        if end is not None and self.first_ts and _as_datetime(self.first_ts) > end:
+            return False
+        return True
+
+
+class AuditLog:
+    """
+    [CREATE] Fixed-size audit ring buffer with asynchronous spill to disk.
+
+    Args:
+        directory: Where segment files and the index live. None keeps the
+            log purely in memory (records evicted from the ring are lost).
+        capacity: Number of recent records kept in memory.
+        max_segment_bytes: Segment size that triggers rotation.
+        max_pending: Bound on records waiting for the writer; ``append``
+            blocks when it is full rather than dropping records.
+        write_retries: Retries of a failed spill before its records go to
+            the fallback file.
+        retry_delay: Delay before the first retry; doubled on each further
+            retry (capped at ``MAX_RETRY_DELAY``).
+
+    Thread Safety:
+        ``append``, ``recent``, ``query`` and ``flush`` may be called from
+        any thread. Each process has a single writer thread; writers of
+        different processes sharing a directory are serialised by a lock
+        file next to the manifest.
+
+    Example:
+        >>> log = AuditLog("CodeAgents/audit_logs", capacity=500)
+        >>> log.append({"timestamp": "2026-10-18T10:00:00+00:00", "agent": "GrokIA"})
+        >>> log.query(agent="GrokIA")[-1]["agent"]
+        'GrokIA'
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        capacity: int = 1000,
+        max_segment_bytes: int = 5 * 1024 * 1024,
+        max_pending: int = 10_000,
+        write_retries: int = 5,
+        retry_delay: float = 0.1,
+    ) -> None:
+        self.directory = Path(directory) if directory is not None else None
+        self.capacity = capacity
+        self.max_segment_bytes = max_segment_bytes
+        self.write_retries = write_retries
+        self.retry_delay = retry_delay
+
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self._buffer_lock = threading.Lock()
+        self._pending: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_pending)
+        self._index_lock = threading.Lock()
+        self._segments: List[SegmentIndex] = []
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        # Serialises the closed check with queueing, so nothing is queued behind the stop sentinel
+        self._append_lock = threading.Lock()
+        self._closed = False
+
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load_manifest()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """
+        [CREATE] Record an audit entry.
+
+        The entry is stored in the ring buffer immediately and queued for the
+        background writer. O(1) unless the writer queue is full. After
+        ``close`` the entry is written synchronously instead.
+
+        Args:
+            entry: JSON-serialisable record with ``timestamp`` and ``agent`` keys.
+        """
+        with self._buffer_lock:
+            self._buffer.append(entry)
+        if self.directory is None:
+            return
+        with self._append_lock:
+            if not self._closed:
+                self._ensure_writer()
+                self._pending.put(entry)
+                return
+        # A caller still holding this log after it was closed (e.g. during a reload)
+        self._spill([entry])
+
+    def recent(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """[CREATE] Most recent in-memory records, oldest first."""
+        with self._buffer_lock:
+            if limit <= 0:
+                return []
+            return list(self._buffer)[-limit:]
+
+    def query(
+        self,
+        agent: Optional[str] = None,
+        start: Optional[Timestamp] = None,
+        end: Optional[Timestamp] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        [CREATE] Look up records by agent and time range across the full history.
+
+        Pending records are flushed first and the manifest is re-read, so
+        segments written by other processes are included; only segments
+        whose index overlaps the filters are read.
+
+        Args:
+            agent: Only return records of this agent.
+            start: Inclusive lower bound on the record timestamp.
+            end: Inclusive upper bound on the record timestamp.
+            limit: Return only the newest ``limit`` matches.
+
+        Returns:
+            List[Dict[str, Any]]: Matching records, oldest first.
+        """
+        start_dt = _as_datetime(start) if start is not None else None
+        end_dt = _as_datetime(end) if end is not None else None
+
+        if self.directory is None:
+            source: Iterator[Dict[str, Any]] = iter(self.recent(self.capacity))
+        else:
+            self.flush()
+            self._refresh_index()
+            source = self._iter_segments(agent, start_dt, end_dt)
+
+        results: Deque[Dict[str, Any]] = deque(maxlen=limit)
+        for entry in source:
+            if agent is not None and entry.get("agent") != agent:
+                continue
+            ts = entry.get("timestamp")
+            if ts and (start_dt or end_dt):
+                entry_dt = _as_datetime(ts)
+                if start_dt is not None and entry_dt < start_dt:
+                    continue
+                if end_dt is not None and entry_dt > end_dt:
+                    continue
+            results.append(entry)
+        return list(results)
+
+    def resize(self, capacity: int) -> None:
+        """[CREATE] Change how many recent records are kept in memory, keeping the newest."""
+        with self._buffer_lock:
+            self.capacity = capacity
+            self._buffer = deque(self._buffer, maxlen=capacity)
+
+    def flush(self) -> None:
+        """[CREATE] Block until every queued record has been written to disk."""
+        if self._writer is not None:
+            self._pending.join()
+
+    def close(self) -> None:
+        """[CREATE] Flush pending records and stop the writer thread."""
+        with self._append_lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._writer is not None:
+            self._pending.put(None)
+            self._writer.join()
+            # Anything still queued missed the writer; write it here
+            leftover: List[Optional[Dict[str, Any]]] = []
+            while True:
+                try:
+                    leftover.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            records = [entry for entry in leftover if entry is not None]
+            if records:
+                self._spill(records)
+            for _ in leftover:
+                self._pending.task_done()
+
+    @property
+    def segments(self) -> List[SegmentIndex]:
+        """Snapshot of the segment index."""
+        with self._index_lock:
+            return list(self._segments)
+
+    def __len__(self) -> int:
+        with self._buffer_lock:
+            return len(self._buffer)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run_writer, name="audit-log-writer", daemon=True
+                )
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _run_writer(self) -> None:
+        while True:
+            batch = [self._pending.get()]
+            # Drain whatever else is queued so one write covers the burst.
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(entry is None for entry in batch)
+            records = [entry for entry in batch if entry is not None]
+            try:
+                if records:
+                    self._spill(records)
+            finally:
+                # Only once written (or saved to the fallback file), so flush() waits for it
+                for _ in batch:
+                    self._pending.task_done()
+            if stop:
+                return
+
+    def _spill(self, records: List[Dict[str, Any]]) -> None:
+        """[CREATE] Write records to the segments, retrying with backoff, else to the fallback file."""
+        delay = self.retry_delay
+        for attempt in range(self.write_retries + 1):
+            try:
+                self._write_batch(records)
+                return
+            except Exception as e:
+                if attempt == self.write_retries:
+                    logger.error(f"Failed to spill {len(records)} audit records after {attempt + 1} attempts: {e}")
+                    break
+                logger.warning(f"Retrying spill of {len(records)} audit records in {delay:.2f}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+        self._write_fallback(records)
+
+    def _write_fallback(self, records: List[Dict[str, Any]]) -> None:
+        assert self.directory is not None
+        path = self.directory / FALLBACK_NAME
+        lines = "".join(
+            json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n" for entry in records
+        )
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            logger.error(f"Wrote {len(records)} unspilled audit records to {path}")
+        except Exception as e:
+            # Last resort: the records end up in the application log
+            logger.critical(f"Failed to write audit fallback {path}: {e}; records: {lines}")
+
+    def _write_batch(self, records: List[Dict[str, Any]]) -> None:
+        assert self.directory is not None
+        with self._index_lock, _exclusive_lock(self.directory / LOCK_NAME):
+            # Other processes may have appended or rotated since our last write.
+            self._segments = self._merge_index(self._read_manifest())
+            segment = self._current_segment()
+            path = self.directory / segment.name
+            with open(path, "a", encoding="utf-8") as f:
+                for entry in records:
+                    f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+                    f.write("\n")
+                    segment.add(entry)
+                size = f.tell()
+            if size >= self.max_segment_bytes:
+                self._segments.append(SegmentIndex(name=self._segment_name(len(self._segments) + 1)))
+                logger.info(f"Rotated audit log after {segment.name} reached {size} bytes")
+            self._save_manifest()
+
+    def _current_segment(self) -> SegmentIndex:
+        if not self._segments:
+            self._segments.append(SegmentIndex(name=self._segment_name(1)))
+        return self._segments[-1]
+
+    @staticmethod
+    def _segment_name(number: int) -> str:
+        return f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+
+    # ------------------------------------------------------------------
+    # Index and segment reading
+    # ------------------------------------------------------------------
+
+    def _iter_segments(self, agent: Optional[str], start: Optional[datetime],
+                       end: Optional[datetime]) -> Iterator[Dict[str, Any]]:
+        assert self.directory is not None
+        for segment in self.segments:
+            if not segment.records or not segment.may_contain(agent, start, end):
+                continue
+            path = self.directory / segment.name
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            yield json.loads(line)
+            except FileNotFoundError:
+                logger.warning(f"Audit segment missing: {path}")
+
+    def _load_manifest(self) -> None:
+        assert self.directory is not None
+        segments = self._read_manifest()
+        if segments is None:
+            self._segments = self._rebuild_index()
+            return
+        self._segments = segments
+        if self._segments:
+            # The last segment may have been appended after the manifest was saved.
+            self._segments[-1] = self._scan_segment(self.directory / self._segments[-1].name)
+
+    def _read_manifest(self) -> Optional[List[SegmentIndex]]:
+        """[CREATE] Segment index saved on disk, or None if missing or unreadable."""
+        assert self.directory is not None
+        manifest = self.directory / MANIFEST_NAME
+        if not manifest.exists():
+            return None
+        try:
+            with open(manifest, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return [SegmentIndex(**seg) for seg in data.get("segments", [])]
+        except Exception as e:
+            logger.error(f"Failed to load audit index {manifest}: {e}")
+            return None
+
+    def _merge_index(self, saved: Optional[List[SegmentIndex]]) -> List[SegmentIndex]:
+        """
+        [CREATE] Combine the saved index with this process's view.
+
+        Saved entries win, since the manifest is only written under the
+        directory lock; segments known only locally (e.g. after the manifest
+        was lost) are kept, so no segment is ever dropped.
+        """
+        if saved is None:
+            return list(self._segments)
+        by_name = {seg.name: seg for seg in self._segments}
+        by_name.update((seg.name, seg) for seg in saved)
+        return [by_name[name] for name in sorted(by_name)]
+
+    def _refresh_index(self) -> None:
+        # The manifest is replaced atomically, so reading it needs no lock.
+        saved = self._read_manifest()
+        with self._index_lock:
+            self._segments = self._merge_index(saved)
+
+    def _rebuild_index(self) -> List[SegmentIndex]:
+        """[CREATE] Rebuild the segment index by scanning the segment files."""
+        assert self.directory is not None
+        return [
+            self._scan_segment(path)
+            for path in sorted(self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+        ]
+
+    @staticmethod
+    def _scan_segment(path: Path) -> SegmentIndex:
+        segment = SegmentIndex(name=path.name)
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        segment.add(json.loads(line))
+        return segment
+
+    def _save_manifest(self) -> None:
+        assert self.directory is not None
+        manifest = self.directory / MANIFEST_NAME
+        tmp = manifest.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"segments": [asdict(seg) for seg in self._segments]}, f)
+        tmp.replace(manifest)
@@ -0,0 +1,97 @@
+"""
+Module: decision_cache.py
+Purpose: Bounded LRU cache for access control decisions.
+
+Agents check the same (agent, resource, operation, command) tuples over and
+over; caching the policy outcome skips re-running the permission and command
+pattern checks. Keys include the policy version, so entries computed under an
+older policy can never be served after a reload.
+
+Agent: Antigravity
+Created: 2026-10-18T12:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+# (allowed, denial reason)
+Decision = Tuple[bool, Optional[str]]
+
+
+class DecisionCache:
+    """
+    [CREATE] Thread-safe LRU cache with hit/miss accounting.
+
+    Args:
+        capacity: Maximum number of cached decisions; 0 disables caching.
+
+    Complexity:
+        O(1) per ``get``/``put``.
+
+    Example:
+        >>> cache = DecisionCache(capacity=2)
+        >>> cache.put((1, "GrokIA", "terminal", "execute", "ls"), (True, None))
+        >>> cache.get((1, "GrokIA", "terminal", "execute", "ls"))
+        (True, None)
+    """
+
+    def __init__(self, capacity: int = 4096) -> None:
+        self.capacity = capacity
+        self._entries: "OrderedDict[Hashable, Decision]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Decision]:
+        """[CREATE] Return the cached decision for ``key`` and mark it recently used."""
+        with self._lock:
+            decision = self._entries.get(key)
+            if decision is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return decision
+
+    def put(self, key: Hashable, decision: Decision) -> None:
+        """[CREATE] Cache a decision, evicting the least recently used entry if full."""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = decision
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """[CREATE] Drop every cached decision (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        [CREATE] Cache effectiveness counters.
+
+        Returns:
+            Dict[str, float]: hits, misses, evictions, size, capacity and hit_rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
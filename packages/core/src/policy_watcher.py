@@ -0,0 +1,118 @@
+"""
+Module: policy_watcher.py
+Purpose: Background file watcher driving hot reloads of access policies.
+
+Polls a policy file's stat signature (mtime, size, inode) from a daemon
+thread and invokes a callback when it changes. Polling a single ``stat``
+per interval is cheap, portable and needs no optional dependency, so it is
+used on every platform.
+
+Agent: Antigravity
+Created: 2026-10-18T11:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger("core.policy_watcher")
+
+FileSignature = Optional[Tuple[int, int, int]]
+
+
+def file_signature(path: Path) -> FileSignature:
+    """
+    [CREATE] Cheap change-detection signature for a file.
+
+    Returns:
+        FileSignature: (mtime_ns, size, inode), or None if the file is missing.
+    """
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class PolicyWatcher:
+    """
+    [CREATE] Watches a policy file and reports changes from a background thread.
+
+    Args:
+        path: File to watch.
+        on_change: Called with the path whenever its signature changes.
+            Exceptions are logged and do not stop the watcher.
+        interval: Seconds between polls.
+
+    Thread Safety:
+        ``start``, ``stop`` and ``mark_current`` may be called from any thread.
+
+    Example:
+        >>> watcher = PolicyWatcher(Path("CodeAgents/access_control.json"), print)
+        >>> watcher.start()
+        >>> watcher.stop()
+    """
+
+    def __init__(self, path: Path, on_change: Callable[[Path], None], interval: float = 1.0) -> None:
+        self.path = Path(path)
+        self.on_change = on_change
+        self.interval = interval
+        self._signature: FileSignature = file_signature(self.path)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the polling thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """[CREATE] Start polling in a daemon thread (no-op if already running)."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="policy-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.path} for policy changes every {self.interval}s")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """[CREATE] Stop polling and wait for the thread to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def mark_current(self) -> None:
+        """[CREATE] Accept the file's current state, e.g. after writing it ourselves."""
+        with self._lock:
+            self._signature = file_signature(self.path)
+
+    def poll(self) -> bool:
+        """
+        [CREATE] Check the file once and fire ``on_change`` if it changed.
+
+        Returns:
+            bool: True if a change was detected.
+        """
+        signature = file_signature(self.path)
+        with self._lock:
+            if signature == self._signature:
+                return False
+            self._signature = signature
+        if signature is None:
+            logger.warning(f"Policy file {self.path} disappeared; keeping current policies")
+            return False
+        try:
+            self.on_change(self.path)
+        except Exception as e:
+            logger.error(f"Policy change handler failed for {self.path}: {e}")
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
@@ -0,0 +1,389 @@
+"""
+Module: rate_limiter.py
+Purpose: Token-bucket and sliding-window rate limiting for CodeAgents.
+
+Enforces the per-agent rate limits declared in the access-control policies.
+Every (agent, action) pair owns a token bucket that shapes bursts plus a
+sliding-window counter that caps the sustained (per minute) rate. Decisions are O(1) and report how long the caller has to
+wait until the next request would be allowed.
+
+State lives in a pluggable store: the in-memory store is shared by all
+threads of a process, while the file-backed store keeps one small locked
+file per key so several worker processes respect the same limits. Pointing
+the file store at a tmpfs directory such as ``/dev/shm`` gives a
+shared-memory store without any extra dependency.
+
+Agent: Antigravity
+Created: 2026-10-18T09:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:  # POSIX advisory locks
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+try:  # Windows byte-range locks
+    import msvcrt
+except ImportError:  # pragma: no cover - POSIX
+    msvcrt = None  # type: ignore[assignment]
+
+logger = logging.getLogger("core.rate_limiter")
+
+SUSTAINED_WINDOW_SECONDS = 60.0
+# Waits at or below this are float drift from the refill/window arithmetic;
+# a caller that slept exactly ``retry_after`` must then be admitted.
+WAIT_TOLERANCE_SECONDS = 1e-9
+
+# State layout (flat list of floats so it serialises compactly):
+# [tokens, bucket_updated_at,
+#  sustained_window_start, sustained_current, sustained_previous]
+RateLimitState = List[float]
+StateUpdater = Callable[[Optional[RateLimitState]], Tuple[Optional[RateLimitState], "RateLimitDecision"]]
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """
+    [CREATE] Rate limit applied to one (agent, action) pair.
+
+    Attributes:
+        per_minute: Sustained number of requests allowed per minute.
+        burst: Maximum number of requests allowed back to back.
+    """
+    per_minute: int
+    burst: int
+
+    @property
+    def refill_per_second(self) -> float:
+        """Token refill rate of the bucket."""
+        return self.per_minute / SUSTAINED_WINDOW_SECONDS
+
+    @property
+    def unlimited(self) -> bool:
+        """A non-positive per-minute limit disables rate limiting."""
+        return self.per_minute <= 0
+
+    @classmethod
+    def from_limits(cls, per_minute: int, burst: Optional[int] = None) -> "RateLimitRule":
+        """
+        [CREATE] Build a rule, deriving a default burst of ten seconds' worth of requests.
+
+        Args:
+            per_minute: Sustained requests per minute.
+            burst: Explicit burst size, or None to derive one.
+
+        Returns:
+            RateLimitRule: The normalised rule.
+        """
+        if burst is None or burst <= 0:
+            burst = max(1, math.ceil(per_minute / 6))
+        return cls(per_minute=per_minute, burst=min(burst, max(per_minute, 1)))
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    """
+    [CREATE] Outcome of a rate-limit check.
+
+    Attributes:
+        allowed: Whether the request fits within the limits.
+        retry_after: Seconds to wait until the next request would be allowed
+            (0.0 when allowed).
+        remaining: Whole tokens left in the bucket after the decision.
+        key: Store key of the (agent, action) pair.
+    """
+    allowed: bool
+    retry_after: float
+    remaining: int
+    key: str
+
+
+class RateLimitStore(ABC):
+    """
+    [CREATE] Storage backend for rate-limit state.
+
+    Implementations must run ``updater`` atomically with respect to every
+    other update of the same key.
+    """
+
+    @abstractmethod
+    def update(self, key: str, updater: StateUpdater) -> "RateLimitDecision":
+        """Atomically read, transform and write the state of ``key``."""
+
+    @abstractmethod
+    def clear(self, key: Optional[str] = None) -> None:
+        """Drop the state of one key, or of every key when ``key`` is None."""
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """
+    [CREATE] Process-local store guarded by a single lock.
+
+    Thread Safety:
+        All updates are serialised by an internal lock; each update is O(1).
+    """
+
+    def __init__(self) -> None:
+        self._states: Dict[str, RateLimitState] = {}
+        self._lock = threading.Lock()
+
+    def update(self, key: str, updater: StateUpdater) -> RateLimitDecision:
+        with self._lock:
+            new_state, decision = updater(self._states.get(key))
+            if new_state is not None:
+                self._states[key] = new_state
+            return decision
+
+    def clear(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._states.clear()
+            else:
+                self._states.pop(key, None)
+
+
+class FileRateLimitStore(RateLimitStore):
+    """
+    [CREATE] File-backed store shared between processes.
+
+    Each key is kept in its own small JSON file guarded by an exclusive
+    advisory lock (``fcntl.flock`` on POSIX, ``msvcrt.locking`` on Windows),
+    so a decision only touches the file of the key being checked.
+
+    Args:
+        directory: Directory holding the state files. Use a tmpfs path such
+            as ``/dev/shm/codeagents-ratelimits`` for a shared-memory store.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._local_lock = threading.Lock()
+
+    def _path_for(self, key: str) -> Path:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+        return self.directory / f"{digest}.json"
+
+    @contextmanager
+    def _locked(self, path: Path) -> Iterator[int]:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            elif msvcrt is not None:  # pragma: no cover - Windows
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            yield fd
+        finally:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                elif msvcrt is not None:  # pragma: no cover - Windows
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(fd)
+
+    def update(self, key: str, updater: StateUpdater) -> RateLimitDecision:
+        path = self._path_for(key)
+        with self._local_lock, self._locked(path) as fd:
+            os.lseek(fd, 0, os.SEEK_SET)
+            raw = b""
+            while chunk := os.read(fd, 4096):
+                raw += chunk
+            state: Optional[RateLimitState] = None
+            if raw.strip():
+                try:
+                    state = json.loads(raw)
+                except json.JSONDecodeError:
+                    logger.warning(f"Discarding corrupt rate-limit state in {path}")
+            new_state, decision = updater(state)
+            if new_state is not None:
+                payload = json.dumps(new_state, separators=(",", ":")).encode("utf-8")
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, payload)
+                os.ftruncate(fd, len(payload))
+            return decision
+
+    def clear(self, key: Optional[str] = None) -> None:
+        # State files are also the lock targets: unlinking one would let a new
+        # process lock a fresh inode while another still holds the old one, so
+        # they are emptied under the lock instead.
+        paths = [self._path_for(key)] if key is not None else list(self.directory.glob("*.json"))
+        for path in paths:
+            if not path.exists():
+                continue
+            with self._local_lock, self._locked(path) as fd:
+                os.ftruncate(fd, 0)
+
+
+def _roll_window(start: float, current: float, previous: float,
+                 window: float, now: float) -> Tuple[float, float, float]:
+    """Advance a sliding-window counter so that ``now`` falls in its current slot."""
+    if now - start >= window:
+        elapsed_windows = int((now - start) // window)
+        previous = current if elapsed_windows == 1 else 0.0
+        current = 0.0
+        start += elapsed_windows * window
+    return start, current, previous
+
+
+def _window_wait(start: float, current: float, previous: float, window: float,
+                 limit: float, cost: float, now: float) -> float:
+    """
+    [CREATE] Seconds until a sliding-window counter admits ``cost`` more requests.
+
+    The window estimate is ``previous * (1 - elapsed / window) + current``.
+
+    Complexity:
+        O(1).
+    """
+    elapsed = now - start
+    if previous * (1.0 - elapsed / window) + current + cost <= limit:
+        return 0.0
+    headroom = limit - current - cost
+    if headroom >= 0 and previous > 0:
+        # The previous slot's weight decays enough within the current slot.
+        return max(0.0, window * (1.0 - headroom / previous) - elapsed)
+    # Wait for the next slot, where the current count becomes "previous".
+    until_next = window - elapsed
+    if current <= 0 or cost > limit:
+        return until_next
+    fraction = max(0.0, 1.0 - (limit - cost) / current)
+    return until_next + window * fraction
+
+
+class RateLimiter:
+    """
+    [CREATE] Per-agent, per-action rate limiter.
+
+    Combines a token bucket (capacity ``burst``, refilled at
+    ``per_minute / 60`` tokens per second) with a sliding-window counter for
+    the sustained rate. A request is admitted only if both agree; rejected
+    requests consume nothing. The bucket alone caps bursts: a separate
+    per-second window below ``per_minute / 60`` would stay full from its
+    previous slot and halve the sustained rate of a small burst.
+
+    Args:
+        store: State backend; defaults to an in-memory store.
+        clock: Time source in seconds. Must be comparable across processes
+            when a shared store is used, hence wall-clock time by default.
+
+    Thread Safety:
+        Safe for concurrent use; atomicity is delegated to the store.
+
+    Example:
+        >>> limiter = RateLimiter()
+        >>> rule = RateLimitRule.from_limits(per_minute=60, burst=5)
+        >>> limiter.acquire("GrokIA", "execute", rule).allowed
+        True
+    """
+
+    def __init__(self, store: Optional[RateLimitStore] = None,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.store = store or InMemoryRateLimitStore()
+        self._clock = clock
+
+    @staticmethod
+    def make_key(agent_name: str, action: str) -> str:
+        """Store key for an (agent, action) pair."""
+        return f"{agent_name}:{action}"
+
+    def acquire(self, agent_name: str, action: str, rule: RateLimitRule,
+                cost: int = 1) -> RateLimitDecision:
+        """
+        [CREATE] Try to consume ``cost`` requests for an (agent, action) pair.
+
+        Args:
+            agent_name: Agent issuing the request.
+            action: Operation being rate limited.
+            rule: Limits to enforce.
+            cost: Number of requests to account for.
+
+        Returns:
+            RateLimitDecision: Whether the request is allowed and, if not, how
+            long to wait before retrying.
+
+        Complexity:
+            O(1) per decision.
+        """
+        return self._decide(agent_name, action, rule, cost, consume=True)
+
+    def peek(self, agent_name: str, action: str, rule: RateLimitRule,
+             cost: int = 1) -> RateLimitDecision:
+        """[CREATE] Report what ``acquire`` would decide without consuming anything."""
+        return self._decide(agent_name, action, rule, cost, consume=False)
+
+    def reset(self, agent_name: Optional[str] = None, action: Optional[str] = None) -> None:
+        """
+        [CREATE] Forget rate-limit state.
+
+        Args:
+            agent_name: Agent to reset; None resets every key.
+            action: Action to reset for ``agent_name`` (required with it).
+
+        Raises:
+            ValueError: If ``agent_name`` is given without ``action``.
+        """
+        if agent_name is None:
+            self.store.clear()
+        elif action is None:
+            raise ValueError("action is required when resetting a single agent")
+        else:
+            self.store.clear(self.make_key(agent_name, action))
+
+    def _decide(self, agent_name: str, action: str, rule: RateLimitRule,
+                cost: int, consume: bool) -> RateLimitDecision:
+        key = self.make_key(agent_name, action)
+        if rule.unlimited:
+            return RateLimitDecision(allowed=True, retry_after=0.0, remaining=-1, key=key)
+
+        now = self._clock()
+
+        def updater(state: Optional[RateLimitState]) -> Tuple[Optional[RateLimitState], RateLimitDecision]:
+            if state is not None and len(state) == 8:
+                # Written with the former per-second window; its counters are dropped
+                state = state[:2] + state[5:]
+            if state is None or len(state) != 5:
+                state = [float(rule.burst), now, now, 0.0, 0.0]
+            tokens, updated, s_start, s_cur, s_prev = state
+
+            tokens = min(float(rule.burst), tokens + max(0.0, now - updated) * rule.refill_per_second)
+            s_start, s_cur, s_prev = _roll_window(s_start, s_cur, s_prev, SUSTAINED_WINDOW_SECONDS, now)
+
+            bucket_wait = 0.0 if tokens >= cost else (cost - tokens) / rule.refill_per_second
+            retry_after = max(
+                bucket_wait,
+                _window_wait(s_start, s_cur, s_prev, SUSTAINED_WINDOW_SECONDS, rule.per_minute, cost, now),
+            )
+            allowed = retry_after <= WAIT_TOLERANCE_SECONDS
+            if allowed and consume:
+                tokens = max(0.0, tokens - cost)
+                s_cur += cost
+
+            decision = RateLimitDecision(
+                allowed=allowed,
+                retry_after=0.0 if allowed else retry_after,
+                remaining=int(tokens),
+                key=key,
+            )
+            new_state = [tokens, now, s_start, s_cur, s_prev]
+            return (new_state if consume else None), decision
+
+        return self.store.update(key, updater)
@@ -23,6 +23,8 @@ from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.table import Table
 
+from .data.repositories import RepositoryRegistry
+from .data.token_budget_ledger import BudgetLimits
 from .models.activity import ActivityResult, ActivityType
 from .models.session import SessionType
 from .models.token_metrics import TokenBudget
@@ -47,8 +49,6 @@ TRAINING_ROOT = Path(__file__).parent.parent.parent
 PROJECT_ROOT = TRAINING_ROOT.parent.parent
 FLASHCARD_DECKS_DIR = TRAINING_ROOT / "Flashcards" / "decks"
 
-token_tracker = TokenTracker(PROJECT_ROOT / "token_metrics")
-
 # Initialize services
 training_manager = TrainingManager(TRAINING_ROOT)
 reflex_service = ReflexService(TRAINING_ROOT)
@@ -84,6 +84,11 @@ def _load_token_budget_config() -> Dict[str, Any]:
 
 TOKEN_BUDGET_CONFIG = _load_token_budget_config()
 
+token_tracker = TokenTracker(
+    PROJECT_ROOT / "token_metrics",
+    budget_limits=BudgetLimits.from_config(TOKEN_BUDGET_CONFIG),
+)
+
 
 @app.command()
 def init(
@@ -157,7 +162,7 @@ def start(
     warnings = _complete_structured_session(agent, session)
     progress = training_manager.update_progress_after_session(agent, session)
 
-    summary = token_tracker.get_session_summary(session.session_id)
+    summary = token_tracker.end_session(session.session_id)
     console.print(
         f"[green]✅ Session complete. XP earned: {session.total_xp_earned}, "
         f"Level: {progress.current_level}, Avg quality: {summary.average_quality_score:.1f}[/green]"
@@ -394,6 +399,91 @@ def recall(
         console.print(f"[yellow]No information found for topic: {topic}[/yellow]")
 
 
+@app.command("migrate-records")
+def migrate_records(
+    delete_source: bool = typer.Option(False, "--delete-source", help="Remove migrated records from Chroma"),
+    page_size: int = typer.Option(500, "--page-size", help="Records copied per batch"),
+) -> None:
+    """Move scores and daily logs from Chroma into the structured SQLite store."""
+    try:
+        migrated = memory_service.registry.migrate_structured_records(
+            page_size=page_size, delete_source=delete_source
+        )
+    except RuntimeError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+
+    table = Table(title="Structured Record Migration")
+    table.add_column("Collection", style="cyan")
+    table.add_column("Records", style="magenta")
+    for collection, count in migrated.items():
+        table.add_row(collection, str(count))
+    console.print(table)
+
+
+@app.command("convert-token-log")
+def convert_token_log() -> None:
+    """Fold per-operation token metric files into the daily JSONL log."""
+    converted = token_tracker.convert_legacy_operations()
+    console.print(f"[green]Converted {converted} operation records.[/green]")
+
+
+@app.command("rebuild-token-rollups")
+def rebuild_token_rollups(
+    agent: Optional[str] = typer.Option(None, "--agent", "-a", help="Only rebuild this agent"),
+) -> None:
+    """Recompute daily token usage rollups from the operation log."""
+    rebuilt = token_tracker.rebuild_rollups(agent)
+    console.print(f"[green]Rebuilt {rebuilt} daily rollups.[/green]")
+
+
+@app.command("budget-check")
+def budget_check(
+    agent: str = typer.Argument(..., help="Agent ID"),
+    tokens: int = typer.Option(..., "--tokens", "-n", help="Estimated prompt/context tokens"),
+    session_id: Optional[str] = typer.Option(None, "--session", "-s", help="Training session ID"),
+    operation: Optional[str] = typer.Option(None, "--operation", "-o", help="Operation type"),
+) -> None:
+    """Check an estimated operation size against the remaining token budgets."""
+    decision = token_tracker.preflight(agent, tokens, session_id=session_id, operation_type=operation)
+    color = {"allow": "green", "trim": "yellow"}.get(decision.action, "red")
+    console.print(
+        f"[{color}]{decision.action.upper()}[/{color}] {decision.allowed_tokens} of "
+        f"{decision.requested_tokens} tokens"
+        + (f" (limited by {decision.limiting_scope})" if decision.limiting_scope else "")
+    )
+    for scope, remaining in decision.remaining.items():
+        console.print(f"  {scope}: {remaining} tokens left")
+
+
+@app.command("shard-materials")
+def shard_materials(
+    group: List[str] = typer.Option([], "--group", help="AGENT=GROUP; agents of a group share a shard"),
+    delete_source: bool = typer.Option(False, "--delete-source", help="Remove migrated materials from the shared collection"),
+    page_size: int = typer.Option(500, "--page-size", help="Materials copied per batch"),
+) -> None:
+    """Move training materials into per-agent (or per-group) collections."""
+    groups: Dict[str, str] = {}
+    for entry in group:
+        agent_id, separator, group_name = entry.partition("=")
+        if not separator or not agent_id or not group_name:
+            console.print(f"[red]Invalid --group '{entry}', expected AGENT=GROUP[/red]")
+            raise typer.Exit(1)
+        groups[agent_id] = group_name
+
+    registry = RepositoryRegistry(
+        memory_service.registry.database, shard_by_agent=True, shard_groups=groups
+    )
+    migrated = registry.migrate_to_shards(page_size=page_size, delete_source=delete_source)
+
+    table = Table(title="Training Material Sharding")
+    table.add_column("Shard", style="cyan")
+    table.add_column("Materials", style="magenta")
+    for shard, count in sorted(migrated.items()):
+        table.add_row(shard, str(count))
+    console.print(table)
+
+
 @app.command()
 def progress(
     agent: str = typer.Argument(..., help="Agent ID"),
@@ -492,12 +582,11 @@ def leaderboard(
     top: int = typer.Option(10, "--top", "-t"),
 ) -> None:
     """View training leaderboard."""
-    progress_map = training_manager.progress_repo.load_all()  # type: ignore[attr-defined]
-    if not progress_map:
+    ranked = training_manager.progress_repo.leaderboard(top)  # type: ignore[attr-defined]
+    if not ranked:
         console.print("[yellow]No agents have recorded progress yet.[/yellow]")
         return
 
-    ranked = sorted(progress_map.values(), key=lambda p: p.xp.total, reverse=True)[:top]
     table = Table(title="Agent Leaderboard")
     table.add_column("#", justify="right")
     table.add_column("Agent")
@@ -505,13 +594,13 @@ def leaderboard(
     table.add_column("XP", justify="right")
     table.add_column("Streak", justify="right")
 
-    for idx, progress in enumerate(ranked, 1):
+    for idx, entry in enumerate(ranked, 1):
         table.add_row(
             str(idx),
-            progress.agent_id,
-            str(progress.current_level),
-            str(progress.xp.total),
-            str(progress.daily_streak.current),
+            entry.agent_id,
+            str(entry.level),
+            str(entry.xp),
+            str(entry.streak),
         )
 
     console.print(table)
@@ -648,7 +737,7 @@ def _record_simulation_tokens(
     if budget:
         token_tracker.check_budget(metrics, budget)
 
-    return token_tracker.get_session_summary(session_id)
+    return token_tracker.end_session(session_id)
 
 
 def _get_operation_budget(operation_key: str) -> Optional[TokenBudget]:
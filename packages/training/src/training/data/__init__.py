@@ -5,7 +5,8 @@ Provides structured helpers for interacting with the persistent ChromaDB
 back-end so higher-level services can remain storage agnostic.
 """
 
+from .buffered_writer import BufferedWriter
 from .client import ChromaDatabase, CollectionSet
 from .repositories import RepositoryRegistry
 
-__all__ = ["ChromaDatabase", "CollectionSet", "RepositoryRegistry"]
+__all__ = ["BufferedWriter", "ChromaDatabase", "CollectionSet", "RepositoryRegistry"]
@@ -0,0 +1,177 @@
+"""
+Module: leaderboard_index.py
+Purpose: Compact SQLite index of per-agent ranking fields.
+
+Ranking agents from their full progress files means parsing every agent's
+XP history, badges and completions just to sort by a few numbers. This
+index keeps one small row per agent (level, XP, streak, last activity),
+updated whenever progress is written, so leaderboards, top-N queries and
+summary stats are single indexed queries.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-18T23:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..models.progress import AgentProgress
+
+# Sort keys accepted by LeaderboardIndex.top, mapped to ORDER BY clauses
+ORDERINGS = {
+    "xp": "xp DESC, level DESC, agent_id",
+    "level": "level DESC, xp DESC, agent_id",
+    "streak": "streak DESC, xp DESC, agent_id",
+    "last_active": "last_active DESC, agent_id",
+}
+
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    """Ranking fields of one agent."""
+
+    agent_id: str
+    level: int
+    xp: int
+    streak: int
+    last_active: Optional[str] = None
+
+    @classmethod
+    def from_progress(cls, progress: AgentProgress) -> "LeaderboardEntry":
+        last_active = progress.last_activity or progress.daily_streak.last_activity
+        return cls(
+            agent_id=progress.agent_id,
+            level=progress.current_level,
+            xp=progress.xp.total,
+            streak=progress.daily_streak.current,
+            last_active=last_active.isoformat() if last_active else None,
+        )
+
+
+class LeaderboardIndex:
+    """
+    [CREATE] SQLite table of :class:`LeaderboardEntry` rows with ranking indexes.
+
+    Args:
+        path: SQLite file, usually inside the progress data directory.
+
+    Thread Safety:
+        All statements run under an internal lock on one shared connection;
+        SQLite itself serialises writers from other processes.
+
+    Example:
+        >>> index = LeaderboardIndex(Path("progress/leaderboard.sqlite3"))
+        >>> index.upsert([LeaderboardEntry("ClaudeCode", 3, 1800, 4)])
+        >>> [entry.agent_id for entry in index.top(5)]
+        ['ClaudeCode']
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS leaderboard ("
+                " agent_id TEXT PRIMARY KEY, level INTEGER NOT NULL, xp INTEGER NOT NULL,"
+                " streak INTEGER NOT NULL, last_active TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS by_xp ON leaderboard (xp DESC, level DESC)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS by_level ON leaderboard (level DESC, xp DESC)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS by_streak ON leaderboard (streak DESC, xp DESC)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS by_last_active ON leaderboard (last_active DESC)")
+            # "built" is set once a full rebuild has indexed every stored agent
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def upsert(self, entries: Iterable[LeaderboardEntry]) -> None:
+        """[CREATE] Insert or replace agents' rows."""
+        rows = [(e.agent_id, e.level, e.xp, e.streak, e.last_active) for e in entries]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._upsert_locked(rows)
+
+    def _upsert_locked(self, rows: List[tuple]) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO leaderboard (agent_id, level, xp, streak, last_active)"
+            " VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def replace(self, entries: Iterable[LeaderboardEntry]) -> None:
+        """[CREATE] Swap every row for ``entries`` and mark the index built, in one transaction."""
+        rows = [(e.agent_id, e.level, e.xp, e.streak, e.last_active) for e in entries]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM leaderboard")
+            self._upsert_locked(rows)
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('built', '1')")
+
+    def is_built(self) -> bool:
+        """[CREATE] Whether a full rebuild has run; indexes from before the marker existed never have."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'built'").fetchone()
+        return row is not None
+
+    def remove(self, agent_id: str) -> None:
+        """[CREATE] Drop an agent's row."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM leaderboard WHERE agent_id = ?", (agent_id,))
+
+    def clear(self) -> None:
+        """[CREATE] Drop every row (before a rebuild)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM leaderboard")
+
+    def count(self) -> int:
+        """[CREATE] Number of indexed agents."""
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM leaderboard").fetchone()[0])
+
+    def top(self, limit: Optional[int] = 10, order_by: str = "xp") -> List[LeaderboardEntry]:
+        """
+        [CREATE] Highest-ranked agents.
+
+        Args:
+            limit: Number of agents (None for all).
+            order_by: One of ``xp``, ``level``, ``streak`` or ``last_active``.
+
+        Raises:
+            ValueError: If ``order_by`` is not a known ordering.
+
+        Complexity:
+            O(log n + k) for k rows, read from the matching index.
+        """
+        if order_by not in ORDERINGS:
+            raise ValueError(f"order_by must be one of {sorted(ORDERINGS)}.")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT agent_id, level, xp, streak, last_active FROM leaderboard"
+                f" ORDER BY {ORDERINGS[order_by]} LIMIT ?",
+                (-1 if limit is None else limit,),
+            ).fetchall()
+        return [LeaderboardEntry(*row) for row in rows]
+
+    def summary(self) -> Dict[str, Any]:
+        """[CREATE] Agent count, total XP and average level in one aggregate query."""
+        with self._lock:
+            agents, total_xp, average_level = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(xp), 0), COALESCE(AVG(level), 0) FROM leaderboard"
+            ).fetchone()
+        return {
+            "total_agents": int(agents),
+            "total_xp": int(total_xp),
+            "average_level": round(float(average_level), 2),
+        }
+
+    def close(self) -> None:
+        """[CREATE] Close the SQLite connection."""
+        with self._lock:
+            self._conn.close()
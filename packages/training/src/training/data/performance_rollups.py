@@ -0,0 +1,96 @@
+"""
+Module: performance_rollups.py
+Purpose: SQLite store for full-history agent performance rollups.
+
+Summarising an agent's whole score history means streaming every score it
+ever recorded. The rollup (running statistics plus the newest score folded
+in) is small, so this store keeps one JSON row per (agent, topic, grouping)
+next to the scores; any process can resume it and only read scores newer
+than the saved position.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-18T23:30:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+def _group_key(group_by: Sequence[str]) -> str:
+    return ",".join(group_by)
+
+
+class PerformanceRollupStore:
+    """
+    [CREATE] One saved rollup state per (agent_id, topic, group_by).
+
+    ``topic`` None (every topic) is stored as ``""``, matching how the score
+    repository treats an empty topic.
+
+    Args:
+        path: SQLite file, usually next to the record store.
+
+    Thread Safety:
+        All statements run under an internal lock on one shared connection;
+        SQLite itself serialises writers from other processes.
+
+    Example:
+        >>> store = PerformanceRollupStore(Path("chroma_db/performance_rollups.sqlite3"))
+        >>> store.save("ClaudeCode", None, ("topic",), {"newest_epoch": 0.0})
+        >>> store.load("ClaudeCode", None, ("topic",))
+        {'newest_epoch': 0.0}
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollups ("
+                " agent_id TEXT NOT NULL, topic TEXT NOT NULL, group_by TEXT NOT NULL, state TEXT NOT NULL,"
+                " PRIMARY KEY (agent_id, topic, group_by))"
+            )
+
+    def load(self, agent_id: str, topic: Optional[str], group_by: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """[CREATE] Saved state of one rollup, or None if it was never saved."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM rollups WHERE agent_id = ? AND topic = ? AND group_by = ?",
+                (agent_id, topic or "", _group_key(group_by)),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, agent_id: str, topic: Optional[str], group_by: Sequence[str], state: Dict[str, Any]) -> None:
+        """[CREATE] Insert or replace one rollup's state."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rollups (agent_id, topic, group_by, state) VALUES (?, ?, ?, ?)",
+                (agent_id, topic or "", _group_key(group_by), json.dumps(state)),
+            )
+
+    def keys(self, agent_id: str, topics: Sequence[Optional[str]]) -> List[Tuple[Optional[str], Tuple[str, ...]]]:
+        """[CREATE] (topic, group_by) of the agent's saved rollups covering any of ``topics``."""
+        names = sorted({topic or "" for topic in topics})
+        if not names:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT topic, group_by FROM rollups"
+                f" WHERE agent_id = ? AND topic IN ({', '.join('?' * len(names))})",
+                (agent_id, *names),
+            ).fetchall()
+        return [(topic or None, tuple(group_by.split(",")) if group_by else ()) for topic, group_by in rows]
+
+    def close(self) -> None:
+        """[CREATE] Close the SQLite connection."""
+        with self._lock:
+            self._conn.close()
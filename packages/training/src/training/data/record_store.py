@@ -0,0 +1,276 @@
+"""
+Module: record_store.py
+Purpose: SQLite store for structured (non-semantic) training records.
+
+Scores and daily logs are never searched semantically, so embedding their
+synthetic documents in Chroma only adds latency. ``RecordStore`` keeps them
+in an indexed SQLite table and hands repositories a ``RecordCollection``
+exposing the subset of the Chroma collection API they use (add/get/update/
+delete/count), so the repository classes work unchanged on either backend.
+The table's (agent, topic, epoch) indexes double as the repositories' time
+index: ``RecordStore.latest`` satisfies :class:`TimeLookup`.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-18T20:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Metadata keys stored in dedicated, indexed columns
+_COLUMNS = {"agent_id": "agent_id", "topic": "topic", "timestamp_epoch": "epoch"}
+
+_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _epoch(metadata: Dict[str, Any]) -> float:
+    value = metadata.get("timestamp_epoch")
+    return float(value) if isinstance(value, (int, float)) else 0.0
+
+
+class RecordStore:
+    """
+    [CREATE] One SQLite file holding records for several named collections.
+
+    Args:
+        path: SQLite database file.
+
+    Thread Safety:
+        All statements run under an internal lock on one shared connection.
+
+    Example:
+        >>> store = RecordStore(Path("chroma_db/records.sqlite3"))
+        >>> scores = store.collection("score_data")
+        >>> scores.add(ids=["score_1"], documents=["..."], metadatas=[{"agent_id": "A"}])
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " collection TEXT NOT NULL, record_id TEXT NOT NULL, agent_id TEXT, topic TEXT,"
+                " epoch REAL NOT NULL, document TEXT, metadata TEXT NOT NULL,"
+                " PRIMARY KEY (collection, record_id))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS records_by_time ON records (collection, epoch, record_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS records_by_agent_time"
+                " ON records (collection, agent_id, epoch, record_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS records_by_agent_topic_time"
+                " ON records (collection, agent_id, topic, epoch, record_id)"
+            )
+            # "migrated" is set once a legacy Chroma migration has copied every record
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def collection(self, name: str) -> "RecordCollection":
+        """[CREATE] Chroma-compatible view of one collection."""
+        return RecordCollection(self, name)
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+
+    def mark_migrated(self) -> None:
+        """[CREATE] Record that a legacy migration ran to completion."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', '1')")
+
+    def is_migrated(self) -> bool:
+        """[CREATE] Whether a legacy migration has completed; interrupted ones never set the marker."""
+        return bool(self.execute("SELECT value FROM meta WHERE key = 'migrated'"))
+
+    def count(self, collection: str) -> int:
+        """[CREATE] Number of records in a collection."""
+        return int(self.execute("SELECT COUNT(*) FROM records WHERE collection = ?", (collection,))[0][0])
+
+    def latest(
+        self,
+        collection: str,
+        agent_id: Optional[str] = None,
+        topic: Optional[str] = None,
+        limit: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        offset: int = 0,
+    ) -> List[str]:
+        """[CREATE] Record IDs newest first; same contract as :meth:`TimeIndex.latest`."""
+        clauses = ["collection = ?"]
+        params: List[Any] = [collection]
+        for column, value in (("agent_id", agent_id), ("topic", topic)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start is not None:
+            clauses.append("epoch >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("epoch < ?")
+            params.append(end)
+        sql = (
+            f"SELECT record_id FROM records WHERE {' AND '.join(clauses)}"
+            " ORDER BY epoch DESC, record_id DESC LIMIT ? OFFSET ?"
+        )
+        params.extend([-1 if limit is None else limit, offset])
+        return [row[0] for row in self.execute(sql, params)]
+
+    def close(self) -> None:
+        """[CREATE] Close the SQLite connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class RecordCollection:
+    """
+    [CREATE] Chroma-collection-shaped adapter over :class:`RecordStore`.
+
+    Supports the calls the training repositories make: ``add`` (skipping IDs
+    already stored, like Chroma), ``upsert``, ``get`` (ids, where, limit,
+    offset, include), ``update`` (merging metadata like Chroma), ``delete``
+    and ``count``. ``where`` accepts equality, comparison operators and ``$and``.
+    """
+
+    def __init__(self, store: RecordStore, name: str) -> None:
+        self.store = store
+        self.name = name
+        self.metadata: Optional[Dict[str, Any]] = None
+
+    def count(self) -> int:
+        return self.store.count(self.name)
+
+    def add(
+        self,
+        ids: Sequence[str],
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+        **_: Any,
+    ) -> None:
+        self._write("INSERT OR IGNORE", ids, documents, metadatas)
+
+    def upsert(
+        self,
+        ids: Sequence[str],
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+        **_: Any,
+    ) -> None:
+        self._write("INSERT OR REPLACE", ids, documents, metadatas)
+
+    def _write(
+        self,
+        verb: str,
+        ids: Sequence[str],
+        documents: Optional[Sequence[str]],
+        metadatas: Optional[Sequence[Dict[str, Any]]],
+    ) -> None:
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [{}] * len(ids)
+        self.store.executemany(
+            f"{verb} INTO records (collection, record_id, agent_id, topic, epoch, document, metadata)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    self.name, record_id, (metadata or {}).get("agent_id"), (metadata or {}).get("topic"),
+                    _epoch(metadata or {}), document, json.dumps(metadata or {}),
+                )
+                for record_id, document, metadata in zip(ids, documents, metadatas)
+            ],
+        )
+
+    def get(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Sequence[str] = ("metadatas", "documents"),
+    ) -> Dict[str, Any]:
+        clauses = ["collection = ?"]
+        params: List[Any] = [self.name]
+        if ids is not None:
+            if not ids:
+                return _payload([], include)
+            clauses.append(f"record_id IN ({', '.join('?' for _ in ids)})")
+            params.extend(ids)
+        if where:
+            clause, where_params = _where_sql(where)
+            clauses.append(clause)
+            params.extend(where_params)
+        sql = (
+            f"SELECT record_id, document, metadata FROM records WHERE {' AND '.join(clauses)}"
+            " ORDER BY rowid LIMIT ? OFFSET ?"
+        )
+        params.extend([-1 if limit is None else limit, offset or 0])
+        return _payload(self.store.execute(sql, params), include)
+
+    def update(self, ids: Sequence[str], metadatas: Sequence[Dict[str, Any]], **_: Any) -> None:
+        current = self.get(ids=list(ids), include=["metadatas", "documents"])
+        by_id = dict(zip(current["ids"], zip(current["documents"], current["metadatas"])))
+        merged_ids, documents, merged = [], [], []
+        for record_id, metadata in zip(ids, metadatas):
+            if record_id not in by_id:
+                continue
+            document, existing = by_id[record_id]
+            merged_ids.append(record_id)
+            documents.append(document)
+            merged.append({**existing, **metadata})
+        self._write("INSERT OR REPLACE", merged_ids, documents, merged)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        self.store.executemany(
+            "DELETE FROM records WHERE collection = ? AND record_id = ?",
+            [(self.name, record_id) for record_id in ids],
+        )
+
+    def modify(self, metadata: Optional[Dict[str, Any]] = None, **_: Any) -> None:
+        self.metadata = metadata
+
+
+def _payload(rows: Sequence[Tuple[Any, ...]], include: Sequence[str]) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {"ids": [row[0] for row in rows]}
+    if "documents" in include:
+        payload["documents"] = [row[1] for row in rows]
+    if "metadatas" in include:
+        payload["metadatas"] = [json.loads(row[2]) for row in rows]
+    return payload
+
+
+def _where_sql(where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Translate a Chroma ``where`` filter into a SQL clause."""
+    if "$and" in where or "$or" in where:
+        joiner = " AND " if "$and" in where else " OR "
+        parts = [_where_sql(clause) for clause in where.get("$and") or where.get("$or")]
+        return "(" + joiner.join(part for part, _ in parts) + ")", [p for _, params in parts for p in params]
+
+    clauses: List[str] = []
+    params: List[Any] = []
+    for key, condition in where.items():
+        operators = condition if isinstance(condition, dict) else {"$eq": condition}
+        for operator, value in operators.items():
+            if operator not in _OPERATORS:
+                raise ValueError(f"Unsupported where operator: {operator}")
+            if key in _COLUMNS:
+                clauses.append(f"{_COLUMNS[key]} {_OPERATORS[operator]} ?")
+            else:
+                clauses.append(f"json_extract(metadata, ?) {_OPERATORS[operator]} ?")
+                params.append(f'$."{key}"')
+            params.append(value)
+    return " AND ".join(clauses), params
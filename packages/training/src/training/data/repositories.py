@@ -13,17 +13,35 @@ Operation: [CREATE]
 from __future__ import annotations
 
 import hashlib
+import heapq
+import time
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
 try:  # Older chromadb builds may not expose typing helpers.
     from chromadb.api.types import Collection
 except Exception:  # pragma: no cover
     Collection = Any  # type: ignore
 
+from ..utils.ids import new_record_id
 from .client import ChromaDatabase
+from .content_index import MAX_NEAR_DISTANCE, ContentEntry, ContentIndex, hamming_distance, simhash
+from .performance_rollups import PerformanceRollupStore
+from .record_store import RecordStore
+from .sharding import ShardRouter
+from .time_index import IndexEntry, TimeIndex, TimeLookup
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .buffered_writer import BufferedWriter
+
+# Records per ``collection.add`` call: one embedding pass and one transaction each
+DEFAULT_BATCH_SIZE = 256
+
+# (id, document, metadata) as written to a collection
+Record = Tuple[str, str, Dict[str, Any]]
 
 
 def _hash_text(content: str) -> str:
@@ -34,8 +52,92 @@ def _timestamp() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-class BaseRepository:
-    """Common helpers shared across repositories."""
+def _timestamps() -> Tuple[str, float]:
+    """The current time as (ISO string, epoch seconds) taken from one instant."""
+    now = datetime.now(timezone.utc)
+    return now.isoformat(), now.timestamp()
+
+
+def _created_epoch(metadata: Dict[str, Any]) -> Optional[float]:
+    """Creation time of a document in epoch seconds (falls back to the ISO timestamp)."""
+    created_at = metadata.get("created_at")
+    if isinstance(created_at, (int, float)):
+        return float(created_at)
+    timestamp = metadata.get("timestamp")
+    if not timestamp:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(timestamp))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def recency_weight(age_days: float, days_threshold: float, decay_factor: float) -> float:
+    """
+    Relevance multiplier for a document of the given age.
+
+    Documents younger than ``days_threshold`` keep full weight; older ones decay
+    exponentially, losing ``decay_factor`` per ``days_threshold`` of age.
+    """
+    if age_days < days_threshold or days_threshold <= 0:
+        return 1.0
+    return decay_factor ** (age_days / days_threshold)
+
+
+# Keys of the token totals; also the collection-level metadata keys totals were kept
+# under before the content index held them (still used without a content index)
+TOTAL_TOKENS_KEY = "total_tokens"
+COUNTED_DOCUMENTS_KEY = "counted_documents"
+
+
+def _token_totals(collection: Collection) -> Dict[str, int]:
+    metadata = getattr(collection, "metadata", None) or {}
+    return {
+        TOTAL_TOKENS_KEY: int(metadata.get(TOTAL_TOKENS_KEY, 0)),
+        COUNTED_DOCUMENTS_KEY: int(metadata.get(COUNTED_DOCUMENTS_KEY, 0)),
+    }
+
+
+def _write_token_totals(collection: Collection, total_tokens: int, counted_documents: int) -> None:
+    metadata = dict(getattr(collection, "metadata", None) or {})
+    metadata[TOTAL_TOKENS_KEY] = max(0, total_tokens)
+    metadata[COUNTED_DOCUMENTS_KEY] = max(0, counted_documents)
+    collection.modify(metadata=metadata)
+
+
+def _count_tokens(metadatas: Iterable[Optional[Dict[str, Any]]]) -> Tuple[int, int]:
+    """(tokens, documents) summed over the documents that carry a ``token_count``."""
+    tokens = 0
+    documents = 0
+    for metadata in metadatas:
+        count = (metadata or {}).get("token_count")
+        if isinstance(count, int):
+            tokens += count
+            documents += 1
+    return tokens, documents
+
+
+@dataclass
+class DecayReport:
+    """Outcome of a relevance decay maintenance pass."""
+
+    scanned: int = 0
+    updated: int = 0
+    archived: int = 0
+
+
+class BaseRepository(ABC):
+    """
+    Common helpers shared across repositories.
+
+    Subclasses implement :meth:`build_record`, which turns the arguments of
+    their single-record ``add_*`` method into an (id, document, metadata)
+    row. Single adds and :meth:`add_many` then share :meth:`_write_records`,
+    and :meth:`buffered` returns a writer that batches single adds.
+    """
 
     def __init__(self, collection: Collection):
         self.collection = collection
@@ -43,6 +145,41 @@ class BaseRepository:
     def count(self) -> int:
         return self.collection.count()
 
+    @abstractmethod
+    def build_record(self, **fields: Any) -> Record:
+        """Turn the arguments of the repository's single ``add_*`` method into a record."""
+
+    def add_many(self, records: Iterable[Mapping[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Add many records, embedding and committing them ``batch_size`` at a time.
+
+        Args:
+            records: Keyword arguments of the repository's single ``add_*`` method.
+            batch_size: Records per ``collection.add`` call.
+
+        Returns:
+            int: Number of records written.
+        """
+        return self._write_records([self.build_record(**fields) for fields in records], batch_size)
+
+    def buffered(self, max_records: int = DEFAULT_BATCH_SIZE, max_delay: float = 1.0) -> BufferedWriter:
+        """Return a :class:`BufferedWriter` that batches adds to this repository."""
+        from .buffered_writer import BufferedWriter
+
+        return BufferedWriter(self, max_records=max_records, max_delay=max_delay)
+
+    def _write_records(self, records: Sequence[Record], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        if batch_size <= 0:
+            raise ValueError("batch_size must be greater than zero.")
+        for start in range(0, len(records), batch_size):
+            batch = records[start:start + batch_size]
+            self.collection.add(
+                ids=[record[0] for record in batch],
+                documents=[record[1] for record in batch],
+                metadatas=[record[2] for record in batch],
+            )
+        return len(records)
+
     def _delete_ids(self, ids: Sequence[str]) -> int:
         if not ids:
             return 0
@@ -50,8 +187,259 @@ class BaseRepository:
         return len(ids)
 
 
+class TimeOrderedRepository(BaseRepository):
+    """
+    Repository whose records are ordered by ``timestamp_epoch`` metadata.
+
+    Writes are mirrored into a :class:`TimeIndex` sidecar so latest-N and
+    time range queries fetch only the matching records. Without an index the
+    same queries fall back to a numeric ``where`` filter plus a client-side sort.
+
+    The index is compared with the collection once, before the first indexed
+    query; records missing from it (written before the index existed) are
+    then re-indexed. Call :meth:`rebuild_time_index` to resynchronise later.
+
+    A collection that indexes its own records as they are written (such as a
+    :class:`RecordStore` collection) passes its store as ``index`` instead:
+    queries go through it and there is nothing to mirror or rebuild.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        time_index: Optional[TimeIndex] = None,
+        index: Optional[TimeLookup] = None,
+    ):
+        super().__init__(collection)
+        self.time_index = time_index
+        self.index = index
+        self._time_index_checked = False
+
+    @property
+    def _lookup(self) -> Optional[TimeLookup]:
+        return self.index if self.index is not None else self.time_index
+
+    @property
+    def _index_name(self) -> str:
+        return getattr(self.collection, "name", type(self).__name__)
+
+    def _write_records(self, records: Sequence[Record], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        written = super()._write_records(records, batch_size)
+        if self.time_index is not None:
+            self.time_index.add(self._index_name, [_index_entry(record[0], record[2]) for record in records])
+        return written
+
+    def _delete_ids(self, ids: Sequence[str]) -> int:
+        deleted = super()._delete_ids(ids)
+        if self.time_index is not None:
+            self.time_index.remove(self._index_name, ids)
+        return deleted
+
+    def rebuild_time_index(self, page_size: int = 1000) -> int:
+        """Re-index every record from its metadata in paged reads; returns the record count."""
+        if self.time_index is None:
+            return 0
+        self.time_index.clear(self._index_name)
+        indexed = 0
+        offset = 0
+        while True:
+            payload = self.collection.get(limit=page_size, offset=offset, include=["metadatas"])
+            ids = payload.get("ids") or []
+            self.time_index.add(self._index_name, [
+                _index_entry(record_id, metadata or {})
+                for record_id, metadata in zip(ids, payload.get("metadatas") or [])
+            ])
+            indexed += len(ids)
+            if len(ids) < page_size:
+                break
+            offset += len(ids)
+        self._time_index_checked = True
+        return indexed
+
+    def _check_time_index(self) -> None:
+        # Once per repository: other writers share the sidecar, so only records
+        # stored before the index existed can be missing from it
+        if self._time_index_checked or self.time_index is None:
+            return
+        if self.time_index.count(self._index_name) != self.collection.count():
+            self.rebuild_time_index()
+        self._time_index_checked = True
+
+    def latest(
+        self,
+        agent_id: Optional[str] = None,
+        topic: Optional[str] = None,
+        limit: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        include: Sequence[str] = ("metadatas", "documents"),
+    ) -> Dict[str, Any]:
+        """
+        Newest records first, optionally restricted to an agent, topic and time range.
+
+        Args:
+            agent_id: Only records of this agent.
+            topic: Only records with this topic.
+            limit: Maximum records (None for every match).
+            start: Inclusive lower bound in epoch seconds.
+            end: Exclusive upper bound in epoch seconds.
+            include: Chroma ``include`` fields to return.
+
+        Returns:
+            Dict[str, Any]: ``get``-shaped payload (ids, documents, metadatas) in
+            newest-first order.
+
+        Complexity:
+            O(log n + k) index lookup plus a k-record fetch for k results.
+        """
+        if limit is not None and limit <= 0:
+            return {"ids": [], "documents": [], "metadatas": []}
+
+        lookup = self._lookup
+        if lookup is None:
+            return self._latest_without_index(agent_id, topic, limit, start, end, include)
+
+        self._check_time_index()
+        ids = lookup.latest(self._index_name, agent_id, topic, limit, start, end)
+        if not ids:
+            return {"ids": [], "documents": [], "metadatas": []}
+        payload = self.collection.get(ids=ids, include=list(include))
+        return _ordered_payload(payload, ids)
+
+    def iter_latest(
+        self,
+        agent_id: Optional[str] = None,
+        topic: Optional[str] = None,
+        limit: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        page_size: int = 500,
+        include: Sequence[str] = ("metadatas",),
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream :meth:`latest` results page by page, newest first.
+
+        Each page is a ``get``-shaped payload of at most ``page_size`` records,
+        so callers can aggregate arbitrarily many records in bounded memory.
+        """
+        if page_size <= 0:
+            raise ValueError("page_size must be greater than zero.")
+        lookup = self._lookup
+        if lookup is None:
+            yield self._latest_without_index(agent_id, topic, limit, start, end, include)
+            return
+        self._check_time_index()
+
+        offset = 0
+        while limit is None or offset < limit:
+            size = page_size if limit is None else min(page_size, limit - offset)
+            ids = lookup.latest(self._index_name, agent_id, topic, size, start, end, offset)
+            if not ids:
+                return
+            yield _ordered_payload(self.collection.get(ids=ids, include=list(include)), ids)
+            if len(ids) < size:
+                return
+            offset += len(ids)
+
+    def _latest_without_index(
+        self,
+        agent_id: Optional[str],
+        topic: Optional[str],
+        limit: Optional[int],
+        start: Optional[float],
+        end: Optional[float],
+        include: Sequence[str],
+    ) -> Dict[str, Any]:
+        clauses: List[Dict[str, Any]] = []
+        if agent_id is not None:
+            clauses.append({"agent_id": agent_id})
+        if topic is not None:
+            clauses.append({"topic": topic})
+        if start is not None:
+            clauses.append({"timestamp_epoch": {"$gte": start}})
+        if end is not None:
+            clauses.append({"timestamp_epoch": {"$lt": end}})
+        where = clauses[0] if len(clauses) == 1 else ({"$and": clauses} if clauses else None)
+
+        include = list(include) if "metadatas" in include else [*include, "metadatas"]
+        payload = self.collection.get(where=where, include=include)
+        ranked = sorted(
+            zip(payload.get("ids") or [], payload.get("metadatas") or []),
+            key=lambda row: (_index_entry(row[0], row[1] or {}).epoch, row[0]),
+            reverse=True,
+        )
+        ids = [record_id for record_id, _ in ranked[:limit]]
+        return _ordered_payload(payload, ids)
+
+
+def _index_entry(record_id: str, metadata: Dict[str, Any]) -> IndexEntry:
+    epoch = metadata.get("timestamp_epoch")
+    if not isinstance(epoch, (int, float)):
+        epoch = _created_epoch(metadata) or 0.0
+    return IndexEntry(
+        record_id=record_id,
+        epoch=float(epoch),
+        agent_id=metadata.get("agent_id"),
+        topic=metadata.get("topic"),
+    )
+
+
+def _content_entry(
+    record_id: str,
+    document: str,
+    metadata: Dict[str, Any],
+    with_signature: bool = False,
+) -> ContentEntry:
+    return ContentEntry(
+        record_id=record_id,
+        agent_id=metadata.get("agent_id"),
+        file_name=metadata.get("file_name"),
+        content_hash=metadata.get("content_hash") or _hash_text(document),
+        signature=simhash(document) if with_signature else None,
+    )
+
+
+def _ordered_payload(payload: Dict[str, Any], ids: Sequence[str]) -> Dict[str, Any]:
+    """Reorder a ``get`` payload to follow ``ids`` (Chroma returns its own order)."""
+    position = {record_id: index for index, record_id in enumerate(payload.get("ids") or [])}
+    ordered: Dict[str, Any] = {"ids": [record_id for record_id in ids if record_id in position]}
+    for field in ("documents", "metadatas"):
+        values = payload.get(field)
+        if values is not None:
+            ordered[field] = [values[position[record_id]] for record_id in ordered["ids"]]
+    return ordered
+
+
 class TrainingMaterialRepository(BaseRepository):
-    """CRUD helpers for training materials stored in Chroma."""
+    """
+    CRUD helpers for training materials stored in Chroma.
+
+    With a :class:`ContentIndex`, duplicates are rejected at ingest before
+    any embedding work: exact (agent_id, file_name, content_hash) matches
+    always, and SimHash near-duplicates of the same agent when
+    ``near_duplicate_distance`` is set (0-3 differing bits of 64).
+    Signatures are only computed while near-duplicate detection is enabled;
+    call :meth:`rebuild_content_index` after enabling it on an existing store.
+    The index is compared with the collection once, before the first lookup,
+    and rebuilt if documents are missing from it.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        archive: Optional[Collection] = None,
+        content_index: Optional[ContentIndex] = None,
+        near_duplicate_distance: Optional[int] = None,
+    ):
+        super().__init__(collection)
+        if near_duplicate_distance is not None and not 0 <= near_duplicate_distance <= MAX_NEAR_DISTANCE:
+            raise ValueError(f"near_duplicate_distance must be between 0 and {MAX_NEAR_DISTANCE}.")
+        self.archive = archive
+        self.content_index = content_index
+        self.near_duplicate_distance = near_duplicate_distance
+        self.duplicates_skipped = 0
+        self._seeded_totals: set = set()
+        self._content_index_checked = False
 
     def add_material(
         self,
@@ -60,7 +448,172 @@ class TrainingMaterialRepository(BaseRepository):
         agent_id: str,
         file_name: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None,
-    ) -> None:
+        token_count: Optional[int] = None,
+        chunk_tokens: Optional[str] = None,
+        skip_dedupe: bool = False,
+    ) -> Optional[str]:
+        """
+        Store a training document.
+
+        ``token_count`` (and the encoded per-chunk counts in ``chunk_tokens``)
+        are computed once by the caller at ingest and kept in the document
+        metadata; the collection-level token total is updated incrementally.
+        Pass ``skip_dedupe=True`` when the caller already ran
+        :meth:`find_duplicate` for the document.
+
+        Returns:
+            Optional[str]: The new record ID, or None if it was skipped as a duplicate.
+        """
+        record = self.build_record(
+            topic=topic,
+            document=document,
+            agent_id=agent_id,
+            file_name=file_name,
+            metadata=metadata,
+            token_count=token_count,
+            chunk_tokens=chunk_tokens,
+        )
+        return record[0] if self._write_records([record], skip_dedupe=skip_dedupe) else None
+
+    def find_duplicate(
+        self,
+        document: str,
+        agent_id: Optional[str],
+        file_name: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        ID of an already stored duplicate of ``document``, if any.
+
+        Complexity:
+            One indexed lookup for exact matches, plus one band lookup when
+            near-duplicate detection is enabled; independent of collection size.
+        """
+        if self.content_index is None:
+            return None
+        self._check_content_index()
+        name = self.collection.name
+        match = self.content_index.find_exact(name, _hash_text(document), agent_id, file_name or "unknown")
+        if match is None and self._near_enabled:
+            match = self.content_index.find_near(name, simhash(document), agent_id, self.near_duplicate_distance)
+        return match
+
+    def rebuild_content_index(self, page_size: int = 500) -> int:
+        """Re-index every stored document in paged reads; returns the document count."""
+        if self.content_index is None:
+            return 0
+        name = self.collection.name
+        self.content_index.clear(name)
+        indexed = 0
+        offset = 0
+        while True:
+            payload = self.collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+            ids = payload.get("ids") or []
+            self.content_index.add(name, [
+                _content_entry(record_id, document or "", metadata or {}, self._near_enabled)
+                for record_id, document, metadata in zip(
+                    ids, payload.get("documents") or [], payload.get("metadatas") or []
+                )
+            ])
+            indexed += len(ids)
+            if len(ids) < page_size:
+                break
+            offset += len(ids)
+        self._content_index_checked = True
+        return indexed
+
+    @property
+    def _near_enabled(self) -> bool:
+        return self.near_duplicate_distance is not None
+
+    def _check_content_index(self) -> None:
+        # Once per repository: other writers share the sidecar, so only documents
+        # stored before the index existed can be missing from it
+        if self._content_index_checked:
+            return
+        if self.content_index.count(self.collection.name) != self.collection.count():
+            self.rebuild_content_index()
+        self._content_index_checked = True
+
+    def filter_duplicates(self, materials: Sequence[Mapping[str, Any]]) -> List[Mapping[str, Any]]:
+        """
+        Materials that duplicate neither a stored document nor an earlier material of the batch.
+
+        Lets callers skip per-document work such as tokenizing for duplicates,
+        then write the rest with ``add_materials(..., skip_dedupe=True)``.
+
+        Args:
+            materials: Keyword arguments of :meth:`add_material`.
+        """
+        return [materials[position] for position in self._new_material_positions(materials)]
+
+    def _new_material_positions(self, materials: Sequence[Mapping[str, Any]]) -> List[int]:
+        if self.content_index is None:
+            return list(range(len(materials)))
+        return self._new_positions([
+            ContentEntry(
+                record_id="",
+                agent_id=fields.get("agent_id"),
+                file_name=fields.get("file_name") or "unknown",
+                content_hash=_hash_text(fields["document"]),
+                signature=simhash(fields["document"]) if self._near_enabled else None,
+            )
+            for fields in materials
+        ])
+
+    def _drop_duplicates(self, records: Sequence[Record]) -> List[Record]:
+        """Filter out records duplicating stored documents or earlier records of the batch."""
+        entries = [_content_entry(*record, with_signature=self._near_enabled) for record in records]
+        return [records[position] for position in self._new_positions(entries)]
+
+    def _new_positions(self, entries: Sequence[ContentEntry]) -> List[int]:
+        """Positions of entries that are neither stored nor repeated earlier in the batch."""
+        self._check_content_index()
+        name = self.collection.name
+        kept: List[int] = []
+        batch_keys: set = set()
+        batch_signatures: List[tuple] = []
+        for position, entry in enumerate(entries):
+            key = (entry.agent_id, entry.file_name, entry.content_hash)
+            duplicate = key in batch_keys or self.content_index.find_exact(
+                name, entry.content_hash, entry.agent_id, entry.file_name
+            ) is not None
+            if not duplicate and self._near_enabled:
+                limit = self.near_duplicate_distance
+                duplicate = any(
+                    agent == entry.agent_id and hamming_distance(signature, entry.signature) <= limit
+                    for agent, signature in batch_signatures
+                ) or self.content_index.find_near(name, entry.signature, entry.agent_id, limit) is not None
+            if duplicate:
+                self.duplicates_skipped += 1
+                continue
+            batch_keys.add(key)
+            batch_signatures.append((entry.agent_id, entry.signature))
+            kept.append(position)
+        return kept
+
+    def add_materials(
+        self,
+        records: Iterable[Mapping[str, Any]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        skip_dedupe: bool = False,
+    ) -> int:
+        """
+        Bulk :meth:`add_material`; each record holds its keyword arguments.
+
+        Pass ``skip_dedupe=True`` for records already run through :meth:`filter_duplicates`.
+        """
+        return self._write_records([self.build_record(**fields) for fields in records], batch_size, skip_dedupe)
+
+    def build_record(
+        self,
+        topic: str,
+        document: str,
+        agent_id: str,
+        file_name: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        token_count: Optional[int] = None,
+        chunk_tokens: Optional[str] = None,
+    ) -> Record:
         file_hash = _hash_text(document)
         metadatas = {
             "topic": topic,
@@ -68,15 +621,202 @@ class TrainingMaterialRepository(BaseRepository):
             "timestamp": _timestamp(),
             "file_name": file_name or "unknown",
             "content_hash": file_hash,
+            "created_at": time.time(),
+            "recency_weight": 1.0,
         }
+        if token_count is not None:
+            metadatas["token_count"] = int(token_count)
+        if chunk_tokens:
+            metadatas["chunk_tokens"] = chunk_tokens
         if metadata:
             metadatas.update(metadata)
+        return new_record_id("material"), document, metadatas
 
-        self.collection.add(
-            documents=[document],
-            metadatas=[metadatas],
-            ids=[f"{file_hash}_{_timestamp()}"],
-        )
+    def _write_records(
+        self,
+        records: Sequence[Record],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        skip_dedupe: bool = False,
+    ) -> int:
+        if self.content_index is not None and not skip_dedupe:
+            records = self._drop_duplicates(records)
+        records = self._drop_stored_ids(records)
+        written = super()._write_records(records, batch_size)
+        self._adjust_tokens(self.collection, [record[2] for record in records], 1)
+        if self.content_index is not None:
+            self.content_index.add(
+                self.collection.name,
+                [_content_entry(*record, with_signature=self._near_enabled) for record in records],
+            )
+        return written
+
+    def import_records(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+        embeddings: Optional[Sequence[Any]] = None,
+    ) -> int:
+        """
+        Copy already stored materials into this collection, keeping their IDs and embeddings.
+
+        IDs already present are skipped so an interrupted copy can be re-run;
+        token totals and the content index are updated for the rest.
+
+        Returns:
+            int: Number of records written.
+        """
+        keep = self._unstored_positions(ids)
+        if not keep:
+            return 0
+        records = [(ids[i], documents[i], metadatas[i]) for i in keep]
+        payload: Dict[str, Any] = {
+            "ids": [record[0] for record in records],
+            "documents": [record[1] for record in records],
+            "metadatas": [record[2] for record in records],
+        }
+        if embeddings is not None:
+            payload["embeddings"] = [embeddings[i] for i in keep]
+        self.collection.add(**payload)
+        self._adjust_tokens(self.collection, payload["metadatas"], 1)
+        if self.content_index is not None:
+            self.content_index.add(
+                self.collection.name,
+                [_content_entry(*record, with_signature=self._near_enabled) for record in records],
+            )
+        return len(records)
+
+    def _drop_stored_ids(self, records: Sequence[Record]) -> List[Record]:
+        """Filter out records whose IDs the collection (or the batch) already holds."""
+        return [records[position] for position in self._unstored_positions([record[0] for record in records])]
+
+    def _unstored_positions(self, ids: Sequence[str]) -> List[int]:
+        # The collection ignores IDs it already holds, so only the rest count
+        # towards token totals and the content index
+        if not ids:
+            return []
+        existing = set(self.collection.get(ids=list(dict.fromkeys(ids)), include=[]).get("ids") or [])
+        kept: List[int] = []
+        for position, record_id in enumerate(ids):
+            if record_id not in existing:
+                existing.add(record_id)
+                kept.append(position)
+        return kept
+
+    def token_totals(self) -> Dict[str, int]:
+        """
+        Incrementally maintained token totals for the collection.
+
+        Totals live in the content index, where every adjustment is one atomic
+        ``UPDATE``; without a content index they are kept in the collection
+        metadata, which is only safe with a single writer.
+
+        Returns:
+            Dict[str, int]: ``total_tokens`` and ``counted_documents`` (documents
+            that carry a ``token_count``).
+        """
+        if self.content_index is None:
+            return _token_totals(self.collection)
+        tokens, documents = self.content_index.token_totals(self._token_totals_key(self.collection))
+        return {TOTAL_TOKENS_KEY: tokens, COUNTED_DOCUMENTS_KEY: documents}
+
+    def rebuild_token_totals(self, page_size: int = 1000) -> Dict[str, int]:
+        """Recompute the collection token totals from document metadata in paged reads."""
+        total_tokens = 0
+        counted = 0
+        offset = 0
+        while True:
+            payload = self.collection.get(limit=page_size, offset=offset, include=["metadatas"])
+            ids = payload.get("ids") or []
+            for metadata in payload.get("metadatas") or []:
+                count = (metadata or {}).get("token_count")
+                if isinstance(count, int):
+                    total_tokens += count
+                    counted += 1
+            if len(ids) < page_size:
+                break
+            offset += len(ids)
+        if self.content_index is None:
+            _write_token_totals(self.collection, total_tokens, counted)
+        else:
+            self.content_index.set_token_totals(self.collection.name, total_tokens, counted)
+            self._seeded_totals.add(self.collection.name)
+        return self.token_totals()
+
+    def _adjust_tokens(self, collection: Collection, metadatas: Iterable[Optional[Dict[str, Any]]], sign: int) -> None:
+        """Add (sign=1) or subtract (sign=-1) the stored token counts of documents."""
+        tokens, documents = _count_tokens(metadatas)
+        if not documents:
+            return
+        if self.content_index is None:
+            totals = _token_totals(collection)
+            _write_token_totals(
+                collection,
+                totals[TOTAL_TOKENS_KEY] + sign * tokens,
+                totals[COUNTED_DOCUMENTS_KEY] + sign * documents,
+            )
+            return
+        self.content_index.adjust_token_totals(self._token_totals_key(collection), sign * tokens, sign * documents)
+
+    def _token_totals_key(self, collection: Collection) -> str:
+        # Totals an earlier version kept in the collection metadata seed the index once
+        name = collection.name
+        if name not in self._seeded_totals:
+            legacy = _token_totals(collection)
+            self.content_index.seed_token_totals(name, legacy[TOTAL_TOKENS_KEY], legacy[COUNTED_DOCUMENTS_KEY])
+            self._seeded_totals.add(name)
+        return name
+
+    def backfill_token_counts(
+        self,
+        count_tokens: Callable[[str], Tuple[int, str]],
+        page_size: int = 500,
+    ) -> int:
+        """
+        Store token counts on legacy documents ingested before counts were kept.
+
+        Args:
+            count_tokens: Returns (token_count, encoded chunk token counts) for a document.
+            page_size: Documents fetched per ``get`` call.
+
+        Returns:
+            int: Number of documents updated.
+        """
+        updated = 0
+        offset = 0
+        while True:
+            payload = self.collection.get(
+                limit=page_size, offset=offset, include=["documents", "metadatas"]
+            )
+            ids = payload.get("ids") or []
+            update_ids: List[str] = []
+            update_metadatas: List[Dict[str, Any]] = []
+            for doc_id, document, metadata in zip(
+                ids, payload.get("documents") or [], payload.get("metadatas") or []
+            ):
+                if isinstance((metadata or {}).get("token_count"), int):
+                    continue
+                token_count, chunk_tokens = count_tokens(document or "")
+                update_ids.append(doc_id)
+                update_metadatas.append({"token_count": token_count, "chunk_tokens": chunk_tokens})
+            if update_ids:
+                self.collection.update(ids=update_ids, metadatas=update_metadatas)
+                updated += len(update_ids)
+            if len(ids) < page_size:
+                break
+            offset += len(ids)
+        self.rebuild_token_totals()
+        return updated
+
+    def _delete_ids(self, ids: Sequence[str]) -> int:
+        if not ids:
+            return 0
+        payload = self.collection.get(ids=list(ids), include=["metadatas"])
+        deleted = super()._delete_ids(ids)
+        self._adjust_tokens(self.collection, payload.get("metadatas") or [], -1)
+        if self.content_index is not None:
+            self.content_index.remove(self.collection.name, ids)
+        return deleted
 
     def query(self, topic: str, limit: int, agent_id: Optional[str] = None):
         where_clause: Optional[Dict[str, Any]] = None
@@ -89,11 +829,118 @@ class TrainingMaterialRepository(BaseRepository):
             where=where_clause,
         )
 
+    def get_pinned(self, agent_id: Optional[str] = None) -> List[tuple[str, str, Dict[str, Any]]]:
+        """
+        Return pinned materials as (id, document, metadata), highest priority first.
+        """
+        where_clause: Dict[str, Any] = {"pinned": True}
+        if agent_id:
+            where_clause = {"$and": [{"pinned": True}, {"agent_id": agent_id}]}
+
+        payload = self.collection.get(where=where_clause, include=["documents", "metadatas"])
+        rows = list(zip(
+            payload.get("ids") or [],
+            payload.get("documents") or [],
+            payload.get("metadatas") or [],
+        ))
+        rows.sort(key=lambda row: (row[2] or {}).get("priority", 0), reverse=True)
+        return rows
+
+    def decay_relevance(
+        self,
+        agent_id: Optional[str],
+        days_threshold: float,
+        decay_factor: float,
+        archive_after_days: Optional[float] = None,
+        page_size: int = 500,
+        now: Optional[float] = None,
+    ) -> DecayReport:
+        """
+        Refresh ``recency_weight`` metadata and archive very old materials.
+
+        Walks the collection in pages of ``page_size`` using ``get``/``update``
+        so memory stays bounded on large collections. Only documents whose
+        weight actually changes are written. Pinned materials are never
+        decayed or archived.
+
+        Args:
+            agent_id: Restrict the pass to one agent (None for all).
+            days_threshold: Age in days after which decay starts.
+            decay_factor: Weight multiplier per ``days_threshold`` of age.
+            archive_after_days: Move materials older than this to the archive collection.
+            page_size: Documents fetched per ``get`` call.
+            now: Reference time in epoch seconds (defaults to the current time).
+
+        Returns:
+            DecayReport: Scanned, updated and archived counts.
+        """
+        now = time.time() if now is None else now
+        where = {"agent_id": agent_id} if agent_id else None
+        report = DecayReport()
+
+        offset = 0
+        while True:
+            payload = self.collection.get(
+                where=where, limit=page_size, offset=offset, include=["metadatas"]
+            )
+            ids: List[str] = payload.get("ids") or []
+            if not ids:
+                break
+            metadatas = payload.get("metadatas") or []
+            report.scanned += len(ids)
+
+            update_ids: List[str] = []
+            update_metadatas: List[Dict[str, Any]] = []
+            archive_ids: List[str] = []
+            for doc_id, metadata in zip(ids, metadatas):
+                metadata = metadata or {}
+                created = _created_epoch(metadata)
+                if metadata.get("pinned") or created is None:
+                    continue
+                age_days = max(0.0, now - created) / 86400
+                if archive_after_days is not None and age_days >= archive_after_days:
+                    archive_ids.append(doc_id)
+                    continue
+                weight = recency_weight(age_days, days_threshold, decay_factor)
+                current = metadata.get("recency_weight", 1.0)
+                if abs(float(current) - weight) > 1e-3 or "created_at" not in metadata:
+                    update_ids.append(doc_id)
+                    update_metadatas.append({"recency_weight": weight, "created_at": created})
+
+            if update_ids:
+                self.collection.update(ids=update_ids, metadatas=update_metadatas)
+                report.updated += len(update_ids)
+            archived = self._archive_ids(archive_ids)
+            report.archived += archived
+
+            if len(ids) < page_size:
+                break
+            # Archived documents leave the collection, shifting later ones down
+            offset += len(ids) - archived
+
+        return report
+
+    def _archive_ids(self, ids: Sequence[str]) -> int:
+        if not ids or self.archive is None:
+            return 0
+        payload = self.collection.get(ids=list(ids), include=["documents", "metadatas", "embeddings"])
+        self.archive.upsert(
+            ids=payload["ids"],
+            documents=payload["documents"],
+            metadatas=payload["metadatas"],
+            embeddings=payload["embeddings"],
+        )
+        self._adjust_tokens(self.archive, payload["metadatas"], 1)
+        return self._delete_ids(payload["ids"])
+
     def remove_duplicate_documents(self) -> int:
         """
         Remove duplicate documents based on (agent_id, file_name, content_hash).
+
+        Ingest already rejects these when a content index is attached; this
+        full scan only cleans up stores populated before the index existed.
         """
-        dataset = self.collection.get(include=["metadatas", "ids"])
+        dataset = self.collection.get(include=["metadatas"])
         metadatas: List[Dict[str, Any]] = dataset.get("metadatas") or []
         ids: List[str] = dataset.get("ids") or []
 
@@ -114,7 +961,233 @@ class TrainingMaterialRepository(BaseRepository):
         return self._delete_ids(duplicates)
 
 
-class ScoreRepository(BaseRepository):
+class ShardedTrainingMaterialRepository:
+    """
+    Training materials split across per-agent shard collections.
+
+    Offers the :class:`TrainingMaterialRepository` API the services use.
+    Calls naming an agent go to that agent's shard, so its HNSW search only
+    covers that agent's (or agent group's) vectors; calls without an agent
+    fan out over every shard and merge the results. Shards share the archive
+    collection and the content index (which is keyed per collection).
+    """
+
+    def __init__(
+        self,
+        router: ShardRouter,
+        archive: Optional[Collection] = None,
+        content_index: Optional[ContentIndex] = None,
+        near_duplicate_distance: Optional[int] = None,
+    ):
+        if near_duplicate_distance is not None and not 0 <= near_duplicate_distance <= MAX_NEAR_DISTANCE:
+            raise ValueError(f"near_duplicate_distance must be between 0 and {MAX_NEAR_DISTANCE}.")
+        self.router = router
+        self.archive = archive
+        self.content_index = content_index
+        self._near_duplicate_distance = near_duplicate_distance
+        self._shards: Dict[str, TrainingMaterialRepository] = {}
+
+    @property
+    def near_duplicate_distance(self) -> Optional[int]:
+        return self._near_duplicate_distance
+
+    @near_duplicate_distance.setter
+    def near_duplicate_distance(self, value: Optional[int]) -> None:
+        self._near_duplicate_distance = value
+        for shard in self._shards.values():
+            shard.near_duplicate_distance = value
+
+    @property
+    def duplicates_skipped(self) -> int:
+        """Duplicates rejected at ingest across every shard (each shard counts its own)."""
+        return sum(shard.duplicates_skipped for shard in self._shards.values())
+
+    def shard(self, agent_id: Optional[str]) -> TrainingMaterialRepository:
+        """Repository over the shard holding ``agent_id``'s materials."""
+        return self._shard_named(self.router.collection_name(agent_id))
+
+    def shards(self) -> List[TrainingMaterialRepository]:
+        """Repositories over every existing shard."""
+        return [self._shard_named(name) for name in self.router.collection_names()]
+
+    def _shard_named(self, name: str) -> TrainingMaterialRepository:
+        shard = self._shards.get(name)
+        if shard is None:
+            shard = self._shards[name] = TrainingMaterialRepository(
+                self.router.collection(name),
+                archive=self.archive,
+                content_index=self.content_index,
+                near_duplicate_distance=self._near_duplicate_distance,
+            )
+        return shard
+
+    def _targets(self, agent_id: Optional[str]) -> List[TrainingMaterialRepository]:
+        return [self.shard(agent_id)] if agent_id else self.shards()
+
+    def count(self) -> int:
+        return sum(shard.count() for shard in self.shards())
+
+    def build_record(self, **fields: Any) -> Record:
+        return self.shard(fields.get("agent_id")).build_record(**fields)
+
+    def add_material(self, topic: str, document: str, agent_id: str, **fields: Any) -> Optional[str]:
+        """Store a training document in its agent's shard; see :meth:`TrainingMaterialRepository.add_material`."""
+        return self.shard(agent_id).add_material(topic, document, agent_id, **fields)
+
+    def add_many(self, records: Iterable[Mapping[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """Bulk add, batching each shard's records separately."""
+        by_shard: Dict[str, List[Mapping[str, Any]]] = {}
+        for fields in records:
+            by_shard.setdefault(self.router.collection_name(fields.get("agent_id")), []).append(fields)
+        return sum(self._shard_named(name).add_many(group, batch_size) for name, group in by_shard.items())
+
+    def add_materials(
+        self,
+        records: Iterable[Mapping[str, Any]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        skip_dedupe: bool = False,
+    ) -> int:
+        """Bulk add, batching each shard's records separately."""
+        by_shard: Dict[str, List[Mapping[str, Any]]] = {}
+        for fields in records:
+            by_shard.setdefault(self.router.collection_name(fields.get("agent_id")), []).append(fields)
+        return sum(
+            self._shard_named(name).add_materials(group, batch_size, skip_dedupe)
+            for name, group in by_shard.items()
+        )
+
+    def filter_duplicates(self, materials: Sequence[Mapping[str, Any]]) -> List[Mapping[str, Any]]:
+        """:meth:`TrainingMaterialRepository.filter_duplicates` against each material's shard, in input order."""
+        by_shard: Dict[str, List[int]] = {}
+        for position, fields in enumerate(materials):
+            by_shard.setdefault(self.router.collection_name(fields.get("agent_id")), []).append(position)
+        kept: List[int] = []
+        for name, positions in by_shard.items():
+            group = [materials[position] for position in positions]
+            kept.extend(positions[i] for i in self._shard_named(name)._new_material_positions(group))
+        return [materials[position] for position in sorted(kept)]
+
+    def buffered(self, max_records: int = DEFAULT_BATCH_SIZE, max_delay: float = 1.0) -> BufferedWriter:
+        """Return a :class:`BufferedWriter` that batches adds across shards."""
+        from .buffered_writer import BufferedWriter
+
+        return BufferedWriter(self, max_records=max_records, max_delay=max_delay)
+
+    def _write_records(
+        self,
+        records: Sequence[Record],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        skip_dedupe: bool = False,
+    ) -> int:
+        by_shard: Dict[str, List[Record]] = {}
+        for record in records:
+            by_shard.setdefault(self.router.collection_name(record[2].get("agent_id")), []).append(record)
+        return sum(
+            self._shard_named(name)._write_records(group, batch_size, skip_dedupe)
+            for name, group in by_shard.items()
+        )
+
+    def find_duplicate(
+        self,
+        document: str,
+        agent_id: Optional[str],
+        file_name: Optional[str] = None,
+    ) -> Optional[str]:
+        """ID of a stored duplicate in the agent's shard (duplicates are per agent)."""
+        return self.shard(agent_id).find_duplicate(document, agent_id, file_name)
+
+    def rebuild_content_index(self, page_size: int = 500) -> int:
+        return sum(shard.rebuild_content_index(page_size) for shard in self.shards())
+
+    def token_totals(self) -> Dict[str, int]:
+        return _sum_totals(shard.token_totals() for shard in self.shards())
+
+    def rebuild_token_totals(self, page_size: int = 1000) -> Dict[str, int]:
+        return _sum_totals(shard.rebuild_token_totals(page_size) for shard in self.shards())
+
+    def backfill_token_counts(
+        self,
+        count_tokens: Callable[[str], Tuple[int, str]],
+        page_size: int = 500,
+    ) -> int:
+        return sum(shard.backfill_token_counts(count_tokens, page_size) for shard in self.shards())
+
+    def query(self, topic: str, limit: int, agent_id: Optional[str] = None):
+        """
+        Semantic search in the agent's shard, or across all shards without an agent.
+
+        A fan-out embeds the query once (when the database has an explicit
+        embedding function), asks every non-empty shard for its ``limit``
+        nearest materials and keeps the overall ``limit`` nearest, returning
+        the same nested-list payload as a single collection query.
+        """
+        if agent_id:
+            return self.shard(agent_id).query(topic, limit, agent_id=agent_id)
+
+        embedding_function = self.router.database.embedding_function
+        search: Dict[str, Any] = (
+            {"query_embeddings": [[float(value) for value in embedding_function([topic])[0]]]}
+            if embedding_function is not None
+            else {"query_texts": [topic]}
+        )
+        hits: List[tuple] = []
+        for shard in self.shards():
+            if not shard.count():
+                continue
+            payload = shard.collection.query(n_results=limit, **search)
+            hits.extend(zip(
+                (payload.get("distances") or [[]])[0],
+                (payload.get("ids") or [[]])[0],
+                (payload.get("documents") or [[]])[0],
+                (payload.get("metadatas") or [[]])[0],
+            ))
+        nearest = heapq.nsmallest(limit, hits, key=lambda hit: hit[0])
+        return {
+            "ids": [[hit[1] for hit in nearest]],
+            "documents": [[hit[2] for hit in nearest]],
+            "metadatas": [[hit[3] for hit in nearest]],
+            "distances": [[hit[0] for hit in nearest]],
+        }
+
+    def get_pinned(self, agent_id: Optional[str] = None) -> List[tuple[str, str, Dict[str, Any]]]:
+        rows = [row for shard in self._targets(agent_id) for row in shard.get_pinned(agent_id)]
+        rows.sort(key=lambda row: (row[2] or {}).get("priority", 0), reverse=True)
+        return rows
+
+    def decay_relevance(
+        self,
+        agent_id: Optional[str],
+        days_threshold: float,
+        decay_factor: float,
+        archive_after_days: Optional[float] = None,
+        page_size: int = 500,
+        now: Optional[float] = None,
+    ) -> DecayReport:
+        """Run :meth:`TrainingMaterialRepository.decay_relevance` on the agent's shard or every shard."""
+        now = time.time() if now is None else now
+        report = DecayReport()
+        for shard in self._targets(agent_id):
+            partial = shard.decay_relevance(
+                agent_id, days_threshold, decay_factor, archive_after_days, page_size, now
+            )
+            report.scanned += partial.scanned
+            report.updated += partial.updated
+            report.archived += partial.archived
+        return report
+
+    def remove_duplicate_documents(self) -> int:
+        return sum(shard.remove_duplicate_documents() for shard in self.shards())
+
+
+def _sum_totals(totals: Iterable[Dict[str, int]]) -> Dict[str, int]:
+    summed = {TOTAL_TOKENS_KEY: 0, COUNTED_DOCUMENTS_KEY: 0}
+    for entry in totals:
+        for key in summed:
+            summed[key] += entry.get(key, 0)
+    return summed
+
+
+class ScoreRepository(TimeOrderedRepository):
     """Repository for score collection documents."""
 
     def add_score(
@@ -125,89 +1198,336 @@ class ScoreRepository(BaseRepository):
         agent_id: str,
         metrics: Dict[str, Any],
     ) -> None:
+        self._write_records([self.build_record(
+            topic=topic, score=score, time_taken=time_taken, agent_id=agent_id, metrics=metrics
+        )])
+
+    def add_scores(self, records: Iterable[Mapping[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """Bulk :meth:`add_score`; each record holds its keyword arguments."""
+        return self.add_many(records, batch_size)
+
+    def build_record(
+        self,
+        topic: str,
+        score: float,
+        time_taken: float,
+        agent_id: str,
+        metrics: Optional[Dict[str, Any]] = None,
+    ) -> Record:
+        timestamp, epoch = _timestamps()
         metadata = {
             "topic": topic,
             "score": score,
             "time_taken": time_taken,
             "agent_id": agent_id,
-            "timestamp": _timestamp(),
-            **metrics,
+            "timestamp": timestamp,
+            **(metrics or {}),
+            "timestamp_epoch": epoch,
         }
-        self.collection.add(
-            documents=[f"Topic: {topic}, Score: {score}, Time: {time_taken}"],
-            metadatas=[metadata],
-            ids=[f"score_{agent_id}_{_timestamp()}"],
-        )
+        document = f"Topic: {topic}, Score: {score}, Time: {time_taken}"
+        return new_record_id("score"), document, metadata
 
     def fetch_scores(
         self,
         agent_id: str,
         topic: Optional[str],
         limit: int,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
+        """Metadata of the agent's newest ``limit`` scores (optionally by topic and time range)."""
         if limit <= 0:
             return []
 
-        if topic:
-            where_clause: Dict[str, Any] = {"$and": [{"agent_id": agent_id}, {"topic": topic}]}
-        else:
-            where_clause = {"agent_id": agent_id}
-
-        payload = self.collection.get(where=where_clause, limit=limit, include=["metadatas"])
+        payload = self.latest(
+            agent_id=agent_id, topic=topic or None, limit=limit, start=start, end=end, include=["metadatas"]
+        )
         return payload.get("metadatas") or []
 
+    def iter_scores(
+        self,
+        agent_id: str,
+        topic: Optional[str] = None,
+        limit: Optional[int] = None,
+        start: Optional[float] = None,
+        page_size: int = 500,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Stream score metadata newest first in pages of at most ``page_size`` records."""
+        for page in self.iter_latest(
+            agent_id=agent_id, topic=topic or None, limit=limit, start=start, page_size=page_size
+        ):
+            yield page.get("metadatas") or []
 
-class ErrorRepository(BaseRepository):
+
+class ErrorRepository(TimeOrderedRepository):
     """Repository for error collection."""
 
     def add_error(self, message: str, context: str, agent_id: str) -> None:
+        self._write_records([self.build_record(message=message, context=context, agent_id=agent_id)])
+
+    def add_errors(self, records: Iterable[Mapping[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """Bulk :meth:`add_error`; each record holds its keyword arguments."""
+        return self.add_many(records, batch_size)
+
+    def build_record(self, message: str, context: str, agent_id: str) -> Record:
         severity = "high" if "critical" in message.lower() else "medium"
+        timestamp, epoch = _timestamps()
         metadata = {
             "context": context,
             "agent_id": agent_id,
-            "timestamp": _timestamp(),
+            "timestamp": timestamp,
+            "timestamp_epoch": epoch,
             "severity": severity,
         }
-        self.collection.add(
-            documents=[message],
-            metadatas=[metadata],
-            ids=[f"error_{agent_id}_{_timestamp()}"],
-        )
+        return new_record_id("error"), message, metadata
 
-    def recent_errors(self, agent_id: Optional[str], limit: int) -> Dict[str, Any]:
-        where_clause = {"agent_id": agent_id} if agent_id else None
-        return self.collection.get(where=where_clause, limit=limit, include=["metadatas", "documents", "ids"])
+    def recent_errors(
+        self,
+        agent_id: Optional[str],
+        limit: int,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """The newest ``limit`` errors (all agents when ``agent_id`` is None), newest first."""
+        return self.latest(agent_id=agent_id or None, limit=limit, start=start, end=end)
 
 
-class DailyLogRepository(BaseRepository):
+class DailyLogRepository(TimeOrderedRepository):
     """Repository for daily logs."""
 
     def add_log(self, agent_id: str, activity_type: str, details: Dict[str, Any]):
+        self._write_records([self.build_record(agent_id=agent_id, activity_type=activity_type, details=details)])
+
+    def add_logs(self, records: Iterable[Mapping[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """Bulk :meth:`add_log`; each record holds its keyword arguments."""
+        return self.add_many(records, batch_size)
+
+    def build_record(self, agent_id: str, activity_type: str, details: Dict[str, Any]) -> Record:
+        timestamp, epoch = _timestamps()
         metadata = {
             "agent_id": agent_id,
             "activity_type": activity_type,
-            "timestamp": _timestamp(),
+            "timestamp": timestamp,
             **{k: str(v) for k, v in details.items()},
+            "timestamp_epoch": epoch,
         }
-        self.collection.add(
-            documents=[f"Activity: {activity_type} - {metadata['timestamp']}"],
-            metadatas=[metadata],
-            ids=[f"log_{agent_id}_{_timestamp()}"],
-        )
+        document = f"Activity: {activity_type} - {metadata['timestamp']}"
+        return new_record_id("log"), document, metadata
 
-    def get_recent(self, agent_id: str, limit: int = 100):
-        return self.collection.get(where={"agent_id": agent_id}, limit=limit)
+    def get_recent(
+        self,
+        agent_id: str,
+        limit: Optional[int] = 100,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """The agent's newest logs (optionally within [start, end) epoch seconds), newest first."""
+        return self.latest(agent_id=agent_id, limit=limit, start=start, end=end)
 
 
 class RepositoryRegistry:
-    """Factory/registry that exposes strongly-typed repositories."""
+    """
+    Factory/registry that exposes strongly-typed repositories.
+
+    Training materials and errors live in Chroma (they are searched
+    semantically). With ``records_backend="sqlite"`` (the default) scores and
+    daily logs live in an indexed SQLite :class:`RecordStore` instead, so
+    writing them costs no embedding pass; :meth:`migrate_structured_records`
+    copies records left in the legacy Chroma collections. It runs
+    automatically (unless ``auto_migrate_records=False``) while a legacy
+    collection holds records and no migration has completed, so existing
+    installs keep their history on upgrade and an interrupted migration
+    resumes on the next start.
+
+    Full-history performance rollups are saved in a
+    :class:`PerformanceRollupStore` next to the scores, so summaries resume
+    across processes instead of re-reading every score.
+
+    With ``shard_by_agent=True`` training materials are routed to one
+    collection per agent (or per group from ``shard_groups``) through a
+    :class:`ShardRouter`; :meth:`migrate_to_shards` moves materials out of
+    the shared collection.
+    """
 
-    def __init__(self, database: Optional[ChromaDatabase] = None):
+    RECORD_BACKENDS = ("sqlite", "chroma")
+
+    def __init__(
+        self,
+        database: Optional[ChromaDatabase] = None,
+        near_duplicate_distance: Optional[int] = None,
+        records_backend: str = "sqlite",
+        shard_by_agent: bool = False,
+        shard_groups: Optional[Mapping[str, str]] = None,
+        auto_migrate_records: bool = True,
+    ):
+        if records_backend not in self.RECORD_BACKENDS:
+            raise ValueError(f"records_backend must be one of {self.RECORD_BACKENDS}.")
         self.database = database or ChromaDatabase()
-        self.training_materials = TrainingMaterialRepository(self.database.collections.training)
-        self.scores = ScoreRepository(self.database.collections.scores)
-        self.errors = ErrorRepository(self.database.collections.errors)
-        self.daily_logs = DailyLogRepository(self.database.collections.daily_logs)
+        self.records_backend = records_backend
+        self.content_index = ContentIndex(self.database.path / "content_index.sqlite3")
+        self.shard_router: Optional[ShardRouter] = None
+        self.training_materials: TrainingMaterialRepository | ShardedTrainingMaterialRepository
+        if shard_by_agent:
+            self.shard_router = ShardRouter(self.database, groups=shard_groups)
+            self.training_materials = ShardedTrainingMaterialRepository(
+                self.shard_router,
+                archive=self.database.collections.training_archive,
+                content_index=self.content_index,
+                near_duplicate_distance=near_duplicate_distance,
+            )
+        else:
+            self.training_materials = TrainingMaterialRepository(
+                self.database.collections.training,
+                archive=self.database.collections.training_archive,
+                content_index=self.content_index,
+                near_duplicate_distance=near_duplicate_distance,
+            )
+        self.time_index = TimeIndex(self.database.path / "time_index.sqlite3")
+        self.errors = ErrorRepository(self.database.collections.errors, self.time_index)
+        self.performance_rollups = PerformanceRollupStore(self.database.path / "performance_rollups.sqlite3")
+
+        self.record_store: Optional[RecordStore] = None
+        if records_backend == "sqlite":
+            self.record_store = RecordStore(self.database.path / "records.sqlite3")
+            self.scores = ScoreRepository(
+                self.record_store.collection(self.database.collections.scores.name), index=self.record_store
+            )
+            self.daily_logs = DailyLogRepository(
+                self.record_store.collection(self.database.collections.daily_logs.name), index=self.record_store
+            )
+            if auto_migrate_records and self._legacy_records_pending():
+                self.migrate_structured_records()
+        else:
+            self.scores = ScoreRepository(self.database.collections.scores, self.time_index)
+            self.daily_logs = DailyLogRepository(self.database.collections.daily_logs, self.time_index)
 
     def stats(self) -> dict[str, int]:
-        return self.database.stats()
+        stats = self.database.stats()
+        stats["scores"] = self.scores.count()
+        stats["daily_logs"] = self.daily_logs.count()
+        if self.shard_router is not None:
+            stats["training"] = self.training_materials.count()
+            stats["training_shards"] = len(self.shard_router.collection_names())
+            stats["training_unsharded"] = self.database.collections.training.count()
+        return stats
+
+    def migrate_to_shards(self, page_size: int = 500, delete_source: bool = False) -> Dict[str, int]:
+        """
+        Move training materials from the shared collection into per-agent shards.
+
+        Materials keep their IDs, metadata and embeddings (nothing is
+        re-embedded), and IDs already present in a shard are skipped, so the
+        migration can be re-run safely.
+
+        Args:
+            page_size: Materials read per paged ``get``.
+            delete_source: Delete each page from the shared collection once it is copied.
+
+        Returns:
+            Dict[str, int]: Materials copied per shard collection.
+
+        Raises:
+            RuntimeError: If the registry was not created with ``shard_by_agent=True``.
+        """
+        if self.shard_router is None:
+            raise RuntimeError("migrate_to_shards requires shard_by_agent=True.")
+
+        source = TrainingMaterialRepository(self.database.collections.training, content_index=self.content_index)
+        migrated: Dict[str, int] = {}
+        offset = 0
+        while True:
+            payload = source.collection.get(
+                limit=page_size, offset=offset, include=["documents", "metadatas", "embeddings"]
+            )
+            ids = payload.get("ids") or []
+            if not ids:
+                break
+            documents = payload.get("documents") or [""] * len(ids)
+            metadatas = [metadata or {} for metadata in payload.get("metadatas") or [{}] * len(ids)]
+            embeddings = payload.get("embeddings")
+            by_shard: Dict[str, List[int]] = {}
+            for position, metadata in enumerate(metadatas):
+                by_shard.setdefault(self.shard_router.collection_name(metadata.get("agent_id")), []).append(position)
+            for name, positions in by_shard.items():
+                written = self.training_materials._shard_named(name).import_records(
+                    [ids[i] for i in positions],
+                    [documents[i] for i in positions],
+                    [metadatas[i] for i in positions],
+                    None if embeddings is None else [embeddings[i] for i in positions],
+                )
+                migrated[name] = migrated.get(name, 0) + written
+            if delete_source:
+                # Later materials shift down into the page just removed
+                source._delete_ids(ids)
+            else:
+                offset += len(ids)
+            if len(ids) < page_size:
+                break
+        return migrated
+
+    def _legacy_records_pending(self) -> bool:
+        """Whether a legacy Chroma collection holds records and no migration has completed yet."""
+        if self.record_store is None or self.record_store.is_migrated():
+            return False
+        return any(
+            legacy.count()
+            for legacy in (self.database.collections.scores, self.database.collections.daily_logs)
+        )
+
+    def migrate_structured_records(self, page_size: int = 500, delete_source: bool = False) -> Dict[str, int]:
+        """
+        Copy scores and daily logs from the legacy Chroma collections into the record store.
+
+        Records keep their IDs and metadata, and already-migrated IDs are
+        skipped, so the migration can be re-run safely. Once every record is
+        copied the record store is marked migrated, which stops the automatic
+        migration on later starts.
+
+        Args:
+            page_size: Records read per paged ``get``.
+            delete_source: Delete each page from Chroma once it is copied.
+
+        Returns:
+            Dict[str, int]: Records read per collection.
+
+        Raises:
+            RuntimeError: If the registry does not use the SQLite backend.
+        """
+        if self.record_store is None:
+            raise RuntimeError("migrate_structured_records requires records_backend='sqlite'.")
+
+        migrated: Dict[str, int] = {}
+        for key, source, target in (
+            ("scores", self.database.collections.scores, self.scores),
+            ("daily_logs", self.database.collections.daily_logs, self.daily_logs),
+        ):
+            copied = 0
+            offset = 0
+            while True:
+                payload = source.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+                ids = payload.get("ids") or []
+                if not ids:
+                    break
+                target.collection.add(
+                    ids=ids,
+                    documents=payload.get("documents"),
+                    metadatas=[_with_epoch(metadata or {}) for metadata in payload.get("metadatas") or []],
+                )
+                copied += len(ids)
+                if delete_source:
+                    # Later records shift down into the page just removed
+                    source.delete(ids=ids)
+                else:
+                    offset += len(ids)
+                if len(ids) < page_size:
+                    break
+            migrated[key] = copied
+        self.record_store.mark_migrated()
+        return migrated
+
+
+def _with_epoch(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Add ``timestamp_epoch`` to legacy records that only carry an ISO timestamp."""
+    if isinstance(metadata.get("timestamp_epoch"), (int, float)):
+        return metadata
+    return {**metadata, "timestamp_epoch": _created_epoch(metadata) or 0.0}
@@ -0,0 +1,96 @@
+"""
+Module: sharding.py
+Purpose: Route training materials to per-agent (or per-group) Chroma collections.
+
+With one shared collection every agent-filtered query searches the whole
+fleet's HNSW graph and filters afterwards. Sharding gives each agent (or
+each configured agent group) its own collection, so per-agent recall only
+touches that agent's vectors; cross-agent searches fan out over the shards.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-18T21:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Any, Dict, List, Mapping, Optional
+
+from .client import ChromaDatabase
+
+SHARD_PREFIX = "training_shard_"
+# Shard key for materials stored without an agent
+SHARED_SHARD_KEY = "shared"
+
+_UNSAFE = re.compile(r"[^a-zA-Z0-9_-]+")
+
+
+def shard_collection_name(shard_key: str, prefix: str = SHARD_PREFIX) -> str:
+    """
+    [CREATE] Chroma-safe collection name for a shard key.
+
+    The readable slug is truncated and suffixed with a short hash, so
+    distinct keys never collide even when their slugs do.
+
+    Example:
+        >>> shard_collection_name("ClaudeCode")
+        'training_shard_ClaudeCode_fe3f2e94'
+    """
+    slug = _UNSAFE.sub("-", shard_key).strip("-_")[:40]
+    digest = hashlib.sha1(shard_key.encode("utf-8")).hexdigest()[:8]
+    return f"{prefix}{slug}_{digest}" if slug else f"{prefix}{digest}"
+
+
+class ShardRouter:
+    """
+    [CREATE] Maps agent IDs to shard collections.
+
+    Args:
+        database: Database owning the shard collections.
+        groups: Optional agent_id -> group name map; agents of one group share
+            a shard, unlisted agents get their own.
+        prefix: Collection name prefix identifying shards.
+
+    Example:
+        >>> router = ShardRouter(database, groups={"Codex": "openai", "GPT": "openai"})
+        >>> router.shard_key("GPT")
+        'openai'
+    """
+
+    def __init__(
+        self,
+        database: ChromaDatabase,
+        groups: Optional[Mapping[str, str]] = None,
+        prefix: str = SHARD_PREFIX,
+    ) -> None:
+        self.database = database
+        self.groups = dict(groups or {})
+        self.prefix = prefix
+        self._collections: Dict[str, Any] = {}
+
+    def shard_key(self, agent_id: Optional[str]) -> str:
+        """[CREATE] Group name of an agent, its own ID when ungrouped."""
+        if not agent_id:
+            return SHARED_SHARD_KEY
+        return self.groups.get(agent_id, agent_id)
+
+    def collection_name(self, agent_id: Optional[str]) -> str:
+        """[CREATE] Name of the shard collection holding an agent's materials."""
+        return shard_collection_name(self.shard_key(agent_id), self.prefix)
+
+    def collection(self, name: str) -> Any:
+        """[CREATE] Shard collection by name, created on first use."""
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = self.database.collection(name)
+        return collection
+
+    def collection_for(self, agent_id: Optional[str]) -> Any:
+        """[CREATE] Shard collection for an agent, created on first use."""
+        return self.collection(self.collection_name(agent_id))
+
+    def collection_names(self) -> List[str]:
+        """[CREATE] Every existing shard, including ones created by other processes."""
+        return sorted(set(self.database.collection_names(self.prefix)) | set(self._collections))
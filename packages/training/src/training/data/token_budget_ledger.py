@@ -0,0 +1,173 @@
+"""
+Module: token_budget_ledger.py
+Purpose: Pre-flight token budget decisions backed by in-memory usage counters.
+
+``TokenTracker.check_budget`` judges an operation after it ran. The ledger
+answers before it runs: given an estimated token count and the remaining
+per-operation, per-session, per-day and per-agent (monthly) budgets, it
+returns allow, trim-to-N or deny. Day and month usage is held in in-memory
+counters that are bumped as operations are recorded and periodically
+re-read from the persisted daily rollups, which also picks up usage
+recorded by other processes.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-19T03:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+ALLOW = "allow"
+TRIM = "trim"
+DENY = "deny"
+
+
+@dataclass
+class BudgetLimits:
+    """
+    Token limits checked before an operation; None disables a scope.
+
+    ``operation_tokens`` maps operation types to their per-operation maximum.
+    """
+
+    session_tokens: Optional[int] = None
+    day_tokens: Optional[int] = None
+    month_tokens: Optional[int] = None
+    operation_tokens: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "BudgetLimits":
+        """Limits from the ``agent_limits`` and ``operations`` sections of token_budgets.yaml."""
+        agent_limits = config.get("agent_limits") or {}
+        operations = config.get("operations") or {}
+        return cls(
+            session_tokens=agent_limits.get("max_tokens_per_session"),
+            day_tokens=agent_limits.get("max_tokens_per_day"),
+            month_tokens=agent_limits.get("max_tokens_per_month"),
+            operation_tokens={
+                name: int(budget["max_tokens"])
+                for name, budget in operations.items()
+                if isinstance(budget, dict) and "max_tokens" in budget
+            },
+        )
+
+
+@dataclass(frozen=True)
+class BudgetDecision:
+    """
+    Outcome of a pre-flight check.
+
+    ``allowed_tokens`` is the requested size for ``allow``, the largest size
+    that fits for ``trim`` and 0 for ``deny``. ``limiting_scope`` names the
+    scope with the least budget left (None if no scope applied).
+    """
+
+    action: str
+    requested_tokens: int
+    allowed_tokens: int
+    limiting_scope: Optional[str] = None
+    remaining: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def allowed(self) -> bool:
+        return self.action != DENY
+
+
+def decide(requested_tokens: int, remaining: Dict[str, int], min_tokens: int = 1) -> BudgetDecision:
+    """
+    [CREATE] Allow, trim or deny a request against the remaining budget of each scope.
+
+    Args:
+        requested_tokens: Estimated tokens of the operation.
+        remaining: Tokens left per scope (may be negative once overspent).
+        min_tokens: Smallest trimmed size still worth running; below it the request is denied.
+
+    Example:
+        >>> decide(1200, {"session": 800, "day": 5000}).action
+        'trim'
+    """
+    requested_tokens = max(0, requested_tokens)
+    if not remaining:
+        return BudgetDecision(ALLOW, requested_tokens, requested_tokens)
+
+    scope = min(remaining, key=remaining.get)
+    available = max(0, remaining[scope])
+    if requested_tokens <= available:
+        return BudgetDecision(ALLOW, requested_tokens, requested_tokens, scope, dict(remaining))
+    if available >= max(1, min_tokens):
+        return BudgetDecision(TRIM, requested_tokens, available, scope, dict(remaining))
+    return BudgetDecision(DENY, requested_tokens, 0, scope, dict(remaining))
+
+
+@dataclass
+class _Counter:
+    tokens: int
+    refreshed_at: float
+
+
+class TokenBudgetLedger:
+    """
+    [CREATE] In-memory day and month token counters per agent.
+
+    Args:
+        usage: ``usage(agent_id, first_day, last_day)`` returns persisted token
+            usage for an inclusive range of ISO days (e.g. from the daily rollups).
+        refresh_interval: Seconds after which a counter is re-read from ``usage``.
+        clock: Monotonic time source (injectable for tests).
+
+    Thread Safety:
+        Counter reads and updates are serialised by an internal lock.
+
+    Example:
+        >>> ledger = TokenBudgetLedger(rollups.total_tokens)
+        >>> ledger.consume("ClaudeCode", "2026-10-19", 1500)
+        >>> ledger.day_tokens("ClaudeCode", "2026-10-19")
+        1500
+    """
+
+    def __init__(
+        self,
+        usage: Callable[[str, str, str], int],
+        refresh_interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._usage = usage
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._counters: Dict[Tuple[str, str, str], _Counter] = {}
+        self._lock = threading.Lock()
+
+    def day_tokens(self, agent_id: str, day: str) -> int:
+        """[CREATE] Tokens used by an agent on ``day``."""
+        return self._read(agent_id, "day", day, day, day)
+
+    def month_tokens(self, agent_id: str, day: str) -> int:
+        """[CREATE] Tokens used by an agent in the month of ``day`` up to that day."""
+        return self._read(agent_id, "month", day[:7], f"{day[:7]}-01", day)
+
+    def consume(self, agent_id: str, day: str, tokens: int) -> None:
+        """[CREATE] Count a recorded operation in the cached counters of its day and month."""
+        with self._lock:
+            for key in ((agent_id, "day", day), (agent_id, "month", day[:7])):
+                counter = self._counters.get(key)
+                if counter is not None:
+                    counter.tokens += tokens
+
+    def _read(self, agent_id: str, scope: str, period: str, first_day: str, last_day: str) -> int:
+        key = (agent_id, scope, period)
+        now = self._clock()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is not None and now - counter.refreshed_at < self.refresh_interval:
+                return counter.tokens
+            # Counters of earlier periods are no longer read
+            for stale in [k for k in self._counters if k[:2] == key[:2] and k[2] != period]:
+                del self._counters[stale]
+            counter = _Counter(int(self._usage(agent_id, first_day, last_day)), now)
+            self._counters[key] = counter
+            return counter.tokens
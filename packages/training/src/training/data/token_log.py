@@ -0,0 +1,281 @@
+"""
+Module: token_log.py
+Purpose: Append-only JSONL operation log for token metrics with a columnar loader.
+
+Token metrics used to be stored as one pretty-printed JSON file per LLM
+operation (``operations/<agent>/<date>/<operation>.json``), and every stats
+call opened each file and validated it into a Pydantic model. This log
+appends compact JSON lines to one segment per agent and day
+(``operations/<agent>/<date>.jsonl``) through a buffered writer. The loader
+reads segments straight into per-field lists, with no per-record model
+construction. :func:`convert_legacy_operations` folds existing per-file
+data into segments.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-19T01:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+SEGMENT_SUFFIX = ".jsonl"
+
+# Fields the loader extracts; computed fields are stored on write so reads need no model
+COLUMNS = (
+    "session_id",
+    "operation_id",
+    "timestamp",
+    "prompt_tokens",
+    "context_tokens",
+    "user_input_tokens",
+    "completion_tokens",
+    "cached_tokens",
+    "output_quality_score",
+    "context_utilization_score",
+    "cost_usd",
+    "model_name",
+    "operation_type",
+    "language",
+    "total_input_tokens",
+    "total_output_tokens",
+    "total_tokens",
+    "efficiency_score",
+    "cache_hit_rate",
+)
+
+
+@dataclass
+class TokenColumns:
+    """
+    Operation records as one list per field.
+
+    ``day`` holds each record's segment date (ISO format).
+    """
+
+    columns: Dict[str, List[Any]] = field(
+        default_factory=lambda: {name: [] for name in ("day",) + COLUMNS}
+    )
+
+    def __len__(self) -> int:
+        return len(self.columns["day"])
+
+    def __getitem__(self, name: str) -> List[Any]:
+        return self.columns[name]
+
+    def append(self, day: str, record: Dict[str, Any]) -> None:
+        self.columns["day"].append(day)
+        for name in COLUMNS:
+            self.columns[name].append(record.get(name))
+
+
+def encode_record(record: Dict[str, Any]) -> str:
+    """[CREATE] One compact JSON line for a ``TokenMetrics.model_dump(mode="json")`` record."""
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str) + "\n"
+
+
+class TokenLogWriter:
+    """
+    [CREATE] Buffered appender of operation records to per-agent daily segments.
+
+    Args:
+        directory: The ``operations`` directory (one sub-directory per agent).
+        max_records: Flush once this many records are buffered.
+        max_delay: Flush once the oldest buffered record is this many seconds old.
+            The age is checked on every ``append``.
+        clock: Monotonic time source (injectable for tests).
+        on_flush: Called as ``on_flush(agent_id, day, records)`` after each
+            segment's records are written, e.g. to fold them into rollups.
+
+    Thread Safety:
+        ``append`` and ``flush`` are serialised by an internal lock, which is
+        held while ``on_flush`` runs. Each flush writes a segment's buffered
+        lines with a single append, so concurrent processes do not interleave
+        partial records.
+
+    Example:
+        >>> writer = TokenLogWriter(Path("token_metrics/operations"))
+        >>> writer.append("ClaudeCode", "2026-10-19", metrics.model_dump(mode="json"))
+        >>> writer.flush()
+        1
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_records: int = 64,
+        max_delay: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        on_flush: Optional[Callable[[str, str, List[Dict[str, Any]]], None]] = None,
+    ) -> None:
+        if max_records <= 0:
+            raise ValueError("max_records must be greater than zero.")
+        self.directory = Path(directory)
+        self.max_records = max_records
+        self.max_delay = max_delay
+        self._clock = clock
+        self.on_flush = on_flush
+        # (agent_id, day) -> buffered (line, record) pairs
+        self._pending: Dict[Tuple[str, str], List[Tuple[str, Dict[str, Any]]]] = {}
+        self._pending_count = 0
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self.flushed = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._pending_count
+
+    def segment_path(self, agent_id: str, day: str) -> Path:
+        return self.directory / agent_id / f"{day}{SEGMENT_SUFFIX}"
+
+    def append(self, agent_id: str, day: str, record: Dict[str, Any]) -> None:
+        """[CREATE] Buffer one record for the agent's segment of ``day``."""
+        line = encode_record(record)
+        with self._lock:
+            if not self._pending_count:
+                self._oldest = self._clock()
+            self._pending.setdefault((agent_id, day), []).append((line, record))
+            self._pending_count += 1
+            if self._pending_count >= self.max_records or self._clock() - self._oldest >= self.max_delay:
+                self._flush_locked()
+
+    def flush(self) -> int:
+        """
+        [CREATE] Append every buffered record to its segment.
+
+        Returns:
+            int: Number of records written.
+        """
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        written = 0
+        while self._pending:
+            (agent_id, day), entries = next(iter(self._pending.items()))
+            path = self.segment_path(agent_id, day)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as handle:
+                handle.write("".join(line for line, _ in entries))
+            # Drop a segment only once written, so a failed flush keeps the rest
+            del self._pending[(agent_id, day)]
+            self._pending_count -= len(entries)
+            written += len(entries)
+            self.flushed += len(entries)
+            if self.on_flush is not None:
+                self.on_flush(agent_id, day, [record for _, record in entries])
+        self._oldest = None
+        return written
+
+
+def load_columns(agent_dir: Path, since: Optional[date] = None) -> TokenColumns:
+    """
+    [CREATE] Read an agent's operation records into columns.
+
+    Args:
+        agent_dir: ``operations/<agent>`` directory.
+        since: Skip days before this date.
+
+    Returns:
+        TokenColumns: Records ordered by day, then by write order. Per-file
+        records from before the log existed are included until converted.
+    """
+    columns = TokenColumns()
+    for day, path, legacy in _day_sources(agent_dir, since):
+        if legacy:
+            for record in _legacy_records(path):
+                columns.append(day, record)
+            continue
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn final line
+                columns.append(day, record)
+    return columns
+
+
+def convert_legacy_operations(directory: Path) -> int:
+    """
+    [CREATE] Fold ``<agent>/<date>/<operation>.json`` files into daily segments.
+
+    Records are appended in timestamp order and their files removed. Operation
+    IDs already present in a segment are skipped, so an interrupted conversion
+    can simply be run again.
+
+    Returns:
+        int: Number of records converted.
+    """
+    directory = Path(directory)
+    if not directory.exists():
+        return 0
+    converted = 0
+    for agent_dir in sorted(path for path in directory.iterdir() if path.is_dir()):
+        for day, day_dir, legacy in _day_sources(agent_dir, None):
+            if not legacy:
+                continue
+            segment = agent_dir / f"{day}{SEGMENT_SUFFIX}"
+            known = set(_segment_ids(segment))
+            records = sorted(_legacy_records(day_dir), key=lambda record: str(record.get("timestamp")))
+            lines = [encode_record(r) for r in records if r.get("operation_id") not in known]
+            if lines:
+                with open(segment, "a", encoding="utf-8") as handle:
+                    handle.write("".join(lines))
+            converted += len(lines)
+            for path in day_dir.glob("*.json"):
+                path.unlink()
+            day_dir.rmdir()
+    return converted
+
+
+def _segment_ids(segment: Path) -> List[str]:
+    """[CREATE] Operation IDs stored in one segment file."""
+    if not segment.exists():
+        return []
+    ids: List[str] = []
+    with open(segment, "r", encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                ids.append(json.loads(line).get("operation_id"))
+            except ValueError:
+                continue
+    return ids
+
+
+def _day_sources(agent_dir: Path, since: Optional[date]) -> Iterator[Tuple[str, Path, bool]]:
+    """(day, path, is_legacy_directory) for each day at or after ``since``, oldest first."""
+    if not agent_dir.exists():
+        return
+    sources: List[Tuple[str, Path, bool]] = []
+    for path in agent_dir.iterdir():
+        if path.is_dir():
+            day, legacy = path.name, True
+        elif path.name.endswith(SEGMENT_SUFFIX):
+            day, legacy = path.name[: -len(SEGMENT_SUFFIX)], False
+        else:
+            continue
+        try:
+            parsed = date.fromisoformat(day)
+        except ValueError:
+            continue
+        if since is None or parsed >= since:
+            sources.append((day, path, legacy))
+    # Legacy files first within a day: they predate the segment
+    yield from sorted(sources, key=lambda source: (source[0], not source[2]))
+
+
+def _legacy_records(day_dir: Path) -> List[Dict[str, Any]]:
+    records = []
+    for path in day_dir.glob("*.json"):
+        with open(path, "r", encoding="utf-8") as handle:
+            records.append(json.load(handle))
+    return records
@@ -0,0 +1,209 @@
+"""
+Module: streaming_stats.py
+Purpose: Single-pass, mergeable statistics for score aggregation.
+
+``RunningStats`` keeps count, mean and variance (Welford), min/max and a
+bounded reservoir sample for percentiles, so any number of records can be
+summarised in one pass with O(1) memory per metric. ``MetricsAggregator``
+tracks several metrics at once, optionally grouped by record fields.
+
+Agent: GPT-5.1 Codex
+Created: 2026-10-18T19:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# Values kept per metric for percentiles; exact below this many samples
+RESERVOIR_SIZE = 1024
+
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class RunningStats:
+    """
+    [CREATE] Welford mean/variance plus a reservoir sample for percentiles.
+
+    Example:
+        >>> stats = RunningStats()
+        >>> for value in (1.0, 2.0, 3.0):
+        ...     stats.add(value)
+        >>> stats.mean, stats.variance
+        (2.0, 1.0)
+    """
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: float = math.inf
+    maximum: float = -math.inf
+    reservoir: List[float] = field(default_factory=list)
+    reservoir_size: int = RESERVOIR_SIZE
+
+    def add(self, value: float) -> None:
+        """[CREATE] Fold one value into the statistics (O(1))."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        if len(self.reservoir) < self.reservoir_size:
+            self.reservoir.append(value)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.reservoir_size:
+                self.reservoir[slot] = value
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0.0 for fewer than two values)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def percentile(self, q: float) -> float:
+        """[CREATE] Linear-interpolated percentile of the sample (exact while it fits the reservoir)."""
+        if not self.reservoir:
+            return 0.0
+        ordered = sorted(self.reservoir)
+        rank = (len(ordered) - 1) * q / 100
+        low = math.floor(rank)
+        high = math.ceil(rank)
+        return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+    def summary(self) -> Dict[str, float]:
+        """[CREATE] Mean, variance, stddev, min, max and percentiles as plain floats."""
+        result = {
+            "mean": self.mean,
+            "variance": self.variance,
+            "stddev": math.sqrt(self.variance),
+            "min": self.minimum if self.count else 0.0,
+            "max": self.maximum if self.count else 0.0,
+        }
+        for q in PERCENTILES:
+            result[f"p{q}"] = self.percentile(q)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """[CREATE] JSON-serialisable state; :meth:`from_dict` restores it exactly."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "minimum": self.minimum if self.count else None,
+            "maximum": self.maximum if self.count else None,
+            "reservoir": list(self.reservoir),
+            "reservoir_size": self.reservoir_size,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "RunningStats":
+        """[CREATE] Rebuild statistics saved by :meth:`to_dict`."""
+        count = int(data.get("count", 0))
+        return cls(
+            count=count,
+            mean=float(data.get("mean", 0.0)),
+            m2=float(data.get("m2", 0.0)),
+            minimum=float(data["minimum"]) if count else math.inf,
+            maximum=float(data["maximum"]) if count else -math.inf,
+            reservoir=[float(value) for value in data.get("reservoir", [])],
+            reservoir_size=int(data.get("reservoir_size", RESERVOIR_SIZE)),
+        )
+
+
+class MetricsAggregator:
+    """
+    [CREATE] Streams records into per-metric (and optionally per-group) statistics.
+
+    Args:
+        metrics: Record keys to aggregate; missing or non-numeric values count as 0.
+        group_by: Record keys whose values define groups (e.g. ``("topic",)``).
+
+    Complexity:
+        O(m) per record for m metrics; memory is independent of the record count.
+    """
+
+    def __init__(self, metrics: Sequence[str], group_by: Sequence[str] = ()) -> None:
+        self.metrics = tuple(metrics)
+        self.group_by = tuple(group_by)
+        self.overall = self._new_stats()
+        self.groups: Dict[Tuple[Any, ...], Dict[str, RunningStats]] = {}
+
+    def _new_stats(self) -> Dict[str, RunningStats]:
+        return {name: RunningStats() for name in self.metrics}
+
+    @property
+    def count(self) -> int:
+        return self.overall[self.metrics[0]].count if self.metrics else 0
+
+    def add(self, record: Mapping[str, Any]) -> None:
+        """[CREATE] Fold one record into the overall and group statistics."""
+        values = {name: _as_float(record.get(name)) for name in self.metrics}
+        for name, value in values.items():
+            self.overall[name].add(value)
+        if self.group_by:
+            key = tuple(record.get(name) for name in self.group_by)
+            group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = self._new_stats()
+            for name, value in values.items():
+                group[name].add(value)
+
+    def add_all(self, records: Iterable[Mapping[str, Any]]) -> None:
+        """[CREATE] Fold many records."""
+        for record in records:
+            self.add(record)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """[CREATE] JSON-serialisable state (metrics, grouping and every statistic)."""
+        return {
+            "metrics": list(self.metrics),
+            "group_by": list(self.group_by),
+            "overall": {name: stats.to_dict() for name, stats in self.overall.items()},
+            "groups": [
+                [list(key), {name: stats.to_dict() for name, stats in group.items()}]
+                for key, group in self.groups.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "MetricsAggregator":
+        """[CREATE] Rebuild an aggregator saved by :meth:`to_dict`."""
+        aggregator = cls(data["metrics"], data.get("group_by", ()))
+        aggregator.overall.update(
+            (name, RunningStats.from_dict(stats)) for name, stats in data.get("overall", {}).items()
+        )
+        for key, group in data.get("groups", []):
+            aggregator.groups[tuple(key)] = {
+                name: RunningStats.from_dict(stats) for name, stats in group.items()
+            }
+        return aggregator
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """[CREATE] Per-metric summaries of every record seen."""
+        return {name: stats.summary() for name, stats in self.overall.items()}
+
+    def group_summaries(self) -> List[Dict[str, Any]]:
+        """[CREATE] One entry per group: its key fields, sample size and metric summaries."""
+        results = []
+        for key, stats in self.groups.items():
+            first = next(iter(stats.values()), None)
+            results.append({
+                **dict(zip(self.group_by, key)),
+                "sample_size": first.count if first else 0,
+                "metrics": {name: metric.summary() for name, metric in stats.items()},
+            })
+        results.sort(key=lambda group: group["sample_size"], reverse=True)
+        return results
+
+
+def _as_float(value: Optional[Any]) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
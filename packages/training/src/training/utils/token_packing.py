@@ -0,0 +1,250 @@
+"""
+Module: token_packing.py
+Purpose: Relevance-maximising packing of documents into a token budget.
+
+Provides a bounded 0/1 knapsack over candidate documents (value =
+relevance, weight = tokens) plus chunk-level filling of whatever budget the
+whole documents leave unused.
+
+Agent: Composer
+Created: 2026-10-18T14:00:00Z
+Operation: [CREATE]
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+# Number of capacity buckets the knapsack table is quantised to. Bounds the DP
+# at O(candidates * MAX_KNAPSACK_BUCKETS) regardless of the token budget.
+MAX_KNAPSACK_BUCKETS = 512
+
+_CHUNK_SPLIT = re.compile(r"\n\s*\n")
+
+
+@dataclass
+class PackingCandidate:
+    """
+    A document competing for space in the token budget.
+
+    Attributes:
+        key: Caller-defined identifier (e.g. Chroma document id).
+        content: Document text.
+        tokens: Token count of ``content``.
+        relevance: Relevance score in [0, 1].
+        chunk_tokens: Precomputed token counts of ``split_chunks(content)``,
+            used instead of re-tokenizing when truncating.
+    """
+
+    key: str
+    content: str
+    tokens: int
+    relevance: float
+    chunk_tokens: Optional[List[int]] = None
+
+
+@dataclass
+class PackedItem:
+    """A candidate (or a leading chunk of it) selected for the context."""
+
+    candidate: PackingCandidate
+    content: str
+    tokens: int
+    truncated: bool = False
+
+
+def knapsack_select(candidates: Sequence[PackingCandidate], capacity: int) -> List[int]:
+    """
+    Choose the subset of candidates with maximum total relevance within ``capacity`` tokens.
+
+    Token weights are quantised to at most ``MAX_KNAPSACK_BUCKETS`` buckets and
+    rounded up, so the selection never exceeds the real capacity.
+
+    Args:
+        candidates: Documents to choose from.
+        capacity: Token budget.
+
+    Returns:
+        List[int]: Indices of the selected candidates, in input order.
+
+    Complexity:
+        Time: O(n * B) with B <= MAX_KNAPSACK_BUCKETS
+        Space: O(n * B)
+    """
+    if capacity <= 0 or not candidates:
+        return []
+
+    unit = max(1, math.ceil(capacity / MAX_KNAPSACK_BUCKETS))
+    buckets = capacity // unit
+    weights = [max(1, math.ceil(c.tokens / unit)) if c.tokens > 0 else 0 for c in candidates]
+
+    best = [0.0] * (buckets + 1)
+    keep = [[False] * (buckets + 1) for _ in candidates]
+    for i, (candidate, weight) in enumerate(zip(candidates, weights)):
+        if weight > buckets or candidate.relevance <= 0:
+            continue
+        for cap in range(buckets, weight - 1, -1):
+            value = best[cap - weight] + candidate.relevance
+            if value > best[cap]:
+                best[cap] = value
+                keep[i][cap] = True
+
+    selected = []
+    cap = buckets
+    for i in range(len(candidates) - 1, -1, -1):
+        if keep[i][cap]:
+            selected.append(i)
+            cap -= weights[i]
+    selected.reverse()
+    return selected
+
+
+def split_chunks(content: str) -> List[str]:
+    """Split a document into paragraph-level chunks (falling back to lines)."""
+    chunks = [chunk for chunk in _CHUNK_SPLIT.split(content) if chunk.strip()]
+    if len(chunks) <= 1:
+        chunks = [line for line in content.splitlines() if line.strip()]
+    return chunks or [content]
+
+
+def encode_chunk_tokens(counts: Sequence[int]) -> str:
+    """Serialise chunk token counts for storage in scalar-only document metadata."""
+    return ",".join(str(count) for count in counts)
+
+
+def decode_chunk_tokens(value: object) -> Optional[List[int]]:
+    """Inverse of :func:`encode_chunk_tokens`; None for missing or malformed values."""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return [int(count) for count in value.split(",")]
+    except ValueError:
+        return None
+
+
+def leading_chunks(
+    content: str,
+    budget: int,
+    count_tokens: Callable[[str], int],
+    chunk_tokens: Optional[Sequence[int]] = None,
+) -> Optional[Tuple[str, int]]:
+    """
+    Take as many leading chunks of ``content`` as fit in ``budget`` tokens.
+
+    When not even the first chunk fits (e.g. a single long paragraph), its
+    longest prefix that fits is taken instead, see :func:`truncate_text`.
+
+    Args:
+        content: Document text.
+        budget: Tokens available.
+        count_tokens: Token counter used for each chunk.
+        chunk_tokens: Precomputed per-chunk counts; ``count_tokens`` is only
+            used when these are missing or do not match the chunking.
+
+    Returns:
+        Optional[Tuple[str, int]]: (truncated text, tokens) or None if not even
+        a prefix of the first chunk fits.
+    """
+    chunks = split_chunks(content)
+    if chunk_tokens is None or len(chunk_tokens) != len(chunks):
+        chunk_tokens = None
+
+    taken: List[str] = []
+    used = 0
+    for index, chunk in enumerate(chunks):
+        tokens = chunk_tokens[index] if chunk_tokens is not None else count_tokens(chunk)
+        if used + tokens > budget:
+            break
+        taken.append(chunk)
+        used += tokens
+    if not taken:
+        return truncate_text(chunks[0], budget, count_tokens)
+    return "\n\n".join(taken), used
+
+
+def truncate_text(
+    text: str,
+    budget: int,
+    count_tokens: Callable[[str], int],
+) -> Optional[Tuple[str, int]]:
+    """
+    Longest prefix of ``text`` within ``budget`` tokens, cut at a word boundary when possible.
+
+    Binary-searches the prefix length, so ``count_tokens`` runs O(log len(text)) times.
+
+    Returns:
+        Optional[Tuple[str, int]]: (prefix, tokens) or None if no non-empty prefix fits.
+    """
+    if budget <= 0:
+        return None
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = text[:low].rstrip()
+    if not prefix:
+        return None
+
+    # Drop a partial trailing word unless the prefix is a single word
+    if low < len(text) and not (text[low].isspace() or text[low - 1].isspace()):
+        boundary = prefix.rsplit(None, 1)[0] if len(prefix.split(None, 1)) > 1 else prefix
+        tokens = count_tokens(boundary)
+        if tokens <= budget:
+            return boundary, tokens
+    return prefix, count_tokens(prefix)
+
+
+def pack_documents(
+    candidates: Sequence[PackingCandidate],
+    budget: int,
+    count_tokens: Callable[[str], int],
+    allow_chunking: bool = True,
+) -> List[PackedItem]:
+    """
+    Pack candidates into ``budget`` tokens, maximising total relevance.
+
+    Whole documents are chosen with :func:`knapsack_select`; the remaining
+    budget is then filled with the leading chunks of unselected documents in
+    relevance-per-token order.
+
+    Args:
+        candidates: Documents to choose from.
+        budget: Token budget.
+        count_tokens: Token counter used for chunk-level truncation.
+        allow_chunking: Fill leftover budget with partial documents.
+
+    Returns:
+        List[PackedItem]: Selected items, most relevant first.
+    """
+    selected = knapsack_select(candidates, budget)
+    packed = [
+        PackedItem(candidate=candidates[i], content=candidates[i].content, tokens=candidates[i].tokens)
+        for i in selected
+    ]
+    remaining = budget - sum(item.tokens for item in packed)
+
+    if allow_chunking and remaining > 0:
+        chosen = set(selected)
+        leftovers = sorted(
+            (c for i, c in enumerate(candidates) if i not in chosen and c.relevance > 0),
+            key=lambda c: c.relevance / max(c.tokens, 1),
+            reverse=True,
+        )
+        for candidate in leftovers:
+            if remaining <= 0:
+                break
+            partial = leading_chunks(candidate.content, remaining, count_tokens, candidate.chunk_tokens)
+            if partial is None:
+                continue
+            content, tokens = partial
+            packed.append(PackedItem(candidate=candidate, content=content, tokens=tokens, truncated=True))
+            remaining -= tokens
+
+    packed.sort(key=lambda item: item.candidate.relevance, reverse=True)
+    return packed
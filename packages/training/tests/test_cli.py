@@ -11,6 +11,7 @@ from typer.testing import CliRunner
 
 from packages.training.src.training import cli as training_cli
 from packages.training.src.training.data.progress_repository import ProgressRepository
+from packages.training.src.training.data.token_budget_ledger import BudgetLimits
 from packages.training.src.training.services.token_tracker import TokenTracker
 
 
@@ -57,6 +58,15 @@ def test_init_and_progress(cli_env):
     assert "Level" in result.stdout
 
 
+def test_leaderboard_lists_initialized_agents(cli_env):
+    runner = cli_env["runner"]
+    assert runner.invoke(training_cli.app, ["init", "ClaudeCode", "--force"]).exit_code == 0
+
+    result = runner.invoke(training_cli.app, ["leaderboard", "--top", "5"])
+    assert result.exit_code == 0, result.output
+    assert "ClaudeCode" in result.stdout
+
+
 def test_start_session_records_tokens(cli_env):
     runner = cli_env["runner"]
     runner.invoke(training_cli.app, ["init", "ClaudeCode", "--force"])
@@ -80,3 +90,12 @@ def test_simulation_generates_token_summary(cli_env):
 
     stats = cli_env["tracker"].get_agent_stats("ClaudeCode")
     assert stats.total_operations > 0
+
+
+def test_budget_check_reports_the_preflight_decision(cli_env, monkeypatch):
+    monkeypatch.setattr(cli_env["tracker"], "budget_limits", BudgetLimits(day_tokens=100))
+
+    result = cli_env["runner"].invoke(training_cli.app, ["budget-check", "ClaudeCode", "--tokens", "250"])
+    assert result.exit_code == 0, result.output
+    assert "TRIM" in result.stdout
+    assert "day: 100 tokens left" in result.stdout
@@ -0,0 +1,349 @@
+"""
+Tests for MemoryService recall, decay and aggregation behaviour.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from training.data.repositories import RepositoryRegistry
+from training.data.token_budget_ledger import decide
+from training.services.memory_service import MemoryService
+from training.utils.token_packing import PackingCandidate, knapsack_select, leading_chunks, pack_documents
+
+
+def _count_words(text: str) -> int:
+    return len(text.split())
+
+
+class CountingCollection:
+    """Proxy that counts ``count`` calls on a real Chroma collection."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.count_calls = 0
+
+    def count(self):
+        self.count_calls += 1
+        return self._collection.count()
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+def test_knapsack_prefers_total_relevance_over_greedy_order():
+    candidates = [
+        PackingCandidate("big", "x", tokens=90, relevance=0.9),
+        PackingCandidate("a", "x", tokens=50, relevance=0.8),
+        PackingCandidate("b", "x", tokens=50, relevance=0.8),
+    ]
+
+    # Greedy-by-relevance would take "big" alone (0.9); a + b is worth 1.6.
+    assert knapsack_select(candidates, capacity=100) == [1, 2]
+
+
+def test_knapsack_never_exceeds_capacity():
+    candidates = [PackingCandidate(str(i), "x", tokens=37 + i, relevance=0.5) for i in range(40)]
+
+    selected = knapsack_select(candidates, capacity=1000)
+
+    assert sum(candidates[i].tokens for i in selected) <= 1000
+
+
+def test_pack_documents_fills_leftover_budget_with_chunks():
+    long_doc = "\n\n".join(["one two three four"] * 5)
+    candidates = [
+        PackingCandidate("short", "alpha beta", tokens=2, relevance=0.9),
+        PackingCandidate("long", long_doc, tokens=20, relevance=0.8),
+    ]
+
+    packed = pack_documents(candidates, budget=10, count_tokens=_count_words)
+
+    assert [item.candidate.key for item in packed] == ["short", "long"]
+    assert packed[1].truncated
+    assert packed[1].tokens == 8
+    assert sum(item.tokens for item in packed) <= 10
+
+
+def test_leading_chunks_truncates_an_oversized_first_chunk():
+    paragraph = " ".join(f"word{i}" for i in range(40))
+
+    content, tokens = leading_chunks(paragraph, 5, _count_words)
+
+    assert content == "word0 word1 word2 word3 word4"
+    assert tokens == 5
+    assert leading_chunks(paragraph, 0, _count_words) is None
+
+
+def test_recall_with_token_budget_truncates_single_paragraph_documents(memory_service):
+    memory_service.count_tokens = _count_words
+    memory_service.add_pinned_material("rules", "rules.md", "rule " * 40, agent_id="A")
+    memory_service.add_training_material("python", "a.md", "python generators " * 30, agent_id="A")
+
+    with_pinned = memory_service.recall_with_token_budget(
+        "python generators", max_tokens=20, agent_id="A", relevance_threshold=0.0
+    )
+    without_pinned = memory_service.recall_with_token_budget(
+        "python generators", max_tokens=20, agent_id="A", relevance_threshold=0.0, include_pinned=False
+    )
+
+    assert [(m["pinned"], m["truncated"], m["tokens"]) for m in with_pinned["materials"]] == [(True, True, 20)]
+    assert [(m["pinned"], m["truncated"], m["tokens"]) for m in without_pinned["materials"]] == [(False, True, 20)]
+
+
+def test_recall_with_token_budget_reserves_pinned_materials(memory_service):
+    memory_service.count_tokens = _count_words
+    memory_service.add_pinned_material("rules", "rules.md", "always write tests first", agent_id="A")
+    memory_service.add_training_material("python", "a.md", "python lists and dicts", agent_id="A")
+    memory_service.add_training_material("python", "b.md", "python generators " * 50, agent_id="A")
+
+    result = memory_service.recall_with_token_budget(
+        "python lists", max_tokens=12, agent_id="A", relevance_threshold=0.0
+    )
+
+    assert result["materials"][0]["pinned"]
+    assert result["pinned_count"] == 1
+    assert result["total_tokens"] <= 12
+    assert any(m["content"] == "python lists and dicts" for m in result["materials"])
+
+
+def test_recall_with_token_budget_applies_preflight_decision(memory_service):
+    memory_service.count_tokens = _count_words
+    for i in range(6):
+        memory_service.add_training_material("dsa", f"{i}.md", f"graph traversal note {i}")
+
+    trimmed = memory_service.recall_with_token_budget(
+        "graph traversal", max_tokens=1000, relevance_threshold=0.0,
+        preflight=lambda tokens: decide(tokens, {"session": 8}),
+    )
+    assert trimmed["budget_action"] == "trim"
+    assert 0 < trimmed["total_tokens"] <= 8
+
+    denied = memory_service.recall_with_token_budget(
+        "graph traversal", max_tokens=1000, relevance_threshold=0.0,
+        preflight=lambda tokens: decide(tokens, {"day": 0}),
+    )
+    assert denied["budget_action"] == "deny"
+    assert denied["materials"] == []
+
+
+def test_recall_with_token_budget_widens_candidate_pool(memory_service):
+    memory_service.count_tokens = _count_words
+    for i in range(12):
+        memory_service.add_training_material("dsa", f"{i}.md", f"sorting algorithms note {i}")
+
+    result = memory_service.recall_with_token_budget(
+        "sorting algorithms", max_tokens=1000, relevance_threshold=0.0, initial_candidates=2
+    )
+
+    assert result["materials_count"] == 12
+    assert result["candidates_considered"] == 12
+
+
+def test_relevance_decay_pages_through_and_archives_old_materials(memory_service, registry):
+    for i in range(7):
+        memory_service.add_training_material("dsa", f"{i}.md", f"graph search note {i}")
+    memory_service.add_pinned_material("rules", "rules.md", "always write tests first")
+
+    later = datetime.now(timezone.utc) + timedelta(days=180)
+    changed = memory_service.apply_relevance_decay(None, days_threshold=90, page_size=3, now=later)
+
+    assert changed == 7
+    weights = [
+        metadata["recency_weight"]
+        for metadata in registry.training_materials.collection.get(include=["metadatas"])["metadatas"]
+    ]
+    assert sorted(weights) == [pytest.approx(0.25)] * 7 + [1.0]
+    # A second pass at the same time has nothing left to rewrite
+    assert memory_service.apply_relevance_decay(None, days_threshold=90, page_size=3, now=later) == 0
+
+    much_later = later + timedelta(days=200)
+    archived = memory_service.apply_relevance_decay(
+        None, days_threshold=90, archive_after_days=365, page_size=3, now=much_later
+    )
+
+    assert archived == 7
+    assert registry.stats()["training"] == 1
+    assert registry.stats()["training_archive"] == 7
+
+
+def test_recall_down_weights_decayed_materials(memory_service, registry):
+    memory_service.count_tokens = _count_words
+    memory_service.add_training_material("dsa", "old.md", "heap sort notes")
+    repo = registry.training_materials
+    old_id = repo.collection.get()["ids"][0]
+    repo.collection.update(ids=[old_id], metadatas=[{"recency_weight": 0.1}])
+    memory_service.add_training_material("dsa", "new.md", "heap sort notes again")
+
+    result = memory_service.recall_with_token_budget("heap sort notes", max_tokens=100, relevance_threshold=0.5)
+
+    assert [m["metadata"]["file_name"] for m in result["materials"]] == ["new.md"]
+
+
+def test_token_counts_are_stored_at_ingest_and_totals_are_exact(memory_service):
+    memory_service.count_tokens = _count_words
+    memory_service.add_training_material("dsa", "a.md", "one two three")
+    memory_service.add_training_material("dsa", "b.md", "four five")
+    memory_service.add_training_material("dsa", "c.md", "six")
+
+    stats = memory_service.get_context_statistics()
+    assert stats["total_tokens"] == 6
+    assert stats["uncounted_materials"] == 0
+
+    material_id = memory_service.registry.training_materials.collection.get(where={"file_name": "c.md"})["ids"][0]
+    memory_service.registry.training_materials._delete_ids([material_id])
+    stats = memory_service.get_context_statistics()
+    assert stats["total_tokens"] == 5
+    assert stats["avg_tokens_per_material"] == 2.5
+
+
+def test_recall_does_not_tokenize_stored_materials(memory_service):
+    memory_service.count_tokens = _count_words
+    memory_service.add_training_material("dsa", "a.md", "tries basics\n\nsuffix arrays in depth")
+    memory_service.add_training_material("dsa", "b.md", "tries\n\nsuffix trees\n\nsuffix automata")
+
+    def fail(_text):
+        raise AssertionError("recall must use stored token counts")
+
+    memory_service.count_tokens = fail
+    result = memory_service.recall_with_token_budget("tries suffix", max_tokens=7, relevance_threshold=0.0)
+
+    assert result["total_tokens"] == 7
+    assert any(m["truncated"] for m in result["materials"])
+
+
+def test_backfill_counts_legacy_materials(memory_service, registry):
+    memory_service.count_tokens = _count_words
+    registry.training_materials.add_material("dsa", "legacy notes here", agent_id="A")
+    assert memory_service.get_context_statistics()["uncounted_materials"] == 1
+
+    assert memory_service.backfill_token_counts() == 1
+    stats = memory_service.get_context_statistics()
+    assert stats["uncounted_materials"] == 0
+    assert stats["total_tokens"] == 3
+
+
+def test_reingesting_the_same_material_is_skipped_before_tokenizing(memory_service, registry):
+    memory_service.count_tokens = _count_words
+    assert memory_service.add_training_material("dsa", "a.md", "binary search trees") is not None
+
+    memory_service.count_tokens = lambda _text: pytest.fail("duplicates must not be tokenized")
+    assert memory_service.add_training_material("dsa", "a.md", "binary search trees") is None
+    assert memory_service.add_training_materials([
+        {"topic": "dsa", "file_name": "a.md", "content": "binary search trees"},
+    ]) == 0
+
+    assert registry.training_materials.count() == 1
+    assert registry.training_materials.duplicates_skipped == 2
+
+
+def test_sharded_ingest_counts_skipped_duplicates(chroma_db):
+    registry = RepositoryRegistry(chroma_db, shard_by_agent=True)
+    service = MemoryService(registry=registry)
+
+    assert service.add_training_material("dsa", "a.md", "binary search trees", agent_id="A") is not None
+    assert service.add_training_material("dsa", "a.md", "binary search trees", agent_id="A") is None
+    assert service.add_training_materials([
+        {"topic": "dsa", "file_name": "a.md", "content": "binary search trees", "agent_id": "A"},
+        {"topic": "dsa", "file_name": "a.md", "content": "binary search trees", "agent_id": "B"},
+    ]) == 1
+
+    assert registry.training_materials.count() == 2
+    assert registry.training_materials.duplicates_skipped == 2
+
+
+def test_ingest_looks_up_each_material_once(memory_service, registry):
+    index = registry.content_index
+    lookups = []
+    find_exact = index.find_exact
+    index.find_exact = lambda *args: lookups.append(args) or find_exact(*args)
+    collection = registry.training_materials.collection = CountingCollection(
+        registry.training_materials.collection
+    )
+
+    memory_service.add_training_material("dsa", "a.md", "binary search trees")
+    memory_service.add_training_materials([
+        {"topic": "dsa", "file_name": "b.md", "content": "red black trees"},
+        {"topic": "dsa", "file_name": "b.md", "content": "red black trees"},
+        {"topic": "dsa", "file_name": "c.md", "content": "tries"},
+    ])
+
+    assert len(lookups) == 3  # the in-batch repeat is caught without a lookup
+    assert collection.count_calls == 1  # index checked once, not on every write
+    assert registry.training_materials.count() == 3
+    assert registry.training_materials.duplicates_skipped == 1
+
+
+def test_summarize_agent_performance_streams_stats_and_groups(memory_service):
+    for i, topic in enumerate(["dsa", "dsa", "dsa", "sql", "sql"]):
+        memory_service.add_score(topic, float(10 * (i + 1)), 60.0, agent_id="A", metrics={"session_type": "drill"})
+
+    result = memory_service.summarize_agent_performance("A", limit=10, group_by=["topic"], page_size=2)
+
+    summary = result["summary"]
+    assert summary["sample_size"] == 5
+    assert summary["average_score"] == pytest.approx(30.0)
+    assert summary["metrics"]["score"]["variance"] == pytest.approx(250.0)
+    assert summary["metrics"]["score"]["p50"] == pytest.approx(30.0)
+    assert [entry["score"] for entry in result["entries"]] == [50.0, 40.0, 30.0, 20.0, 10.0]
+    groups = {group["topic"]: group for group in result["groups"]}
+    assert groups["dsa"]["sample_size"] == 3
+    assert groups["sql"]["metrics"]["score"]["mean"] == pytest.approx(45.0)
+
+
+def test_full_history_rollup_only_reads_new_scores(memory_service, registry):
+    for i in range(4):
+        memory_service.add_score("dsa", float(i), 1.0, agent_id="A")
+
+    streamed = []
+    iter_scores = registry.scores.iter_scores
+
+    def counting_iter_scores(*args, **kwargs):
+        for page in iter_scores(*args, **kwargs):
+            streamed.extend(page)
+            yield page
+
+    registry.scores.iter_scores = counting_iter_scores
+
+    assert memory_service.summarize_agent_performance("A", limit=None)["summary"]["sample_size"] == 4
+    assert len(streamed) == 4
+
+    streamed.clear()
+    assert memory_service.summarize_agent_performance("A", limit=None)["summary"]["sample_size"] == 4
+    assert streamed == []
+
+    memory_service.add_score("dsa", 10.0, 1.0, agent_id="A")
+    summary = memory_service.summarize_agent_performance("A", limit=None)["summary"]
+    assert summary["sample_size"] == 5
+    assert summary["average_score"] == pytest.approx(16.0 / 5)
+    # The new score plus the previously newest one (the inclusive start boundary)
+    assert len(streamed) == 2
+
+
+def test_full_history_rollup_is_saved_and_kept_current_by_add_score(chroma_db):
+    writer = MemoryService(registry=RepositoryRegistry(chroma_db))
+    for i in range(4):
+        writer.add_score("dsa", float(i), 1.0, agent_id="A", metrics={"session_type": "drill"})
+    assert writer.summarize_agent_performance("A", limit=None, group_by=["topic"])["summary"]["sample_size"] == 4
+
+    writer.add_score("dsa", 10.0, 1.0, agent_id="A", metrics={"session_type": "drill"})
+
+    # A new process starts from the saved rollup, which add_score already brought up to date
+    registry = RepositoryRegistry(chroma_db)
+    streamed = []
+    iter_scores = registry.scores.iter_scores
+
+    def counting_iter_scores(*args, **kwargs):
+        for page in iter_scores(*args, **kwargs):
+            streamed.extend(page)
+            yield page
+
+    registry.scores.iter_scores = counting_iter_scores
+    result = MemoryService(registry=registry).summarize_agent_performance("A", limit=None, group_by=["topic"])
+
+    assert streamed == []
+    assert result["summary"]["sample_size"] == 5
+    assert result["summary"]["average_score"] == pytest.approx(16.0 / 5)
+    assert result["groups"][0]["metrics"]["score"]["max"] == pytest.approx(10.0)
@@ -0,0 +1,297 @@
+"""
+Tests for ProgressRepository persistence modes.
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from training.data.progress_repository import ProgressRepository
+from training.models.progress import AgentProgress
+
+
+def _stored_xp(repo: ProgressRepository, agent_id: str) -> int:
+    data = json.loads((repo.current_dir / f"{agent_id}.json").read_text(encoding="utf-8"))
+    return data["xp"]["total"]
+
+
+def test_write_behind_coalesces_saves_until_flush(tmp_path):
+    repo = ProgressRepository(tmp_path, write_behind=True, flush_interval=60)
+    progress = AgentProgress(agent_id="A")
+    for xp in range(1, 6):
+        progress.xp.total = xp
+        assert repo.save(progress)
+
+    # Nothing on disk yet, but reads see the latest state
+    assert not (repo.current_dir / "A.json").exists()
+    assert repo.load("A").xp.total == 5
+    assert repo.list_all() == ["A"]
+
+    assert repo.flush() == 1
+    assert _stored_xp(repo, "A") == 5
+    stats = repo.get_stats()
+    assert stats["coalesced_writes"] == 4
+    assert stats["flushed_writes"] == 1
+    assert stats["pending_writes"] == 0
+    repo.close()
+
+
+def test_write_behind_flushes_on_interval_and_close(tmp_path):
+    repo = ProgressRepository(tmp_path, write_behind=True, flush_interval=0.05)
+    repo.save(AgentProgress(agent_id="A"))
+    deadline = time.monotonic() + 5
+    while not (repo.current_dir / "A.json").exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (repo.current_dir / "A.json").exists()
+
+    progress = AgentProgress(agent_id="B")
+    progress.xp.total = 7
+    repo.save(progress)
+    repo.close()
+    assert _stored_xp(repo, "B") == 7
+    # After close saves are written through
+    progress.xp.total = 8
+    repo.save(progress)
+    assert _stored_xp(repo, "B") == 8
+
+
+def test_pending_saves_stay_visible_while_flushing(tmp_path, monkeypatch):
+    repo = ProgressRepository(tmp_path, write_behind=True, flush_interval=60)
+    progress = AgentProgress(agent_id="A")
+    progress.xp.total = 5
+    repo.save(progress)
+
+    writing, release = threading.Event(), threading.Event()
+    write = repo._write
+
+    def slow_write(progress, create_snapshot=False):
+        writing.set()
+        release.wait(5)
+        return write(progress, create_snapshot)
+
+    monkeypatch.setattr(repo, "_write", slow_write)
+    flusher = threading.Thread(target=repo.flush)
+    flusher.start()
+    assert writing.wait(5)
+
+    # Mid-flush the queued state is still readable, and a delete is not undone
+    assert repo.load("A").xp.total == 5
+    deleter = threading.Thread(target=repo.delete, args=("A",))
+    deleter.start()
+    release.set()
+    flusher.join(5)
+    deleter.join(5)
+
+    assert repo.load("A") is None
+    assert not repo.exists("A")
+    assert repo.get_stats()["pending_writes"] == 0
+    repo.close()
+
+
+def test_snapshot_saves_are_written_immediately(tmp_path):
+    repo = ProgressRepository(tmp_path, write_behind=True, flush_interval=60)
+    repo.save(AgentProgress(agent_id="A"), create_snapshot=True)
+
+    assert (repo.current_dir / "A.json").exists()
+    assert len(repo.get_history("A")) == 1
+    repo.close()
+
+
+def test_journal_mode_appends_deltas_and_checkpoints(tmp_path):
+    repo = ProgressRepository(tmp_path, storage="journal", checkpoint_every=4)
+    progress = AgentProgress(agent_id="A")
+    for xp in range(1, 7):
+        progress.xp.total = xp
+        assert repo.save(progress)
+
+    journal = repo.journal
+    assert not (repo.current_dir / "A.json").exists()
+    assert list(repo.backups_dir.iterdir()) == []
+    assert journal.checkpoint_path("A").exists()
+    # Six saves: checkpoint after the fourth, two small deltas since
+    lines = journal.log_path("A").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[-1])["delta"]["set"] == [[["xp", "total"], 6]]
+
+    reopened = ProgressRepository(tmp_path, storage="journal", checkpoint_every=4)
+    assert reopened.load("A").xp.total == 6
+    assert reopened.list_all() == ["A"]
+
+
+def test_journal_recovery_ignores_torn_tail(tmp_path):
+    repo = ProgressRepository(tmp_path, storage="journal")
+    progress = AgentProgress(agent_id="A")
+    progress.xp.total = 3
+    repo.save(progress)
+    with open(repo.journal.log_path("A"), "a", encoding="utf-8") as handle:
+        handle.write('{"seq":2,"delta":{"set":[[["xp","tot')
+
+    reopened = ProgressRepository(tmp_path, storage="journal")
+    assert reopened.load("A").xp.total == 3
+    progress.xp.total = 4
+    reopened.save(progress)
+    assert ProgressRepository(tmp_path, storage="journal").load("A").xp.total == 4
+
+
+def test_journal_mode_reads_agents_saved_as_files(tmp_path):
+    legacy = ProgressRepository(tmp_path)
+    progress = AgentProgress(agent_id="A")
+    progress.xp.total = 9
+    legacy.save(progress)
+
+    repo = ProgressRepository(tmp_path, storage="journal")
+    assert repo.load("A").xp.total == 9
+    progress.xp.total = 10
+    repo.save(progress)
+    assert repo.load("A").xp.total == 10
+    assert repo.delete("A")
+    assert not repo.exists("A")
+
+
+def _add_xp(progress):
+    progress = progress or AgentProgress(agent_id="A")
+    progress.xp.total += 1
+    return progress
+
+
+def _increment_xp(data_dir, storage, times):
+    repo = ProgressRepository(data_dir, storage=storage, checkpoint_every=7)
+    for _ in range(times):
+        repo.update("A", _add_xp)
+
+
+@pytest.mark.parametrize("storage", ["files", "journal"])
+def test_concurrent_processes_lose_no_updates(tmp_path, storage):
+    workers, increments = 4, 15
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_increment_xp, args=(tmp_path, storage, increments))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    # Readers take no lock and only ever see complete, non-decreasing states
+    reader = ProgressRepository(tmp_path, storage=storage)
+    seen = 0
+    while any(process.is_alive() for process in processes):
+        progress = reader.load("A")
+        if progress is not None:
+            assert progress.xp.total >= seen
+            seen = progress.xp.total
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    assert reader.load("A").xp.total == workers * increments
+    # Lock files persist so every process locks the same inode
+    assert (reader.locks_dir / "A.lock").exists()
+
+
+def test_leaderboard_reads_the_index(tmp_path):
+    repo = ProgressRepository(tmp_path)
+    for agent_id, xp, level in (("A", 300, 2), ("B", 900, 3), ("C", 600, 2)):
+        progress = AgentProgress(agent_id=agent_id, current_level=level)
+        progress.xp.total = xp
+        repo.save(progress)
+
+    assert [entry.agent_id for entry in repo.leaderboard(2)] == ["B", "C"]
+    assert repo.leaderboard(None, order_by="level")[0].agent_id == "B"
+    stats = repo.get_stats()
+    assert stats["total_agents"] == 3
+    assert stats["total_xp"] == 1800
+
+    repo.delete("B")
+    assert [entry.agent_id for entry in repo.leaderboard()] == ["C", "A"]
+
+
+def test_leaderboard_index_is_rebuilt_for_existing_progress(tmp_path):
+    repo = ProgressRepository(tmp_path)
+    repo.save(AgentProgress(agent_id="A"))
+    repo.leaderboard_index.clear()
+
+    assert [entry.agent_id for entry in ProgressRepository(tmp_path).leaderboard()] == ["A"]
+
+
+def test_partial_leaderboard_from_before_the_upgrade_is_rebuilt_once(tmp_path):
+    repo = ProgressRepository(tmp_path)
+    for agent_id, xp in (("A", 500), ("B", 100)):
+        progress = AgentProgress(agent_id=agent_id)
+        progress.xp.total = xp
+        repo.save(progress)
+    repo.leaderboard_index.close()
+    # An index from before the marker: only agents saved since the upgrade are in it
+    with sqlite3.connect(str(tmp_path / "leaderboard.sqlite3")) as conn:
+        conn.execute("DROP TABLE meta")
+        conn.execute("DELETE FROM leaderboard WHERE agent_id = 'A'")
+    conn.close()
+
+    upgraded = ProgressRepository(tmp_path)
+    assert [entry.agent_id for entry in upgraded.leaderboard()] == ["A", "B"]
+    assert upgraded.leaderboard_index.is_built()
+
+    # Once built, later readers trust the index instead of rescanning
+    upgraded.leaderboard_index.remove("B")
+    assert [entry.agent_id for entry in ProgressRepository(tmp_path).leaderboard()] == ["A"]
+
+
+def test_history_is_ordered_by_name_not_mtime(tmp_path):
+    repo = ProgressRepository(tmp_path, snapshots_to_keep=3)
+    progress = AgentProgress(agent_id="A")
+    for xp in range(1, 6):
+        progress.xp.total = xp
+        repo.save(progress, create_snapshot=True)
+
+    history = repo.get_history("A")
+    assert [entry["data"]["xp"]["total"] for entry in history] == [5, 4, 3]
+    assert repo.get_stats()["total_history_snapshots"] == 3
+    assert len(list((repo.history_dir / "A").glob("*.json"))) == 3
+
+    # Touching an old snapshot (as a copy would) does not reorder history
+    oldest = history[-1]
+    newer_mtime = time.time() + 60
+    os.utime(oldest["file_path"], (newer_mtime, newer_mtime))
+    assert repo.get_history("A", limit=1)[0]["data"]["xp"]["total"] == 5
+
+    restored = repo.restore_from_snapshot("A", oldest["timestamp"])
+    assert restored.xp.total == 3
+    assert repo.load("A").xp.total == 3
+    assert repo.restore_from_snapshot("A", "19700101_000000_000000") is None
+
+
+def test_delta_snapshots_reconstruct_history(tmp_path):
+    repo = ProgressRepository(tmp_path, snapshot_deltas=True, snapshots_to_keep=4)
+    progress = AgentProgress(agent_id="A")
+    for xp in range(1, 7):
+        progress.xp.total = xp
+        repo.save(progress, create_snapshot=True)
+
+    agent_dir = repo.history_dir / "A"
+    assert len(list(agent_dir.glob("*.delta.json"))) == 3
+    assert len([path for path in agent_dir.glob("*.json") if not path.name.endswith(".delta.json")]) == 1
+
+    history = repo.get_history("A")
+    assert [entry["data"]["xp"]["total"] for entry in history] == [6, 5, 4, 3]
+    assert repo.restore_from_snapshot("A", history[-1]["timestamp"]).xp.total == 3
+
+
+def test_legacy_snapshots_are_adopted_in_name_order(tmp_path):
+    repo = ProgressRepository(tmp_path)
+    agent_dir = repo.history_dir / "A"
+    agent_dir.mkdir()
+    for name, xp in (("20260101_120000", 2), ("20260101_090000", 1)):
+        progress = AgentProgress(agent_id="A")
+        progress.xp.total = xp
+        (agent_dir / f"{name}.json").write_text(progress.model_dump_json(), encoding="utf-8")
+
+    assert [entry["timestamp"] for entry in repo.get_history("A")] == ["20260101_120000", "20260101_090000"]
+    progress.xp.total = 3
+    repo.save(progress, create_snapshot=True)
+    assert [entry["data"]["xp"]["total"] for entry in repo.get_history("A")] == [3, 2, 1]
@@ -0,0 +1,217 @@
+"""
+Tests for TokenTracker persistence and aggregation.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime
+
+import pytest
+
+from training.data.token_budget_ledger import BudgetLimits
+from training.data.token_log import TokenLogWriter, load_columns
+from training.data.token_rollups import TokenRollupStore
+from training.models.token_metrics import TokenMetrics
+from training.services.token_tracker import TokenTracker
+
+
+def _record(tracker: TokenTracker, session_id: str, operation_id: str, **fields) -> TokenMetrics:
+    return tracker.record_operation(
+        session_id=session_id,
+        agent_id="A",
+        operation_id=operation_id,
+        prompt_tokens=fields.pop("prompt_tokens", 100),
+        completion_tokens=fields.pop("completion_tokens", 50),
+        output_quality_score=fields.pop("output_quality_score", 80.0),
+        **fields,
+    )
+
+
+def test_operations_are_appended_to_daily_segments(tmp_path):
+    tracker = TokenTracker(tmp_path, flush_every=3, flush_interval=60)
+    for index in range(4):
+        _record(tracker, "s1", f"op{index}")
+
+    day = datetime.utcnow().date().isoformat()
+    segment = tmp_path / "operations" / "A" / f"{day}.jsonl"
+    # Three records were flushed by count, one is still buffered
+    assert len(segment.read_text(encoding="utf-8").splitlines()) == 3
+
+    # Stats flush the buffered record first
+    stats = tracker.get_agent_stats("A")
+    assert stats.total_operations == 4
+    assert stats.lifetime_tokens == 600
+    assert stats.recent_sessions == ["s1"]
+    assert stats.token_trend == [600]
+    assert tracker.flush() == 0
+    lines = segment.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 4
+    assert json.loads(lines[0])["operation_id"] == "op0"
+    assert ": " not in lines[0]
+
+
+def test_loader_skips_torn_lines_and_old_days(tmp_path):
+    writer = TokenLogWriter(tmp_path)
+    for day in ("2026-01-01", "2026-01-02"):
+        writer.append("A", day, {"operation_id": day, "total_tokens": 5})
+    writer.flush()
+    with open(tmp_path / "A" / "2026-01-02.jsonl", "a", encoding="utf-8") as handle:
+        handle.write('{"operation_id": "torn", "tot')
+
+    columns = load_columns(tmp_path / "A")
+    assert columns["operation_id"] == ["2026-01-01", "2026-01-02"]
+    assert load_columns(tmp_path / "A", since=datetime(2026, 1, 2).date())["day"] == ["2026-01-02"]
+
+
+def test_legacy_operation_files_are_read_and_converted(tmp_path):
+    day = datetime.utcnow().date().isoformat()
+    legacy_dir = tmp_path / "operations" / "A" / day
+    legacy_dir.mkdir(parents=True)
+    metrics = TokenMetrics(session_id="old", agent_id="A", operation_id="legacy", prompt_tokens=10)
+    (legacy_dir / "legacy.json").write_text(json.dumps(metrics.model_dump(), default=str, indent=2))
+
+    tracker = TokenTracker(tmp_path)
+    _record(tracker, "new", "fresh")
+    assert tracker.get_agent_stats("A").total_operations == 2
+
+    assert tracker.convert_legacy_operations() == 1
+    assert not legacy_dir.exists()
+    assert tracker.convert_legacy_operations() == 0
+    stats = tracker.get_agent_stats("A")
+    assert stats.total_operations == 2
+    assert sorted(stats.recent_sessions) == ["new", "old"]
+
+
+def test_agent_stats_come_from_rollups_that_match_a_rebuild(tmp_path):
+    tracker = TokenTracker(tmp_path)
+    _record(tracker, "s1", "op1", output_quality_score=90.0)
+    _record(tracker, "s2", "op2", prompt_tokens=400, output_quality_score=60.0)
+    _record(tracker, "s1", "op3", completion_tokens=10, context_tokens=20, cached_tokens=5)
+
+    stats = tracker.get_agent_stats("A")
+    assert stats.total_operations == 3
+    assert stats.total_sessions == 2
+    assert stats.recent_sessions == ["s1", "s2"]
+    assert stats.lifetime_tokens == 150 + 450 + 125
+    assert stats.best_efficiency_session == "s1"
+    assert stats.worst_efficiency_session == "s2"
+    assert stats.quality_trend == [pytest.approx(230 / 3)]
+
+    assert tracker.rebuild_rollups() == 1
+    assert tracker.get_agent_stats("A").model_dump() == pytest.approx(stats.model_dump())
+
+
+def test_rollups_only_hold_operations_the_log_has_written(tmp_path):
+    tracker = TokenTracker(tmp_path, flush_every=3, flush_interval=60)
+    for index in range(4):
+        _record(tracker, "s1", f"op{index}")
+
+    # As after a crash: the fourth record never left the buffer
+    rebuilt = TokenRollupStore(tmp_path / "rebuilt.sqlite3")
+    rebuilt.rebuild("A", load_columns(tmp_path / "operations" / "A"))
+    assert tracker.rollups.days("A") == rebuilt.days("A")
+    assert tracker.rollups.days("A")[0].operations == 3
+
+    assert tracker.flush() == 1
+    rebuilt.rebuild("A", load_columns(tmp_path / "operations" / "A"))
+    assert tracker.rollups.days("A") == rebuilt.days("A")
+    assert tracker.rollups.sessions("A") == ["s1"]
+
+
+def test_rollups_are_built_from_existing_operations(tmp_path):
+    tracker = TokenTracker(tmp_path)
+    _record(tracker, "s1", "op1")
+    tracker.flush()
+    tracker.rollups.close()
+    (tmp_path / "rollups.sqlite3").unlink()
+
+    assert TokenTracker(tmp_path).get_agent_stats("A").total_operations == 1
+
+
+def _saved_summary(tmp_path, session_id: str) -> dict:
+    return json.loads((tmp_path / "sessions" / f"{session_id}.json").read_text(encoding="utf-8"))
+
+
+def test_session_summaries_are_persisted_on_a_debounce(tmp_path):
+    tracker = TokenTracker(tmp_path, summary_every=3, summary_interval=60)
+    for index in range(5):
+        _record(tracker, "s1", f"op{index}")
+
+    # Written at the first and the fourth operation
+    saved = _saved_summary(tmp_path, "s1")
+    assert saved["total_operations"] == 4
+    assert saved["complete"] is False
+
+    summary = tracker.end_session("s1")
+    assert summary.total_operations == 5
+    saved = _saved_summary(tmp_path, "s1")
+    assert saved["total_operations"] == 5
+    assert saved["complete"] is True
+
+
+def test_incomplete_summary_is_recovered_from_the_operation_log(tmp_path):
+    tracker = TokenTracker(tmp_path, summary_every=100, summary_interval=60)
+    _record(tracker, "s1", "op1", output_quality_score=90.0)
+    _record(tracker, "s1", "op2", output_quality_score=70.0, operation_type="review")
+    _record(tracker, "s2", "other")
+    # Simulate a crash: the log was flushed but the last summaries never written
+    tracker.flush()
+    assert _saved_summary(tmp_path, "s1")["total_operations"] == 1
+
+    summary = TokenTracker(tmp_path).get_session_summary("s1")
+    assert summary.total_operations == 2
+    assert summary.total_prompt_tokens == 200
+    assert summary.average_quality_score == pytest.approx(80.0)
+    assert summary.operations_by_type == {"unknown": 1, "review": 1}
+
+
+def test_session_state_is_bounded_and_evicted_on_end(tmp_path):
+    tracker = TokenTracker(tmp_path, metrics_window=2, ended_sessions_kept=1)
+    for index in range(4):
+        _record(tracker, "s1", f"op{index}", context_tokens=500, context_utilization_score=20.0)
+
+    assert [m.operation_id for m in tracker.recent_operations("s1")] == ["op2", "op3"]
+    suggestions = tracker.analyze_optimization_opportunities("s1")
+    reduce_context = next(s for s in suggestions if s.issue_type == "underutilized_context")
+    # Aggregates cover every operation, not just the window
+    assert reduce_context.current_tokens == 2000
+
+    tracker.end_session("s1")
+    assert tracker.recent_operations("s1") == []
+    assert "s1" not in tracker._session_summaries
+    assert tracker.get_session_summary("s1").total_operations == 4
+    assert tracker.analyze_optimization_opportunities("s1") == suggestions
+
+    _record(tracker, "s2", "other")
+    tracker.end_session("s2")
+    assert tracker.analyze_optimization_opportunities("s1") == []
+
+
+def test_preflight_allows_trims_and_denies_against_remaining_budgets(tmp_path):
+    limits = BudgetLimits(session_tokens=1000, day_tokens=1200, operation_tokens={"review": 300})
+    tracker = TokenTracker(tmp_path, budget_limits=limits)
+    _record(tracker, "s1", "op1", prompt_tokens=550, completion_tokens=50)
+
+    assert tracker.preflight("A", 200, session_id="s1").action == "allow"
+    decision = tracker.preflight("A", 500, session_id="s1")
+    assert (decision.action, decision.allowed_tokens, decision.limiting_scope) == ("trim", 400, "session")
+    assert tracker.preflight("A", 500, operation_type="review").allowed_tokens == 300
+    assert tracker.preflight("A", 900, session_id="s2").limiting_scope == "day"
+
+    _record(tracker, "s2", "op2", prompt_tokens=550, completion_tokens=50)
+    denied = tracker.preflight("A", 10, session_id="s2")
+    assert denied.action == "deny"
+    assert denied.remaining["day"] == 0
+    assert tracker.preflight("B", 10).action == "allow"
+
+
+def test_budget_counters_pick_up_usage_from_other_trackers(tmp_path):
+    limits = BudgetLimits(day_tokens=1000)
+    tracker = TokenTracker(tmp_path, budget_limits=limits, budget_refresh_interval=0)
+    assert tracker.preflight("A", 600).action == "allow"
+
+    other = TokenTracker(tmp_path)
+    _record(other, "other", "op1", prompt_tokens=500, completion_tokens=0)
+    other.flush()
+    assert tracker.preflight("A", 600).allowed_tokens == 500
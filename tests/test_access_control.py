@@ -0,0 +1,454 @@
+"""
+Module: test_access_control.py
+Purpose: Tests for access control enforcement, rate limiting, auditing,
+policy reloads and decision caching.
+
+Agent: Antigravity
+Created: 2026-10-18T09:00:00Z
+Operation: [CREATE]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from eudorax.core.access_control import (
+    AccessControlManager,
+    AgentPermissions,
+    PermissionLevel,
+    ResourceType,
+)
+from eudorax.core.audit_log import AuditLog
+from eudorax.core.decision_cache import DecisionCache
+from eudorax.core.rate_limiter import (
+    FileRateLimitStore,
+    RateLimiter,
+    RateLimitRule,
+)
+
+
+class FakeClock:
+    """Deterministic clock for rate-limit tests."""
+
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def make_manager(tmp_path, per_minute=60, burst=None, **kwargs):
+    manager = AccessControlManager(config_path=str(tmp_path / "access_control.json"), **kwargs)
+    manager.update_agent_permissions(AgentPermissions(
+        agent_name="Worker",
+        permission_level=PermissionLevel.EXECUTE,
+        allowed_resources={ResourceType.FILESYSTEM, ResourceType.TERMINAL},
+        allowed_commands=["*"],
+        rate_limit_per_minute=per_minute,
+        burst_limit=burst,
+    ))
+    return manager
+
+
+def test_token_bucket_limits_burst_and_reports_wait():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+    rule = RateLimitRule.from_limits(per_minute=60, burst=3)
+
+    decisions = [limiter.acquire("Worker", "execute", rule) for _ in range(4)]
+
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert decisions[-1].retry_after > 0
+
+    clock.advance(decisions[-1].retry_after)
+    assert limiter.acquire("Worker", "execute", rule).allowed
+
+
+def test_sustained_window_caps_requests_per_minute():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+    rule = RateLimitRule.from_limits(per_minute=10, burst=10)
+
+    allowed = 0
+    for _ in range(60):
+        if limiter.acquire("Worker", "read", rule).allowed:
+            allowed += 1
+        clock.advance(0.5)
+
+    # 30 seconds of traffic: the bucket refills at 10/min, so at most burst + 5.
+    assert allowed <= 15
+
+
+def test_waiting_retry_after_is_enough_despite_float_drift():
+    clock = FakeClock(1_000.1)
+    limiter = RateLimiter(clock=clock)
+    rule = RateLimitRule.from_limits(per_minute=7, burst=1)
+    assert limiter.acquire("Worker", "read", rule).allowed
+
+    for _ in range(50):
+        denied = limiter.acquire("Worker", "read", rule)
+        assert not denied.allowed
+        clock.advance(denied.retry_after)
+        assert limiter.acquire("Worker", "read", rule).allowed
+
+
+def test_small_burst_does_not_cut_the_sustained_rate():
+    for per_minute, burst in ((60, 1), (120, 1), (120, 2)):
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock)
+        rule = RateLimitRule.from_limits(per_minute=per_minute, burst=burst)
+
+        # A greedy caller that sleeps exactly retry_after after each denial
+        admitted, end = 0, clock.now + 600
+        while clock.now < end:
+            decision = limiter.acquire("Worker", "read", rule)
+            if decision.allowed:
+                admitted += 1
+            else:
+                clock.advance(decision.retry_after)
+
+        assert per_minute * 0.95 <= admitted / 10 <= per_minute + burst
+
+
+def test_peek_does_not_consume():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+    rule = RateLimitRule.from_limits(per_minute=60, burst=1)
+
+    assert limiter.peek("Worker", "read", rule).allowed
+    assert limiter.acquire("Worker", "read", rule).allowed
+    assert not limiter.peek("Worker", "read", rule).allowed
+
+
+def test_limits_are_per_agent_and_per_action():
+    limiter = RateLimiter(clock=FakeClock())
+    rule = RateLimitRule.from_limits(per_minute=60, burst=1)
+
+    assert limiter.acquire("Worker", "read", rule).allowed
+    assert limiter.acquire("Worker", "write", rule).allowed
+    assert limiter.acquire("Other", "read", rule).allowed
+    assert not limiter.acquire("Worker", "read", rule).allowed
+
+
+def test_limiter_is_thread_safe():
+    limiter = RateLimiter(clock=FakeClock())
+    rule = RateLimitRule.from_limits(per_minute=600, burst=50)
+    results = []
+
+    def worker():
+        for _ in range(20):
+            results.append(limiter.acquire("Worker", "execute", rule).allowed)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(results) == 50
+
+
+def test_file_store_shares_state_between_limiters(tmp_path):
+    clock = FakeClock()
+    rule = RateLimitRule.from_limits(per_minute=60, burst=2)
+    first = RateLimiter(store=FileRateLimitStore(tmp_path), clock=clock)
+    second = RateLimiter(store=FileRateLimitStore(tmp_path), clock=clock)
+
+    assert first.acquire("Worker", "execute", rule).allowed
+    assert second.acquire("Worker", "execute", rule).allowed
+    assert not first.acquire("Worker", "execute", rule).allowed
+
+
+def test_file_store_clear_keeps_the_lock_file(tmp_path):
+    clock = FakeClock()
+    rule = RateLimitRule.from_limits(per_minute=60, burst=1)
+    store = FileRateLimitStore(tmp_path)
+    limiter = RateLimiter(store=store, clock=clock)
+    assert limiter.acquire("Worker", "execute", rule).allowed
+    path = store._path_for(RateLimiter.make_key("Worker", "execute"))
+    inode = path.stat().st_ino
+
+    limiter.reset()
+
+    # Same inode, so processes holding it and new ones still lock the same file
+    assert path.stat().st_ino == inode
+    assert path.stat().st_size == 0
+    assert limiter.acquire("Worker", "execute", rule).allowed
+
+
+def test_access_manager_enforces_rate_limit(tmp_path):
+    manager = make_manager(tmp_path, per_minute=60, burst=2)
+
+    results = [manager.check_agent_access("Worker", ResourceType.TERMINAL, "execute", "ls")
+               for _ in range(3)]
+
+    assert results == [True, True, False]
+    assert manager.get_audit_log(1)[-1]["reason"].startswith("rate_limited")
+    assert manager.check_rate_limit("Worker", "execute").retry_after > 0
+
+
+def test_access_manager_rate_limit_can_be_disabled(tmp_path):
+    manager = make_manager(tmp_path, per_minute=60, burst=1)
+    manager.config.rate_limit_enabled = False
+
+    assert all(manager.check_agent_access("Worker", ResourceType.TERMINAL, "execute", "ls")
+               for _ in range(5))
+
+
+def make_entry(agent, second):
+    return {
+        "timestamp": f"2026-10-18T10:00:{second:02d}+00:00",
+        "agent": agent,
+        "decision": "GRANTED",
+    }
+
+
+def test_audit_log_memory_is_bounded_but_nothing_is_lost(tmp_path):
+    log = AuditLog(tmp_path, capacity=5, max_segment_bytes=200)
+    for second in range(30):
+        log.append(make_entry("Worker" if second % 2 else "Other", second))
+
+    assert len(log) == 5
+    assert log.recent(2) == [make_entry("Other", 28), make_entry("Worker", 29)]
+    assert len(log.query()) == 30
+    assert len(log.segments) > 1
+    log.close()
+
+
+def test_audit_log_indexed_lookup_by_agent_and_time(tmp_path):
+    log = AuditLog(tmp_path, capacity=3, max_segment_bytes=200)
+    for second in range(20):
+        log.append(make_entry("Worker" if second < 10 else "Other", second))
+
+    matches = log.query(agent="Worker", start="2026-10-18T10:00:05+00:00")
+    assert [entry["timestamp"][-8:-6] for entry in matches] == ["05", "06", "07", "08", "09"]
+    assert log.query(agent="Worker", limit=2) == [make_entry("Worker", 8), make_entry("Worker", 9)]
+    log.close()
+
+
+def test_audit_log_treats_naive_bounds_as_utc(tmp_path):
+    log = AuditLog(tmp_path, capacity=3)
+    for second in range(6):
+        log.append(make_entry("Worker", second))
+
+    matches = log.query(start="2026-10-18T10:00:02", end=datetime(2026, 10, 18, 10, 0, 3))
+    assert matches == [make_entry("Worker", 2), make_entry("Worker", 3)]
+    log.close()
+
+
+def test_audit_log_reopens_existing_segments(tmp_path):
+    log = AuditLog(tmp_path, capacity=2)
+    for second in range(4):
+        log.append(make_entry("Worker", second))
+    log.close()
+
+    reopened = AuditLog(tmp_path, capacity=2)
+    reopened.append(make_entry("Worker", 4))
+    assert len(reopened.query(agent="Worker")) == 5
+    reopened.close()
+
+
+def test_audit_logs_sharing_a_directory_keep_each_others_segments(tmp_path):
+    first = AuditLog(tmp_path, capacity=2, max_segment_bytes=200)
+    second = AuditLog(tmp_path, capacity=2, max_segment_bytes=200)
+    for second_of_minute in range(20):
+        log = first if second_of_minute % 2 else second
+        log.append(make_entry("Worker", second_of_minute))
+        log.flush()
+
+    assert len(first.query(agent="Worker")) == 20
+    assert len(second.query(agent="Worker")) == 20
+    first.close()
+    second.close()
+
+    reopened = AuditLog(tmp_path)
+    assert sum(segment.records for segment in reopened.segments) == 20
+    assert len(reopened.query(agent="Worker")) == 20
+    reopened.close()
+
+
+def test_audit_log_retries_failed_spills(tmp_path):
+    log = AuditLog(tmp_path, retry_delay=0.001)
+    write_batch, failures = log._write_batch, []
+
+    def flaky_write(records):
+        if len(failures) < 2:
+            failures.append(len(records))
+            raise OSError("disk busy")
+        write_batch(records)
+
+    log._write_batch = flaky_write
+    log.append(make_entry("Worker", 0))
+
+    assert log.query(agent="Worker") == [make_entry("Worker", 0)]
+    assert failures == [1, 1]
+    log.close()
+
+
+def test_audit_log_falls_back_when_spills_keep_failing(tmp_path):
+    log = AuditLog(tmp_path, write_retries=2, retry_delay=0.001)
+
+    def failing_write(records):
+        raise OSError("disk gone")
+
+    log._write_batch = failing_write
+    log.append(make_entry("Worker", 0))
+    log.flush()
+
+    lines = (tmp_path / "fallback.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [make_entry("Worker", 0)]
+    log.close()
+
+
+def test_audit_log_appends_racing_close_are_written(tmp_path):
+    log = AuditLog(tmp_path)
+    stop = threading.Event()
+    appended = []
+
+    def appender():
+        second = 0
+        while not stop.is_set():
+            log.append(make_entry("Worker", second % 60))
+            appended.append(second)
+            second += 1
+
+    thread = threading.Thread(target=appender)
+    thread.start()
+    time.sleep(0.05)
+    log.close()
+    stop.set()
+    thread.join()
+    log.append(make_entry("Worker", 0))
+    log.flush()
+
+    reopened = AuditLog(tmp_path)
+    assert len(reopened.query(agent="Worker")) == len(appended) + 1
+    reopened.close()
+
+
+def test_access_manager_spills_audit_log(tmp_path):
+    manager = make_manager(tmp_path, per_minute=0)
+    for _ in range(3):
+        manager.check_agent_access("Worker", ResourceType.TERMINAL, "execute", "ls")
+
+    assert len(manager.query_audit_log(agent_name="Worker")) == 3
+    assert (tmp_path / "audit_logs").exists()
+
+
+def write_policy(path, agents):
+    path.write_text(json.dumps({"version": "2.0", "agents": agents}), encoding="utf-8")
+
+
+def test_reload_swaps_in_new_policy(tmp_path):
+    manager = make_manager(tmp_path, per_minute=0)
+    version = manager.policy_version
+    config_path = tmp_path / "access_control.json"
+    write_policy(config_path, {
+        "Worker": {"permission_level": 1, "allowed_resources": ["filesystem"]},
+    })
+
+    assert manager.reload_policies()
+    assert manager.policy_version == version + 1
+    assert not manager.check_agent_access("Worker", ResourceType.TERMINAL, "execute", "ls")
+    # Critical agents keep full access across reloads
+    assert manager.get_agent_permissions("GrokIA").permission_level == PermissionLevel.FULL
+
+
+def test_reload_applies_runtime_settings(tmp_path):
+    manager = make_manager(tmp_path, per_minute=0)
+    manager.check_agent_access("Worker", ResourceType.TERMINAL, "execute", "ls")
+    (tmp_path / "access_control.json").write_text(json.dumps({
+        "agents": {"Worker": {"permission_level": 3, "allowed_resources": ["terminal"]}},
+        "decision_cache_size": 8,
+        "audit_log_dir": str(tmp_path / "moved_audit"),
+        "audit_log_capacity": 2,
+        "rate_limit_state_path": str(tmp_path / "rate_limits"),
+    }), encoding="utf-8")
+
+    assert manager.reload_policies()
+    assert manager.decision_cache.capacity == 8
+    assert manager.audit_log.directory == tmp_path / "moved_audit"
+    assert manager.audit_log.capacity == 2
+    assert isinstance(manager.rate_limiter.store, FileRateLimitStore)
+
+    manager.check_agent_access("Worker", ResourceType.TERMINAL, "execute", "ls")
+    assert len(manager.query_audit_log(agent_name="Worker")) == 1
+    assert list((tmp_path / "rate_limits").iterdir())
+
+
+def test_invalid_policy_is_rejected_and_previous_stays_active(tmp_path):
+    manager = make_manager(tmp_path, per_minute=0)
+    previous = manager.config
+    version = manager.policy_version
+    write_policy(tmp_path / "access_control.json", {
+        "Worker": {"permission_level": 99, "allowed_resources": ["filesystem"]},
+    })
+
+    assert not manager.reload_policies()
+    assert manager.config is previous
+    assert manager.policy_version == version
+    assert manager.check_agent_access("Worker", ResourceType.TERMINAL, "execute", "ls")
+
+
+def test_policy_watcher_reloads_on_file_change(tmp_path):
+    manager = make_manager(tmp_path, per_minute=0)
+    version = manager.policy_version
+    watcher = manager.start_policy_watcher(interval=0.01)
+    try:
+        write_policy(tmp_path / "access_control.json", {
+            "Worker": {"permission_level": 1, "allowed_resources": ["filesystem"]},
+        })
+        deadline = time.time() + 5
+        while manager.policy_version == version and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        manager.stop_policy_watcher()
+
+    assert manager.policy_version > version
+    assert not watcher.running
+    assert manager.get_agent_permissions("Worker").permission_level == PermissionLevel.READ
+
+
+def test_decision_cache_counts_hits_and_misses(tmp_path):
+    manager = make_manager(tmp_path, per_minute=0)
+    for _ in range(5):
+        manager.check_agent_access("Worker", ResourceType.TERMINAL, "execute", "ls")
+
+    stats = manager.get_decision_cache_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 4
+
+
+def test_decision_cache_is_invalidated_when_policies_change(tmp_path):
+    manager = make_manager(tmp_path, per_minute=0)
+    assert manager.check_agent_access("Worker", ResourceType.TERMINAL, "execute", "ls")
+
+    manager.update_agent_permissions(AgentPermissions(
+        agent_name="Worker",
+        permission_level=PermissionLevel.READ,
+        allowed_resources={ResourceType.FILESYSTEM},
+        rate_limit_per_minute=0,
+    ))
+
+    assert not manager.check_agent_access("Worker", ResourceType.TERMINAL, "execute", "ls")
+    assert len(manager.decision_cache) == 1
+
+
+def test_decision_cache_is_bounded():
+    cache = DecisionCache(capacity=2)
+    for i in range(5):
+        cache.put(i, (True, None))
+
+    assert len(cache) == 2
+    assert cache.get(0) is None
+    assert cache.get(4) == (True, None)
+    assert cache.stats()["evictions"] == 3